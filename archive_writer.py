@@ -0,0 +1,157 @@
+##########################################
+# THIS FILE HAS THE ARCHIVE WRITER CLASS #
+##########################################
+
+# Import the required libraries:
+import contextlib
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+# Declare the class:
+class ArchiveWriter:
+    """Streams the images of a deck into a single ZIP (stored) or tar file as they arrive"""
+
+    # Supported formats and their file extensions:
+    FORMATS = {
+        'zip': ".zip",
+        'tar': ".tar"
+    }
+
+    # Size of each chunk copied into the archive (the images are never fully loaded):
+    CHUNK_SIZE = 1024 * 1024
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, path, archive_format="zip"):
+
+        # Check the format:
+        if archive_format not in self.FORMATS:
+            raise ValueError(f"Formato de archivo desconocido: {archive_format}")
+
+        # Store the path and the format:
+        self.path = Path(path)
+        self.format = archive_format
+
+        # Create the parent folder:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Open the archive (the only file handle of the deck), stored with no compression
+        # (the images are already compressed):
+        if archive_format == "zip":
+            self.archive = zipfile.ZipFile(self.path, 'w', zipfile.ZIP_STORED, allowZip64=True)
+        else:
+            self.archive = tarfile.open(self.path, 'w', format=tarfile.PAX_FORMAT)
+
+        # Names already written (a repeated name is skipped):
+        self.names = set()
+
+        # Lock to add images from several workers:
+        self.lock = threading.Lock()
+
+        # Initialise the counters:
+        self.entries = 0
+        self.bytes = 0
+
+    #
+    # Add an image with the names of all its copies (a file path, or a spooled download; the data is read
+    # once per entry, in chunks):
+    #
+    def add(self, source, names):
+
+        # Get the size and date of the image:
+        if isinstance(source, (str, os.PathLike)):
+            stat = os.stat(source)
+            size, mtime = stat.st_size, stat.st_mtime
+        else:
+            size, mtime = source.seek(0, os.SEEK_END), time.time()
+
+        # Only one worker can write to the archive at a time:
+        with self.lock:
+
+            # Skip the names already written (e.g. a face completed twice):
+            names = [name for name in dict.fromkeys(names) if name not in self.names]
+            if not names:
+                return
+
+            # Write the entries in the format of the archive:
+            if self.format == "zip":
+                self.add_zip(source, names, size, mtime)
+            else:
+                self.add_tar(source, names, size, mtime)
+
+            # Register the names:
+            self.names.update(names)
+            self.entries += len(names)
+            self.bytes += size
+
+    #
+    # Helper function to open the data of an image from its start (a spooled download stays open):
+    #
+    def open_source(self, source):
+
+        # Open a file path:
+        if isinstance(source, (str, os.PathLike)):
+            return open(source, 'rb')
+
+        # Rewind a spooled download:
+        source.seek(0)
+        return contextlib.nullcontext(source)
+
+    #
+    # Helper function to write the entries of an image in the ZIP:
+    #
+    def add_zip(self, source, names, size, mtime):
+
+        # ZIP has no links, so every copy is its own stored entry:
+        for name in names:
+
+            # Build the entry with the date of the image:
+            info = zipfile.ZipInfo(name, time.localtime(mtime)[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = size
+
+            # Copy the image in chunks:
+            with self.open_source(source) as data, self.archive.open(info, 'w', force_zip64=True) as target:
+                for chunk in iter(lambda: data.read(self.CHUNK_SIZE), b""):
+                    target.write(chunk)
+
+    #
+    # Helper function to write the entries of an image in the tar:
+    #
+    def add_tar(self, source, names, size, mtime):
+
+        # Build the entry of the first copy:
+        info = tarfile.TarInfo(names[0])
+        info.size = size
+        info.mtime = mtime
+        info.mode = 0o644
+
+        # Copy the image in chunks:
+        with self.open_source(source) as data:
+            self.archive.addfile(info, data)
+
+        # The rest of the copies are hardlinks to the first one (no data is repeated):
+        for name in names[1:]:
+            link = tarfile.TarInfo(name)
+            link.type = tarfile.LNKTYPE
+            link.linkname = names[0]
+            link.mtime = mtime
+            link.mode = 0o644
+            self.archive.addfile(link)
+
+    #
+    # Finish the archive (returns the number of entries):
+    #
+    def close(self):
+
+        # Write the index (ZIP) or the end blocks (tar):
+        with self.lock:
+            self.archive.close()
+
+        # Return the number of entries:
+        return self.entries
@@ -0,0 +1,987 @@
+################################################
+# THIS FILE HAS THE ASYNCIO DOWNLOADER ENGINE #
+################################################
+
+# Import the required libraries:
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# httpx is optional (only needed for the asyncio engine):
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Import the blocking downloader (parsing, DFC policy, filenames, caches and manifests are shared):
+from scryfall_downloader import ScryfallDownloader
+
+# Import the retry error raised by short transfers:
+from retry_policy import IncompleteDownloadError, RetryPolicy
+
+# Declare the class:
+class AsyncScryfallDownloader(ScryfallDownloader):
+    """asyncio engine: hundreds of image transfers in flight from a single thread, same files as the blocking engine"""
+
+    # Connection steps reported by the httpx trace, with their metrics stage:
+    TRACE_STAGES = {
+        'connection.connect_tcp': 'connect',
+        'connection.start_tls': 'tls'
+    }
+
+    #
+    # Initialisation function (same options as ScryfallDownloader, plus the number of transfers in flight):
+    #
+    def __init__(self, *args, concurrency=64, **kwargs):
+
+        # httpx is required:
+        if httpx is None:
+            raise ImportError("El motor asíncrono necesita httpx (pip install httpx)")
+
+        # The connections are limited by the transfers in flight, there is no session pool to size:
+        if kwargs.get('pool_size') is not None:
+            raise ValueError("El motor asíncrono no admite pool_size (usa concurrency)")
+
+        # Check and store the maximum number of transfers in flight:
+        if int(concurrency) < 1:
+            raise ValueError(f"concurrency debe ser al menos 1: {concurrency}")
+        self.concurrency = int(concurrency)
+
+        # Initialise the downloader:
+        super().__init__(*args, **kwargs)
+
+        # The HTTP client and the semaphore belong to the event loop that created them:
+        self.client = None
+        self.client_loop = None
+        self.semaphore = None
+
+        # Event loop of the blocking methods, run in a background thread (started the first time it is needed):
+        self.loop = None
+        self.loop_thread = None
+        self.loop_lock = threading.Lock()
+
+        # Fetch tasks of the images of the run, keyed by (URL, cache key), so repeated lines share one transfer:
+        self.image_tasks = {}
+
+    #
+    # The blocking session is not used (the httpx client is created inside the event loop):
+    #
+    def create_session(self, pool_size):
+        return None
+
+    #
+    # Helper function to create the HTTP client (connection pool shared by the API and the image CDN) and the
+    # semaphore in the running event loop, unless they already belong to it (returns True if they were created):
+    #
+    async def open_client(self):
+
+        # Get the running event loop:
+        loop = asyncio.get_running_loop()
+
+        # Reuse the client of this loop:
+        if self.client is not None and self.client_loop is loop:
+            return False
+
+        # Create the client and the semaphore:
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self.client = httpx.AsyncClient(headers=self.HEADERS, timeout=self.timeout, limits=limits, follow_redirects=True)
+        self.client_loop = loop
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+
+        # Return True:
+        return True
+
+    #
+    # Helper function to close the HTTP client:
+    #
+    async def close_client(self):
+
+        # Close the pooled connections:
+        if self.client is not None:
+            await self.client.aclose()
+
+        # Forget the client:
+        self.client = None
+        self.client_loop = None
+
+    #
+    # Helper function to get the event loop of the blocking methods (started in a background thread the first time):
+    #
+    def get_loop(self):
+
+        # Only one thread can start the loop:
+        with self.loop_lock:
+
+            # Start the loop the first time:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.loop_thread = threading.Thread(target=self.loop.run_forever, name="async-downloader", daemon=True)
+                self.loop_thread.start()
+
+            # Return the loop:
+            return self.loop
+
+    #
+    # Run a coroutine in the event loop of the downloader and wait for its result (safe to call from any thread but
+    # the loop one, so the inherited blocking code paths share the client, limiter and semaphore of the engine):
+    #
+    def run_sync(self, coroutine):
+
+        # The loop can't wait for itself:
+        if self.loop_thread is not None and threading.get_ident() == self.loop_thread.ident:
+            coroutine.close()
+            raise RuntimeError("Los métodos bloqueantes no se pueden llamar desde el bucle del motor asíncrono")
+
+        # Declare the coroutine run in the loop (the client is created the first time):
+        async def run():
+            await self.open_client()
+            return await coroutine
+
+        # Submit it:
+        future = asyncio.run_coroutine_threadsafe(run(), self.get_loop())
+
+        # Wait for the result:
+        try:
+            return future.result()
+
+        # If the caller is interrupted (e.g. Ctrl+C), stop the run in the loop too:
+        except BaseException:
+            self.cancel_event.set()
+            future.cancel()
+            raise
+
+    #
+    # Helper function to close the pooled connections and stop the event loop:
+    #
+    def close(self):
+
+        # If the loop was started:
+        if self.loop is not None:
+
+            # Close its client:
+            if self.client_loop is self.loop:
+                asyncio.run_coroutine_threadsafe(self.close_client(), self.loop).result()
+
+            # Stop the loop and wait for its thread:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join()
+            self.loop.close()
+            self.loop = None
+
+        # Close the caches and the offline index:
+        super().close()
+
+    #
+    # Helper function to check whether an httpx error is transient (worth retrying):
+    #
+    def is_transient(self, policy, error):
+
+        # HTTP errors are only retried for the statuses of the policy:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in policy.RETRY_STATUSES
+
+        # Network errors and short transfers are always retried:
+        return isinstance(error, (httpx.TransportError, IncompleteDownloadError))
+
+    #
+    # Helper function to run a request coroutine with the retry policy and circuit breaker of its class:
+    #
+    async def with_retry_async(self, kind, operation):
+
+        # Get the retry policy and the circuit breaker:
+        policy = self.retry_policies[kind]
+        breaker = self.breakers[kind]
+
+        # Initialise the attempt counter:
+        attempt = 0
+
+        # Keep trying while the policy allows it:
+        while True:
+
+            # Wait while the host is considered down:
+            await breaker.wait_async(self.cancel_event)
+
+            # If the run was cancelled while waiting, stop here (giving back the trial slot, if it was taken):
+            if self.cancel_event.is_set():
+                breaker.release_trial()
+                raise IOError("descarga cancelada")
+
+            # Attempt the operation:
+            try:
+
+                # Run it:
+                result = await operation()
+
+                # The host answered, so the circuit stays closed:
+                breaker.record_success()
+
+                # Return the result:
+                return result
+
+            # If the task is cancelled, a trial request gives its slot back, so the breaker doesn't stay half-open:
+            except asyncio.CancelledError:
+                breaker.release_trial()
+                raise
+
+            # If it fails:
+            except Exception as e:
+
+                # If the run was cancelled, don't retry (giving back the trial slot too):
+                if self.cancel_event.is_set():
+                    breaker.release_trial()
+                    raise
+
+                # If the error is not transient (e.g. 404), the host is fine but there is no point in retrying:
+                if not self.is_transient(policy, e):
+                    breaker.record_success()
+                    raise
+
+                # Register the failure (and log it if the circuit was opened):
+                if breaker.record_failure():
+                    self.log(f"Servidor no disponible, pausando las descargas {breaker.cooldown:.0f}s")
+
+                # If there are no retries left, give up:
+                if not policy.allow_retry(attempt):
+                    raise
+
+                # Calculate the delay before the next attempt:
+                delay = policy.delay(attempt)
+
+                # Log and count the retry:
+                self.log(f"Error temporal ({e}), reintento {attempt + 1}/{policy.max_retries} en {delay:.1f}s")
+                self.metrics.increment(f"retries_{kind}")
+
+                # Wait, letting the other tasks run:
+                with self.metrics.timer('retry_wait'):
+                    await asyncio.sleep(delay)
+
+                # Count the attempt:
+                attempt += 1
+
+    #
+    # Helper function to build the trace of a request (httpx reports each step of the connection, so its
+    # setup is registered and kept out of the time to first byte):
+    #
+    def request_trace(self):
+
+        # Initialise the setup time and the time the response headers arrived:
+        timing = {'setup': 0.0, 'headers': None}
+
+        # Initialise the start time of each step:
+        started = {}
+
+        # Declare the trace callback:
+        async def trace(name, info):
+
+            # Split the step and its phase (e.g. 'connection.start_tls' and 'complete'):
+            step, phase = name.rsplit(".", 1)
+
+            # Store the start time of every step:
+            if phase == "started":
+                started[step] = time.perf_counter()
+
+            # When a connection step ends, register it and add it to the setup time:
+            elif phase == "complete" and step in self.TRACE_STAGES and step in started:
+                seconds = time.perf_counter() - started.pop(step)
+                timing['setup'] += seconds
+                self.metrics.observe(self.TRACE_STAGES[step], seconds)
+
+            # Store the time the response headers arrived (HTTP/1.1 or HTTP/2):
+            elif phase == "complete" and step.endswith(".receive_response_headers"):
+                timing['headers'] = time.perf_counter()
+
+        # Return the callback and the timing:
+        return trace, timing
+
+    #
+    # Helper function to calculate the time to first byte of a traced request (without the connection setup):
+    #
+    def trace_ttfb(self, timing, start):
+
+        # Use the time the headers arrived (or now, if the trace didn't report it):
+        end = timing['headers'] or time.perf_counter()
+
+        # Return the time:
+        return max(0.0, end - start - timing['setup'])
+
+    #
+    # Helper function to make a request to the API (throttling and retries included):
+    #
+    async def api_request_async(self, method, url, **kwargs):
+
+        # Run the request with the API retry policy:
+        return await self.with_retry_async('api', lambda: self.send_api_request_async(method, url, **kwargs))
+
+    #
+    # Helper function to send an API request, requeueing it if it is throttled:
+    #
+    async def send_api_request_async(self, method, url, **kwargs):
+
+        # Try again every time the API answers '429 Too Many Requests':
+        for attempt in range(self.MAX_THROTTLE_RETRIES + 1):
+
+            # Wait for the API rate limiter, without blocking the other tasks:
+            self.metrics.observe('limiter_wait', await self.api_limiter.acquire_async())
+
+            # Make the request (traced, to time the connection setup and the response headers):
+            trace, timing = self.request_trace()
+            start = time.perf_counter()
+            response = await self.client.request(method, url, extensions={'trace': trace}, **kwargs)
+
+            # Register the request and its time to first byte (without the connection setup):
+            ttfb = self.trace_ttfb(timing, start)
+            self.metrics.increment('requests_api')
+            self.metrics.observe('ttfb_api', ttfb)
+            self.emit_request('api', url, response.status_code, connect=timing['setup'], ttfb=ttfb)
+
+            # If the request was not throttled:
+            if response.status_code != 429:
+
+                # Let the limiter recover its rate:
+                self.api_limiter.succeeded()
+
+                # Raise the transient server errors, so the retry policy handles them:
+                if response.status_code in RetryPolicy.RETRY_STATUSES:
+                    response.raise_for_status()
+
+                # Return the response:
+                return response
+
+            # If there are no attempts left, stop here:
+            if attempt == self.MAX_THROTTLE_RETRIES:
+                break
+
+            # Count the throttle and slow down every task:
+            self.metrics.increment('throttled')
+            delay = self.api_limiter.throttled(response.headers.get('Retry-After'))
+
+            # Log the throttle:
+            self.log(f"API saturada (429), reintentando en {delay:.1f}s")
+
+        # Return the last response (it raises the 429 error later):
+        return response
+
+    #
+    # Metadata resolution stage (asyncio version of 'resolve_cards'):
+    #
+    async def resolve_cards_async(self, card_infos):
+
+        # Resolve what is possible locally (offline index and metadata cache), in a worker thread so the
+        # SQLite lookups don't stop the transfers:
+        unresolved = await asyncio.to_thread(self.resolve_local, card_infos)
+
+        # Consult the Scryfall API in batches:
+        for i in range(0, len(unresolved), 75):
+
+            # Slice the list to get the current batch:
+            batch = unresolved[i:i+75]
+
+            # Attempt the web request:
+            try:
+
+                # Make the POST request (paced by the API rate limiter):
+                resp = await self.api_request_async("POST", f"{self.BASE_URL}/cards/collection",
+                                                    json={"identifiers": [info.identifier() for info in batch]})
+
+                # Raise an error for bad responses:
+                resp.raise_for_status()
+
+                # Store the cards data (the metadata cache writes run in a worker thread):
+                await asyncio.to_thread(self.store_collection, batch, resp.json().get('data', []))
+
+            # If the batch fails, those cards will be requested one by one later:
+            except Exception as e:
+
+                # Log the error:
+                self.log(f"Error API (lote {i // 75 + 1}): {e}")
+
+    #
+    # Helper function to request a single card (asyncio version of 'fetch_card'):
+    #
+    async def fetch_card_async(self, card_info, cached=None):
+
+        # Build the URL and the conditional headers:
+        api_url, headers = self.card_request(card_info, cached)
+
+        # GET request to the Scryfall API (paced by the API rate limiter):
+        response = await self.api_request_async("GET", api_url, headers=headers)
+
+        # Store and return the card (the metadata cache writes run in a worker thread):
+        return await asyncio.to_thread(self.store_card_response, card_info, cached, response)
+
+    #
+    # Helper function to get the data of a single card (asyncio version of 'get_card_data'):
+    #
+    async def get_card_data_async(self, card_info):
+
+        # If the card was resolved in the batch stage, return it with no extra requests:
+        if card_info.key() in self.card_data:
+            return self.card_data[card_info.key()]
+
+        # In offline mode, a card missing from the index can't be requested:
+        if self.offline_index:
+            raise LookupError("la carta no está en el índice offline")
+
+        # Look for the card in the metadata cache (stale entries are revalidated):
+        cached = await asyncio.to_thread(self.metadata_cache.get, "/".join(card_info.key())) if self.metadata_cache else None
+
+        # Request the card from the API:
+        return await self.fetch_card_async(card_info, cached)
+
+    #
+    # Helper function to stream a download to a temporary file (the disk writes run in a worker thread):
+    #
+    async def stream_to_file_async(self, url, filepath):
+
+        # Write to a temporary file, so no half-written images are left behind:
+        temp_path = filepath.with_name(f"{filepath.name}.{id(asyncio.current_task())}.part")
+
+        # Open the temporary file in a worker thread:
+        f = await asyncio.to_thread(open, temp_path, 'wb')
+
+        # Attempt the transfer:
+        try:
+
+            # Write the body:
+            await self.stream_body_async(url, f)
+
+            # Close the file:
+            await asyncio.to_thread(f.close)
+
+            # Rename the complete file in a single step:
+            os.replace(temp_path, filepath)
+
+        # If anything fails (or the task is cancelled):
+        except BaseException:
+
+            # Close and remove the temporary file:
+            f.close()
+            temp_path.unlink(missing_ok=True)
+
+            # Raise the error again:
+            raise
+
+    #
+    # Helper function to stream a download into a spooled buffer (asyncio version of 'stream_to_spool'):
+    #
+    async def stream_to_spool_async(self, url):
+
+        # Create the spooled buffer:
+        spool = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE)
+
+        # Attempt the transfer, with the image retry policy:
+        try:
+            await self.with_retry_async('image', lambda: self.stream_body_async(url, spool))
+
+        # If it fails, release the buffer:
+        except BaseException:
+            spool.close()
+            raise
+
+        # Return the buffer:
+        return spool
+
+    #
+    # Helper function to make the GET request of an image and write its body to a file object in chunks
+    # (asyncio version of 'stream_body', the writes run in a worker thread):
+    #
+    async def stream_body_async(self, url, target):
+
+        # Start from an empty target (a retry writes the whole body again):
+        target.seek(0)
+        target.truncate()
+
+        # Make the GET request, reading the body in chunks (traced, to time the connection setup):
+        trace, timing = self.request_trace()
+        start = time.perf_counter()
+        async with self.client.stream("GET", url, extensions={'trace': trace}) as res:
+
+            # Register the request and its time to first byte (without the connection setup):
+            ttfb = self.trace_ttfb(timing, start)
+            self.metrics.increment('requests_image')
+            self.metrics.observe('ttfb_image', ttfb)
+
+            # Raise an error for bad responses (their request event has no transfer):
+            if res.is_error:
+                self.emit_request('image', url, res.status_code, connect=timing['setup'], ttfb=ttfb)
+            res.raise_for_status()
+
+            # Get the expected size (only comparable if the body is not compressed):
+            expected_size = None if res.headers.get('Content-Encoding') else res.headers.get('Content-Length')
+
+            # Initialise the written bytes counter and the time spent writing:
+            written = 0
+            write_time = 0.0
+
+            # Store the time the transfer started:
+            start = time.perf_counter()
+
+            # Write each chunk as it arrives, without blocking the event loop:
+            async for chunk in res.aiter_bytes(self.CHUNK_SIZE):
+
+                # Stop the transfer if the run was cancelled:
+                if self.cancel_event.is_set():
+                    raise IOError("descarga cancelada")
+
+                # Write the chunk:
+                mark = time.perf_counter()
+                await asyncio.to_thread(target.write, chunk)
+                write_time += time.perf_counter() - mark
+                written += len(chunk)
+
+        # Register the transfer (it includes the writes, which overlap with the other transfers), the writes and the
+        # bytes received:
+        transfer_time = time.perf_counter() - start
+        self.metrics.observe('transfer', transfer_time)
+        self.metrics.observe('disk_write', write_time)
+        self.metrics.increment('bytes_image', written)
+        self.emit_request('image', url, res.status_code, connect=timing['setup'], ttfb=ttfb, transfer=transfer_time,
+                          write=write_time, bytes=written)
+
+        # If the transfer was cut short, raise an error:
+        if expected_size is not None and written != int(expected_size):
+            raise IncompleteDownloadError(f"descarga incompleta ({written} de {expected_size} bytes)")
+
+    #
+    # Fetch a single image, from the cache or the network (asyncio version of 'fetch_image'):
+    #
+    async def fetch_image_async(self, url, filepath, cache_key=None):
+
+        # Look for the image in the local cache (in a worker thread, the index lock is shared with them):
+        cached_path = await asyncio.to_thread(self.image_cache.get, cache_key) if cache_key else None
+
+        # Count the hit or miss, if the cache is enabled:
+        if cache_key:
+            self.metrics.increment('image_cache_hit' if cached_path else 'image_cache_miss')
+
+        # If the image is already cached, return it with no requests:
+        if cached_path:
+            self.log(f"Desde caché: {filepath.name}")
+            return cached_path
+
+        # Log the current download progress:
+        self.log(f"Descargando: {filepath.name}")
+
+        # In archive mode, no loose file is written in the output folder:
+        if self.archive_format:
+
+            # Without a cache, the image is kept in a spooled buffer until its entries are written:
+            if not cache_key:
+                return await self.stream_to_spool_async(url)
+
+            # With a cache, the image is streamed straight to its cache file (kept for the next runs):
+            cache_path = await asyncio.to_thread(self.image_cache.path_for, cache_key)
+            await self.with_retry_async('image', lambda: self.stream_to_file_async(url, cache_path))
+            await asyncio.to_thread(self.image_cache.add, cache_key)
+
+            # Return the cached file:
+            return cache_path
+
+        # Stream the image to disk, with the image retry policy:
+        await self.with_retry_async('image', lambda: self.stream_to_file_async(url, filepath))
+
+        # If the cache is enabled, store the image for the next decklists (the copy and the index update
+        # run in a worker thread):
+        if cache_key:
+            await asyncio.to_thread(self.cache_image, filepath, cache_key)
+
+        # Return the downloaded file:
+        return filepath
+
+    #
+    # Fetch an image with a limited number of transfers in flight:
+    #
+    async def fetch_image_limited(self, url, filepath, cache_key=None):
+
+        # Wait for a free slot and fetch the image:
+        async with self.semaphore:
+            return await self.fetch_image_async(url, filepath, cache_key)
+
+    #
+    # Helper function to get the fetch task of an image (every line with the same printing and face shares it, whatever
+    # its number of copies), with the lock that writes its copies one line at a time:
+    #
+    def image_task(self, url, filepath, cache_key):
+
+        # Build the key of the image:
+        key = (url, cache_key)
+
+        # Create the task the first time:
+        if key not in self.image_tasks:
+            self.image_tasks[key] = {
+                'task': asyncio.create_task(self.fetch_image_limited(url, filepath, cache_key)),
+                'lock': asyncio.Lock()
+            }
+
+        # Return the task and its lock:
+        return self.image_tasks[key]
+
+    #
+    # Helper function to get a source for the copies of a line (a spooled download is shared by every line, so each
+    # one gets its own copy to write and release):
+    #
+    def copy_source(self, source):
+
+        # Local files are shared as they are:
+        if isinstance(source, Path):
+            return source
+
+        # Copy the spooled download:
+        copy = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE)
+        source.seek(0)
+        shutil.copyfileobj(source, copy)
+
+        # Return the copy:
+        return copy
+
+    #
+    # Helper function to release the images of the run: the spooled downloads are closed and the cache entries
+    # are unpinned (the local files are kept):
+    #
+    def release_images(self):
+
+        # Iterate through each fetched image:
+        for (_, cache_key), image in self.image_tasks.items():
+
+            # Skip the images that failed or were never fetched:
+            task = image['task']
+            if not task.done() or task.cancelled() or task.exception():
+                continue
+
+            # Close the spooled downloads:
+            if not isinstance(task.result(), Path):
+                task.result().close()
+
+            # Let the cache evict the image again:
+            if cache_key:
+                self.image_cache.release(cache_key)
+
+        # Forget the images of the run:
+        self.image_tasks = {}
+
+    #
+    # Write a face and all its copies (asyncio version of 'write_face', the image is fetched once for every line):
+    #
+    async def write_face_async(self, url, filepaths, cache_key=None):
+
+        # If every file is already complete and valid, there is nothing to do (checksums run in a thread):
+        if await asyncio.to_thread(self.face_is_complete, url, filepaths):
+            return True
+
+        # Start the download attempt:
+        try:
+
+            # Record the planned files (in a worker thread, it may create folders and archives):
+            await asyncio.to_thread(self.plan_face, url, filepaths)
+
+            # Get the image, fetched once (a line that stops waiting doesn't cancel it for the others):
+            image = self.image_task(url, filepaths[0], cache_key)
+            source = await asyncio.shield(image['task'])
+
+            # Write the copies of this line and record them in a worker thread (one line at a time, the lines
+            # of the same image can share files):
+            async with image['lock']:
+                source = await asyncio.to_thread(self.copy_source, source)
+                await asyncio.to_thread(self.fan_out_face, source, url, filepaths)
+
+            # Return True:
+            return True
+
+        # If a download fails:
+        except Exception as e:
+
+            # Record the failure:
+            self.fail_face(url, filepaths, e)
+
+            # Return False:
+            return False
+
+    #
+    # Download every face of a card and update the statistics:
+    #
+    async def download_card_async(self, info, dfc_policy="both"):
+
+        # Build the list of faces to download:
+        try:
+
+            # Get the resolved card object:
+            card_data = await self.get_card_data_async(info)
+
+            # Get the URL, the numbered files and the cache key of each face:
+            faces = [
+                (
+                    url,
+                    self.image_filepaths(card_data, face_suffix, info.quantity, variant=variant),
+                    self.image_cache_key(card_data, face_suffix, variant)
+                )
+                for url, face_suffix, variant in self.image_urls(card_data, dfc_policy)
+            ]
+
+        # Catch any API exceptions:
+        except Exception as e:
+
+            # Log the error, count it and send the progress event:
+            self.log(f"Error API ({info.name}): {e}")
+            self.add_stats(failed=1)
+            self.emit_card(info, "failed", str(e))
+            return
+
+        # Write every face at once:
+        results = await asyncio.gather(*(self.write_face_async(url, filepaths, cache_key)
+                                         for url, filepaths, cache_key in faces))
+
+        # Cancelled cards are not counted:
+        if self.cancel_event.is_set():
+            return
+
+        # If every face was written:
+        if all(results):
+
+            # Increment the total and successful counters with every copy:
+            self.add_stats(total=info.quantity, successful=info.quantity)
+            self.emit_card(info, "ok")
+
+        # If any face failed:
+        else:
+
+            # Increment the total and failed counters with every copy:
+            self.add_stats(total=info.quantity, failed=info.quantity)
+            self.emit_card(info, "failed")
+
+    #
+    # Main coroutine to process the decklist:
+    #
+    async def process_decklist_async(self, file_path, dfc_policy="both", card_infos=None):
+
+        # The thread running the event loop is the one that shows the log messages:
+        self.owner_thread = threading.get_ident()
+
+        # Create the output folder when the process starts:
+        self.output_folder.mkdir(parents=True, exist_ok=True)
+
+        # Set the start time:
+        self.start_time = time.time()
+
+        # Initialise the file error flag:
+        file_error = False
+
+        # Get the HTTP client of this event loop (created here if the coroutine is awaited from another loop):
+        opened = await self.open_client()
+
+        # Start the run with no fetched images:
+        self.image_tasks = {}
+
+        # Run the cards (the images and the client are released even if the run is interrupted):
+        try:
+
+            # Start the file processing block:
+            try:
+
+                # Read the decklist (parsed only once), unless the cards were given (e.g. the pages of a set):
+                if card_infos is None:
+                    card_infos = await asyncio.to_thread(self.read_decklist, file_path)
+
+                # Send the start event right away (the counts of streamed cards are None until the final event below):
+                if isinstance(card_infos, list):
+                    self.emit("start", decklist=str(file_path), cards=len(card_infos),
+                              copies=sum(info.quantity for info in card_infos))
+                else:
+                    self.emit("start", decklist=str(file_path), cards=None, copies=None)
+
+                # Initialise the list of card tasks and the counters:
+                tasks = []
+                cards = copies = 0
+
+                # Resolve the cards in batches, starting the downloads of each batch right away:
+                async for batch in self.iter_batches(card_infos):
+
+                    # Stop if the run was cancelled:
+                    if self.cancel_event.is_set():
+                        break
+
+                    # Resolve the batch:
+                    await self.resolve_cards_async(batch)
+
+                    # Start the downloads of its cards:
+                    tasks += [asyncio.create_task(self.download_card_async(info, dfc_policy)) for info in batch]
+
+                    # Count the cards and copies:
+                    cards += len(batch)
+                    copies += sum(info.quantity for info in batch)
+
+                # If the cards were streamed, send the start event once they are all known:
+                if not isinstance(card_infos, list) and not self.cancel_event.is_set():
+                    self.emit("start", decklist=str(file_path), cards=cards, copies=copies)
+
+                # Wait for every card:
+                await asyncio.gather(*tasks)
+
+            # Catch any general file processing errors:
+            except Exception as e:
+
+                # Log the error:
+                self.log(f"Error procesando archivo: {e}")
+
+                # Set the file error flag:
+                file_error = True
+
+        # Release the spooled downloads, and the client if it was created for this run:
+        finally:
+            self.release_images()
+            if opened:
+                await self.close_client()
+
+        # Finish the archives, if any:
+        self.close_archives()
+
+        # Save the job manifests, so a rerun only costs the remainder:
+        self.save_manifests()
+
+        # Set the end time:
+        self.end_time = time.time()
+
+        # Display the summary and send the metrics:
+        self.print_summary()
+        self.export_metrics()
+
+        # Send the summary event:
+        self.emit(
+            "summary",
+            decklist=str(file_path),
+            output=str(self.output_folder.absolute()),
+            elapsed=round(self.end_time - self.start_time, 3),
+            file_error=file_error,
+            cancelled=self.cancel_event.is_set(),
+            **self.stats
+        )
+
+        # Return True if every card was downloaded:
+        return not file_error and not self.cancel_event.is_set() and self.stats['failed'] == 0
+
+    #
+    # Helper function to split the cards in batches of 75 (a list, or an async generator such as 'iter_set_async'):
+    #
+    async def iter_batches(self, card_infos):
+
+        # A list is sliced:
+        if isinstance(card_infos, list):
+            for i in range(0, len(card_infos), 75):
+                yield card_infos[i:i+75]
+            return
+
+        # Initialise the current batch:
+        batch = []
+
+        # Collect the cards as they arrive:
+        async for info in card_infos:
+
+            # Add the card:
+            batch.append(info)
+
+            # Send the batch when it is full:
+            if len(batch) >= 75:
+                yield batch
+                batch = []
+
+        # Send the last cards:
+        if batch:
+            yield batch
+
+    #
+    # Enumerate every card of a set (asyncio version of 'iter_set', one search request per 175 cards):
+    #
+    async def iter_set_async(self, set_code):
+
+        # In offline mode, take the set from the local bulk-data index (no API calls are made):
+        if self.offline_index:
+
+            # Get the cards of the set:
+            cards = await asyncio.to_thread(self.offline_index.get_set, set_code)
+            if not cards:
+                raise LookupError(f"la colección {set_code} no está en el índice offline")
+
+            # Store and send each card (they are not copied to the metadata cache):
+            for info in self.set_card_requests(cards, cache=False):
+                yield info
+            return
+
+        # Build the URL and the query of the first page (every printing, in collector number order):
+        url = f"{self.BASE_URL}/cards/search"
+        params = {'q': f"e:{set_code}", 'unique': "prints", 'order': "set"}
+
+        # Keep going while there are more pages:
+        while url:
+
+            # Make the request (paced by the API rate limiter):
+            resp = await self.api_request_async("GET", url, params=params)
+
+            # Scryfall answers '404' when the search has no cards:
+            if resp.status_code == 404:
+                raise LookupError(f"la colección {set_code} no existe o no tiene cartas")
+
+            # Raise an error for other bad responses:
+            resp.raise_for_status()
+
+            # Get the page:
+            page = resp.json()
+
+            # Store (the metadata cache writes run in a worker thread) and send each card of the page:
+            for info in await asyncio.to_thread(self.set_card_requests, page.get('data', [])):
+                yield info
+
+            # The next page URL already carries the query:
+            url = page.get('next_page') if page.get('has_more') else None
+            params = None
+
+    #
+    # Blocking entry point, same as ScryfallDownloader.process_decklist (runs in the event loop of the downloader):
+    #
+    def process_decklist(self, file_path, dfc_policy="both", preview=False, compositor=None, post_processor=None,
+                         card_infos=None):
+
+        # The previews, print sheets and post-processing run on the threaded pipeline (its requests still go
+        # through the event loop of this engine):
+        if preview or compositor or post_processor:
+            return super().process_decklist(file_path, dfc_policy, preview, compositor, post_processor, card_infos)
+
+        # A blocking generator of cards (e.g. 'iter_set') makes its requests through the loop, so it is read first:
+        if card_infos is not None and not isinstance(card_infos, list):
+            card_infos = list(card_infos)
+
+        # Run the coroutine:
+        return self.run_sync(self.process_decklist_async(file_path, dfc_policy, card_infos))
+
+    #
+    # Blocking entry point of the set mode, same as ScryfallDownloader.process_set (the search pages are read
+    # inside the event loop, so the downloads start with the first page):
+    #
+    def process_set(self, set_code, dfc_policy="both", compositor=None, post_processor=None):
+
+        # Print sheets and post-processing run on the threaded pipeline:
+        if compositor or post_processor:
+            return super().process_set(set_code, dfc_policy, compositor, post_processor)
+
+        # Run the coroutine:
+        return self.run_sync(self.process_decklist_async(f"e:{set_code}", dfc_policy, self.iter_set_async(set_code)))
+
+    #
+    # Blocking version of 'api_request_async' (used by the inherited code paths, e.g. 'iter_set' or 'get_card_data'):
+    #
+    def api_request(self, method, url, **kwargs):
+        return self.run_sync(self.api_request_async(method, url, **kwargs))
+
+    #
+    # Blocking version of 'resolve_cards_async' (used by 'check_for_dfcs' and the batch scheduler):
+    #
+    def resolve_cards(self, card_infos):
+        return self.run_sync(self.resolve_cards_async(list(card_infos)))
+
+    #
+    # Blocking version of 'fetch_image_async' (used by 'write_face' in the threaded pipeline and the batch scheduler):
+    #
+    def fetch_image(self, url, filepath, cache_key=None):
+        return self.run_sync(self.fetch_image_limited(url, filepath, cache_key))
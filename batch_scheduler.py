@@ -0,0 +1,425 @@
+######################################################
+# THIS FILE HAS THE MULTI-DECK BATCH SCHEDULER CLASS #
+######################################################
+
+# Import the required libraries:
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+# Import the print sheet compositor (it needs Pillow only when used):
+from print_sheets import SheetCompositor, create_pool
+
+# Declare the class:
+class BatchScheduler:
+    """Runs many decklists as one job: every printing and face is fetched once across all the decks"""
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, downloader):
+
+        # Store the downloader (its session, rate limiter and caches are shared by every deck):
+        self.downloader = downloader
+
+        # Initialise the list of decks (decklist path and output folder):
+        self.decks = []
+
+        # Print sheet compositors of the run, keyed by deck output folder:
+        self.compositors = {}
+
+        # Process pool shared by every compositor (one per batch, not one per deck):
+        self.sheet_pool = None
+
+        # Post-processor of the run (None to skip it):
+        self.post_processor = None
+
+    #
+    # Add a decklist to the job:
+    #
+    def add_decklist(self, file_path, output_folder=None):
+
+        # By default, each deck goes in its own subfolder of the downloader output folder:
+        if output_folder is None:
+            output_folder = self.downloader.output_folder / Path(file_path).stem
+
+        # Store the deck:
+        self.decks.append((file_path, Path(output_folder)))
+
+    #
+    # Add every card of a set to the job (enumerated with the paginated search, so it makes no collection calls):
+    #
+    def add_set(self, set_code, output_folder=None):
+
+        # By default, the set goes in a subfolder named after its code:
+        if output_folder is None:
+            output_folder = self.downloader.output_folder / set_code.lower()
+
+        # Enumerate the set and store it as an already parsed decklist:
+        key = f"e:{set_code.lower()}"
+        self.downloader.decklists[key] = list(self.downloader.iter_set(set_code))
+
+        # Store the deck:
+        self.decks.append((key, Path(output_folder)))
+
+    #
+    # Helper function to read every decklist of the job:
+    #
+    def read_decks(self):
+
+        # Initialise the parsed decks (None if the file couldn't be read):
+        parsed = []
+
+        # Iterate through each deck:
+        for file_path, _ in self.decks:
+
+            # Attempt to read the decklist:
+            try:
+                parsed.append(self.downloader.read_decklist(file_path))
+
+            # If the file can't be read:
+            except Exception as e:
+
+                # Log the error:
+                self.downloader.log(f"Error procesando archivo ({file_path}): {e}")
+
+                # Mark the deck as failed:
+                parsed.append(None)
+
+        # Return the parsed decks:
+        return parsed
+
+    #
+    # Build the global work graph: unique images and every file that comes from each one:
+    #
+    def build_work_graph(self, parsed, dfc_policy="both", variants=None, subfolder=None):
+
+        # Store the downloader in a short variable:
+        d = self.downloader
+
+        # Initialise the unique images, keyed by (card id, face):
+        work = {}
+
+        # Initialise the list of deck cards and the images they need:
+        cards = []
+
+        # Iterate through each deck:
+        for deck_index, card_infos in enumerate(parsed):
+
+            # Skip the decks that couldn't be read:
+            if card_infos is None:
+                continue
+
+            # Get the deck output folder (or its subfolder, for the previews):
+            output_folder = self.decks[deck_index][1]
+            if subfolder:
+                output_folder = output_folder / subfolder
+
+            # Iterate through each card:
+            for card_info in card_infos:
+
+                # Get the card data (already resolved in the batch stage) and the images of the profile:
+                try:
+                    card_data = d.get_card_data(card_info)
+                    faces = d.image_urls(card_data, dfc_policy, variants)
+
+                # If the card can't be resolved (or has no image of the profile):
+                except Exception as e:
+
+                    # Log the API error:
+                    d.log(f"Error API ({card_info.name}): {e}")
+
+                    # Store the card with no images, so it counts as failed:
+                    cards.append((deck_index, card_info, None))
+                    continue
+
+                # Initialise the list of images of this card:
+                keys = []
+
+                # Iterate through each face to download:
+                for url, face_suffix, variant in faces:
+
+                    # Build the key of the image:
+                    key = (card_data.get('id') or url, face_suffix, variant)
+
+                    # Add the image to the graph the first time it appears:
+                    entry = work.setdefault(key, {
+                        'url': url,
+                        'cache_key': d.image_cache_key(card_data, face_suffix, variant),
+                        'filepaths': []
+                    })
+
+                    # Add the files of this deck (with its own copies and filenames):
+                    entry['filepaths'].extend(
+                        d.image_filepaths(card_data, face_suffix, card_info.quantity, output_folder, variant)
+                    )
+
+                    # Store the key:
+                    keys.append(key)
+
+                # Store the card with its images:
+                cards.append((deck_index, card_info, keys))
+
+        # Return the graph and the cards:
+        return work, cards
+
+    #
+    # Worker function to fetch a unique image once and write every file that uses it:
+    #
+    def fetch_work(self, entry):
+
+        # If the run was cancelled, skip the image:
+        if self.downloader.cancel_event.is_set():
+            return False
+
+        # Write the image once and every file of every deck from it:
+        if not self.downloader.write_face(entry['url'], entry['filepaths'], entry['cache_key']):
+            return False
+
+        # The previews are not sent to the print sheets nor the post-processor:
+        if entry.get('preview'):
+            return True
+
+        # Send the image to the print sheets of each deck, once with its number of copies:
+        for output_folder in dict.fromkeys(path.parent for path in entry['filepaths']):
+            if output_folder in self.compositors:
+                copies = [path for path in entry['filepaths'] if path.parent == output_folder]
+                self.compositors[output_folder].add(copies[0], len(copies))
+
+        # Send every file to the post-processor (transformed once, with an output per copy):
+        if self.post_processor:
+            self.post_processor.add_files(entry['filepaths'])
+
+        # Return True:
+        return True
+
+    #
+    # Create the print sheet compositor of each deck ('pdf': one file, 'png': one file per page):
+    #
+    def create_compositors(self, sheet_format, sheet_options=None):
+
+        # Create one process pool for every deck (the CPUs are shared, so the pool size doesn't grow with the decks):
+        self.sheet_pool = create_pool((sheet_options or {}).get('workers'))
+
+        # Iterate through each deck:
+        for _, output_folder in self.decks:
+
+            # Build the output path of the sheets:
+            if sheet_format == "pdf":
+                sheet_path = output_folder / "hojas_impresion.pdf"
+            else:
+                sheet_path = output_folder / "hojas_impresion" / "hoja.png"
+
+            # Create the compositor:
+            self.compositors[output_folder] = SheetCompositor(sheet_path, executor=self.sheet_pool, log=self.downloader.log,
+                                                              **(sheet_options or {}))
+
+    #
+    # Fetch every unique image of a work graph with the pool of workers (returns the result of each one), after
+    # the previews, if any (submitted first to the same pool, so the full-size images start as workers free up):
+    #
+    def fetch_all(self, work, previews=None):
+
+        # Store the downloader in a short variable:
+        d = self.downloader
+
+        # Initialise the results of each unique image:
+        results = {}
+
+        # Start the pool of download workers:
+        with ThreadPoolExecutor(max_workers=d.workers) as pool:
+
+            # Submit one task per preview first, then one per unique image:
+            preview_futures = {pool.submit(self.fetch_work, entry): key for key, entry in (previews or {}).items()}
+            futures = {pool.submit(self.fetch_work, entry): key for key, entry in work.items()}
+
+            # Store the pending tasks:
+            pending = set(futures) | set(preview_futures)
+
+            # Initialise the results of each preview (None when the run has no preview):
+            preview_results = {} if previews is not None else None
+
+            # While there are tasks running:
+            while pending:
+
+                # Wait a moment for any task to finish:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+
+                # Store the results of the finished tasks (cancelled tasks count as failed):
+                for future in done:
+                    result = not future.cancelled() and future.result()
+                    if future in preview_futures:
+                        preview_results[preview_futures[future]] = result
+                    else:
+                        results[futures[future]] = result
+
+                # Send the preview event as soon as every preview is done:
+                if preview_results is not None and len(preview_results) == len(previews):
+                    d.emit("preview", decks=len(self.decks), images=len(previews),
+                           successful=sum(preview_results.values()))
+                    preview_results = None
+
+                # Show the messages sent by the workers in the meantime:
+                d.flush_log()
+
+                # If the run was cancelled, drop the tasks not started yet:
+                if d.cancel_event.is_set():
+                    for future in pending:
+                        future.cancel()
+
+        # Return the results:
+        return results
+
+    #
+    # Helper function to build the previews: small images of every deck, in a subfolder of each deck folder:
+    #
+    def build_previews(self, parsed, dfc_policy="both"):
+
+        # Store the downloader in a short variable:
+        d = self.downloader
+
+        # Build the work graph of the previews:
+        work, _ = self.build_work_graph(parsed, dfc_policy, d.PREVIEW_VARIANTS, d.PREVIEW_FOLDER)
+
+        # Create every preview folder:
+        for _, output_folder in self.decks:
+            (output_folder / d.PREVIEW_FOLDER).mkdir(parents=True, exist_ok=True)
+
+        # Log the start of the preview:
+        d.log(f"Descargando vista previa ({len(work)} imágenes)")
+
+        # Mark each image as a preview (the keys get a prefix, so they never mix with the full-size ones):
+        return {("preview",) + key: dict(entry, preview=True) for key, entry in work.items()}
+
+    #
+    # Main function to run the whole batch:
+    #
+    def run(self, dfc_policy="both", preview=False, sheet_format=None, sheet_options=None, post_processor=None):
+
+        # Store the downloader in a short variable:
+        d = self.downloader
+
+        # The thread running the batch is the one that shows the log messages:
+        d.owner_thread = threading.get_ident()
+
+        # Set the start time:
+        d.start_time = time.time()
+
+        # Read every decklist:
+        parsed = self.read_decks()
+
+        # Resolve every card of every deck at once (each printing only once):
+        d.resolve_cards([info for card_infos in parsed if card_infos for info in card_infos])
+
+        # In preview mode, build the small images of every deck (fetched first, in the same pool):
+        previews = self.build_previews(parsed, dfc_policy) if preview else None
+
+        # Build the global work graph:
+        work, cards = self.build_work_graph(parsed, dfc_policy)
+
+        # Create every deck output folder:
+        for _, output_folder in self.decks:
+            output_folder.mkdir(parents=True, exist_ok=True)
+
+        # Send the start event with the number of decks, cards and unique images:
+        d.emit("start", decks=len(self.decks), cards=len(cards), images=len(work))
+
+        # Create the print sheet compositors, if requested (the images are laid out as they arrive):
+        if sheet_format:
+            self.create_compositors(sheet_format, sheet_options)
+
+        # Store the post-processor (it runs in its own process pool while the downloads go on):
+        self.post_processor = post_processor
+
+        # Fetch every unique image once (after the previews, if any):
+        results = self.fetch_all(work, previews)
+
+        # Write the last page of each deck:
+        for compositor in self.compositors.values():
+            compositor.close()
+        self.compositors = {}
+
+        # Stop the shared process pool:
+        if self.sheet_pool:
+            self.sheet_pool.shutdown()
+            self.sheet_pool = None
+
+        # Finish the archive of each deck, if any:
+        d.close_archives()
+
+        # Initialise the statistics of each deck:
+        deck_stats = [{'successful': 0, 'failed': 0, 'total': 0} for _ in self.decks]
+
+        # Iterate through each card of each deck:
+        for deck_index, card_info, keys in cards:
+
+            # Save the number of copies:
+            quantity = card_info.quantity
+
+            # If the card couldn't be resolved:
+            if keys is None:
+
+                # Count it as failed (like a single decklist run):
+                d.add_stats(failed=1)
+                deck_stats[deck_index]['failed'] += 1
+                d.emit_card(card_info, "failed")
+                continue
+
+            # Update the deck total with every copy:
+            deck_stats[deck_index]['total'] += quantity
+
+            # If every face of the card was written:
+            if all(results.get(key) for key in keys):
+
+                # Increment the total and successful counters with every copy:
+                d.add_stats(total=quantity, successful=quantity)
+                deck_stats[deck_index]['successful'] += quantity
+
+                # Send the progress event:
+                d.emit_card(card_info, "ok")
+
+            # If any face failed:
+            else:
+
+                # Increment the total and failed counters with every copy:
+                d.add_stats(total=quantity, failed=quantity)
+                deck_stats[deck_index]['failed'] += quantity
+
+                # Send the progress event:
+                d.emit_card(card_info, "failed")
+
+        # Save the job manifests, so a rerun only costs the remainder:
+        d.save_manifests()
+
+        # Set the end time:
+        d.end_time = time.time()
+
+        # Send a summary event per deck:
+        for deck_index, (file_path, output_folder) in enumerate(self.decks):
+            d.emit(
+                "deck",
+                decklist=str(file_path),
+                output=str(output_folder.absolute()),
+                file_error=parsed[deck_index] is None,
+                **deck_stats[deck_index]
+            )
+
+        # Display the summary:
+        d.print_summary()
+
+        # Send and save the metrics of the run:
+        d.export_metrics()
+
+        # Send the summary event:
+        d.emit(
+            "summary",
+            decks=len(self.decks),
+            images=len(work),
+            elapsed=round(d.end_time - d.start_time, 3),
+            cancelled=d.cancel_event.is_set(),
+            **d.stats
+        )
+
+        # Return True if every card of every deck was downloaded:
+        return None not in parsed and not d.cancel_event.is_set() and d.stats['failed'] == 0
@@ -0,0 +1,169 @@
+##########################################################
+# END-TO-END BENCHMARK OF THE DOWNLOADER (MOCK SCRYFALL) #
+##########################################################
+
+# Usage (from the repository folder):
+#   python benchmarks/bench_downloader.py [--sizes 60 100 1000 10000] [--latency 0.05] [--bandwidth 5000000]
+#                                         [--error-rate 0.01] [--throttle-rate 0.01] [--engine sync|async] [--set]
+#                                         [--json]
+
+# Import the required libraries:
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+# Make the repository modules importable:
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import the downloader and the mock server:
+from scryfall_downloader import ScryfallDownloader
+from mock_scryfall import MockScryfall
+
+# Default decklist sizes (lines):
+DEFAULT_SIZES = [60, 100, 1000, 10_000]
+
+#
+# Helper function to write a synthetic decklist with the given number of lines:
+#
+def write_decklist(path, lines):
+
+    # Every card appears twice, so the deduplication is measured too:
+    unique = max(1, lines // 2)
+
+    # Open the file:
+    with open(path, 'w', encoding='utf-8') as f:
+
+        # Write the lines in a loop (one card out of ten is double-faced):
+        for i in range(lines):
+            number = i % unique
+            suffix = "d" if number % 10 == 0 else ""
+            f.write(f"{1 + i % 4} Card {number} (BEN) {number}{suffix}\n")
+
+#
+# Helper function to get the peak resident memory of the process (MB):
+#
+def peak_rss():
+
+    # Linux reports kilobytes and macOS reports bytes:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+#
+# Helper function to run the downloader on one decklist:
+#
+def run_once(mock, lines, workers, engine="sync", concurrency=64, set_mode=False):
+
+    # Create a temporary folder for the decklist and the images:
+    with tempfile.TemporaryDirectory() as folder:
+
+        # Write the decklist:
+        path = os.path.join(folder, "decklist.txt")
+        write_decklist(path, lines)
+
+        # Create a silent downloader of the chosen engine, pointed at the mock server:
+        if engine == "async":
+            from async_downloader import AsyncScryfallDownloader
+            downloader = AsyncScryfallDownloader(os.path.join(folder, "imagenes"), concurrency=concurrency, echo=False)
+        else:
+            downloader = ScryfallDownloader(os.path.join(folder, "imagenes"), workers=workers, echo=False)
+        downloader.BASE_URL = mock.url
+
+        # Take a snapshot of the server counters:
+        before = dict(mock.counters)
+
+        # Process the decklist, or a whole set of the same number of cards (set mode):
+        start = time.perf_counter()
+        if set_mode:
+            mock.set_size = lines
+            downloader.process_set("ben")
+        else:
+            downloader.process_decklist(path)
+        elapsed = time.perf_counter() - start
+
+        # Close the session:
+        downloader.close()
+
+    # Compute the counters of this run:
+    counters = {name: mock.counters[name] - before[name] for name in before}
+
+    # Return the results (the copies are the files written, the fetched images the image requests, so the
+    # deduplication shows as the gap between both rates):
+    return {
+        'lines': lines,
+        'seconds': round(elapsed, 3),
+        'requests': counters['api'] + counters['collection'] + counters['search'] + counters['image'],
+        'api_requests': counters['api'] + counters['collection'] + counters['search'],
+        'image_requests': counters['image'],
+        'errors': counters['errors'],
+        'throttled': counters['throttled'],
+        'bytes': counters['bytes'],
+        'peak_rss_mb': round(peak_rss(), 1),
+        'copies': downloader.stats['successful'],
+        'failed': downloader.stats['failed'],
+        'copies_per_second': round(downloader.stats['successful'] / elapsed, 1) if elapsed else 0.0,
+        'fetched_per_second': round(counters['image'] / elapsed, 1) if elapsed else 0.0,
+        'metrics': downloader.metrics.report()
+    }
+
+#
+# Helper function to create the argument parser:
+#
+def create_parser():
+
+    # Create the parser:
+    parser = argparse.ArgumentParser(description="Benchmark del descargador contra un Scryfall simulado")
+
+    # Add the arguments:
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Líneas de cada decklist")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Descargas simultáneas")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia añadida a cada respuesta (s)")
+    parser.add_argument("--bandwidth", type=float, default=None, help="Ancho de banda de las imágenes (bytes/s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proporción de respuestas 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Proporción de respuestas 429")
+    parser.add_argument("--engine", choices=["sync", "async"], default="sync", help="Motor de descarga")
+    parser.add_argument("--concurrency", type=int, default=64, help="Transferencias simultáneas del motor asíncrono")
+    parser.add_argument("--set", action="store_true",
+                        help="Descarga una colección completa de cada tamaño en lugar de una decklist")
+    parser.add_argument("--image-size", type=int, default=20_000, help="Tamaño de cada imagen (bytes)")
+    parser.add_argument("--json", action="store_true", help="Muestra los resultados en JSON")
+
+    # Return the parser:
+    return parser
+
+#
+# Main function of the benchmark:
+#
+def main(argv=None):
+
+    # Parse the arguments:
+    parser = create_parser()
+    args = parser.parse_args(argv)
+
+    # Start the mock server:
+    mock = MockScryfall(args.latency, args.bandwidth, args.error_rate, args.throttle_rate, args.image_size).start()
+
+    # Run every size:
+    try:
+        results = [run_once(mock, lines, args.workers, args.engine, args.concurrency, args.set) for lines in args.sizes]
+    finally:
+        mock.stop()
+
+    # Show the results in JSON:
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    # Otherwise, show a table:
+    print(f"{'líneas':>7} {'tiempo':>9} {'peticiones':>10} {'MB':>8} {'RSS MB':>8} {'copias/s':>9} {'img/s':>8} "
+          f"{'fallos':>6}")
+    for r in results:
+        print(f"{r['lines']:>7} {r['seconds']:>8.2f}s {r['requests']:>10} {r['bytes'] / 1e6:>8.1f} "
+              f"{r['peak_rss_mb']:>8.1f} {r['copies_per_second']:>9.1f} {r['fetched_per_second']:>8.1f} {r['failed']:>6}")
+
+# Run the benchmark:
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+##############################################
+# BENCHMARK OF THE STREAMING DECKLIST PARSER #
+##############################################
+
+# Usage (from the repository folder):
+#   python benchmarks/bench_parser.py [number of lines]
+
+# Import the required libraries:
+import os
+import sys
+import tempfile
+import time
+
+# Make the repository modules importable:
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import the parser:
+from decklist_parser import iter_decklist
+
+# Sample lines of every supported format:
+SAMPLE_LINES = [
+    "1 Lightning Bolt (M10) 146",
+    "1 Sol Ring (C21) 263 *F*",
+    "1 Delver of Secrets // Insectile Aberration (ISD) 51",
+    "4 Counterspell",
+    "4x Brainstorm",
+    "Island",
+    "",
+    "// Sideboard",
+    "# comment",
+]
+
+#
+# Helper function to write a synthetic decklist with the given number of lines:
+#
+def write_decklist(path, lines):
+
+    # Open the file:
+    with open(path, 'w', encoding='utf-8') as f:
+
+        # Write the sample lines in a loop:
+        for i in range(lines):
+            f.write(SAMPLE_LINES[i % len(SAMPLE_LINES)] + "\n")
+
+#
+# Main function of the benchmark:
+#
+def main(lines=100_000, rounds=5):
+
+    # Create a temporary decklist:
+    with tempfile.TemporaryDirectory() as folder:
+
+        # Write it:
+        path = os.path.join(folder, "decklist.txt")
+        write_decklist(path, lines)
+
+        # Initialise the list of times:
+        times = []
+
+        # Repeat the measure several times:
+        for _ in range(rounds):
+
+            # Parse the whole file:
+            start = time.perf_counter()
+            cards = sum(1 for _ in iter_decklist(path))
+            times.append(time.perf_counter() - start)
+
+    # Show the best time:
+    best = min(times)
+    print(f"{lines} líneas, {cards} cartas: {best * 1000:.1f} ms ({lines / best:,.0f} líneas/s)")
+
+# Run the benchmark:
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
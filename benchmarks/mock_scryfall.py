@@ -0,0 +1,301 @@
+#####################################################
+# LOCAL STAND-IN FOR THE SCRYFALL API AND IMAGE CDN #
+#####################################################
+
+# Serves /cards/{set}/{number}, /cards/collection, /cards/search (sets only) and the images with configurable latency,
+# bandwidth, error rate and 429 rate (API only), and counts every request and byte sent.
+
+# Import the required libraries:
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# Pattern of the single card endpoint:
+CARD_PATTERN = re.compile(r'^/cards/([^/?]+)/([^/?]+)$')
+
+# Pattern of the image endpoint:
+IMAGE_PATTERN = re.compile(r'^/images/([^/]+)/([^/]+)/([^/]+)/([^/?]+)$')
+
+# Pattern of the set queries of the search endpoint ('e:neo' or 'set:neo'):
+SET_QUERY_PATTERN = re.compile(r'^(?:e|set):(\w+)$')
+
+# Cards per page of the search endpoint (same as the real one):
+SEARCH_PAGE_SIZE = 175
+
+# Image variants served for every card:
+VARIANTS = ('png', 'large', 'normal', 'small', 'border_crop', 'art_crop')
+
+# Declare the server class:
+class MockScryfall:
+    """Threaded local HTTP server that behaves like the parts of Scryfall used by the downloader"""
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, latency=0.0, bandwidth=None, error_rate=0.0, throttle_rate=0.0, image_size=200_000,
+                 set_size=300):
+
+        # Store the latency added to every answer (seconds):
+        self.latency = latency
+
+        # Store the bandwidth of the image bodies (bytes per second, None for unlimited):
+        self.bandwidth = bandwidth
+
+        # Store the rate of '500' answers and of '429' answers (0 to 1):
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+
+        # Store the size of each image body (bytes):
+        self.image_size = image_size
+
+        # Store the number of cards of every set served by the search endpoint:
+        self.set_size = set_size
+
+        # Initialise the counters:
+        self.counters = {'api': 0, 'collection': 0, 'search': 0, 'image': 0, 'errors': 0, 'throttled': 0, 'bytes': 0,
+                         'not_modified': 0}
+
+        # Lock to update the counters from several request threads:
+        self.lock = threading.Lock()
+
+        # Create the HTTP server on a free local port (with a long listen backlog, so bursts of
+        # connections from the asyncio engine are not dropped):
+        self.server = type("MockServer", (ThreadingHTTPServer,), {'request_queue_size': 1024})(
+            ("127.0.0.1", 0), self.create_handler())
+        self.server.daemon_threads = True
+
+        # Store the base URL:
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+        # Initialise the server thread:
+        self.thread = None
+
+    #
+    # Helper function to update a counter:
+    #
+    def count(self, name, amount=1):
+
+        # Only one thread can update the counters at a time:
+        with self.lock:
+            self.counters[name] += amount
+
+    #
+    # Helper function to build a fake card object:
+    #
+    def card(self, set_code, number):
+
+        # Build the image URLs of a face:
+        def image_uris(face):
+            return {variant: f"{self.url}/images/{set_code}/{number}/{face}/{variant}" for variant in VARIANTS}
+
+        # Build the main data:
+        card = {
+            'object': "card",
+            'id': f"{set_code.lower()}-{number.lower()}",
+            'name': f"Card {number}",
+            'set': set_code.lower(),
+            'collector_number': number
+        }
+
+        # Collector numbers ending in 'd' are double-faced cards:
+        if number.endswith('d'):
+            card['name'] = f"Front {number} // Back {number}"
+            card['card_faces'] = [
+                {'name': f"Front {number}", 'image_uris': image_uris("front")},
+                {'name': f"Back {number}", 'image_uris': image_uris("back")}
+            ]
+
+        # Otherwise, it is a single-faced card:
+        else:
+            card['image_uris'] = image_uris("main")
+
+        # Return the card:
+        return card
+
+    #
+    # Helper function to build a page of the search endpoint (every set has 'set_size' cards, one out of ten double-faced):
+    #
+    def search_page(self, set_code, page):
+
+        # Get the collector numbers of the page:
+        first = (page - 1) * SEARCH_PAGE_SIZE + 1
+        numbers = range(first, min(first + SEARCH_PAGE_SIZE, self.set_size + 1))
+
+        # Build the list:
+        result = {
+            'object': "list",
+            'total_cards': self.set_size,
+            'has_more': first + SEARCH_PAGE_SIZE <= self.set_size,
+            'data': [self.card(set_code, f"{number}d" if number % 10 == 0 else str(number)) for number in numbers]
+        }
+
+        # Add the URL of the next page:
+        if result['has_more']:
+            result['next_page'] = f"{self.url}/cards/search?{urlencode({'q': f'e:{set_code}', 'page': page + 1})}"
+
+        # Return the page:
+        return result
+
+    #
+    # Helper function to create the request handler class bound to this server:
+    #
+    def create_handler(self):
+
+        # Store the server in a variable for the handler:
+        mock = self
+
+        # Declare the handler class:
+        class Handler(BaseHTTPRequestHandler):
+
+            # Keep-alive connections, like the real API:
+            protocol_version = "HTTP/1.1"
+
+            # Don't print every request:
+            def log_message(self, *args):
+                pass
+
+            # Helper function to send an answer:
+            def send(self, status, body=b"", content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.write_body(body, content_type.startswith("image/"))
+
+            # Helper function to write a body, throttled by the bandwidth for images:
+            def write_body(self, body, throttled):
+
+                # Without a bandwidth limit, write everything at once:
+                if not throttled or not mock.bandwidth:
+                    self.wfile.write(body)
+
+                # Otherwise, write it in chunks of 1/20 s:
+                else:
+                    chunk_size = max(1, int(mock.bandwidth / 20))
+                    for i in range(0, len(body), chunk_size):
+                        self.wfile.write(body[i:i + chunk_size])
+                        time.sleep(len(body[i:i + chunk_size]) / mock.bandwidth)
+
+                # Count the bytes:
+                mock.count('bytes', len(body))
+
+            # Helper function to simulate the latency, errors and throttles (returns True if handled):
+            def simulate_failures(self, throttled=True):
+
+                # Add the latency:
+                if mock.latency:
+                    time.sleep(mock.latency)
+
+                # Throttle the request (only the API is rate limited, like the real service):
+                if throttled and random.random() < mock.throttle_rate:
+                    mock.count('throttled')
+                    self.send(429, b'{"object":"error","status":429}', headers={"Retry-After": "1"})
+                    return True
+
+                # Fail the request:
+                if random.random() < mock.error_rate:
+                    mock.count('errors')
+                    self.send(500, b'{"object":"error","status":500}')
+                    return True
+
+                # Let the request through:
+                return False
+
+            # GET requests:
+            def do_GET(self):
+
+                # Images:
+                match = IMAGE_PATTERN.match(self.path)
+                if match:
+                    mock.count('image')
+                    if not self.simulate_failures(throttled=False):
+                        self.send(200, (self.path.encode() * (mock.image_size // len(self.path) + 1))[:mock.image_size], "image/png")
+                    return
+
+                # Single cards (with an ETag, answering '304' to a conditional request for the same one):
+                match = CARD_PATTERN.match(self.path)
+                if match:
+                    mock.count('api')
+                    if not self.simulate_failures():
+                        etag = f'"{match.group(1).lower()}-{match.group(2).lower()}"'
+                        if self.headers.get("If-None-Match") == etag:
+                            mock.count('not_modified')
+                            self.send(304, headers={"ETag": etag})
+                        else:
+                            self.send(200, json.dumps(mock.card(match.group(1), match.group(2))).encode(), headers={"ETag": etag})
+                    return
+
+                # Set searches:
+                url = urlparse(self.path)
+                if url.path == "/cards/search":
+                    mock.count('search')
+                    if not self.simulate_failures():
+                        query = parse_qs(url.query)
+                        match = SET_QUERY_PATTERN.match(query.get('q', [""])[0])
+                        if not match or not mock.set_size:
+                            self.send(404, b'{"object":"error","status":404}')
+                        else:
+                            self.send(200, json.dumps(mock.search_page(match.group(1).lower(), int(query.get('page', ["1"])[0]))).encode())
+                    return
+
+                # Unknown paths:
+                self.send(404, b'{"object":"error","status":404}')
+
+            # POST requests:
+            def do_POST(self):
+
+                # Read the body:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+                # Only the collection endpoint is supported:
+                if self.path != "/cards/collection":
+                    self.send(404, b'{"object":"error","status":404}')
+                    return
+
+                # Count the request:
+                mock.count('collection')
+
+                # Simulate the failures:
+                if self.simulate_failures():
+                    return
+
+                # Build the cards (name identifiers get a fake printing):
+                data = []
+                for identifier in body.get('identifiers', []):
+                    if 'set' in identifier:
+                        data.append(mock.card(identifier['set'], identifier['collector_number']))
+                    else:
+                        data.append(dict(mock.card("nam", str(abs(hash(identifier['name'])) % 10000)), name=identifier['name']))
+
+                # Send the list:
+                self.send(200, json.dumps({'object': "list", 'not_found': [], 'data': data}).encode())
+
+        # Return the handler class:
+        return Handler
+
+    #
+    # Start the server in a background thread:
+    #
+    def start(self):
+
+        # Create and start the thread:
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        # Return the server:
+        return self
+
+    #
+    # Stop the server:
+    #
+    def stop(self):
+
+        # Stop serving and close the socket:
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,298 @@
+#########################################################
+# THIS FILE HAS THE OFFLINE INDEX OF SCRYFALL BULK DATA #
+#########################################################
+
+# Import the required libraries:
+import gzip
+import json
+import re
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+# Declare the class:
+class BulkIndex:
+    """Compact SQLite index of a Scryfall bulk-data dump, keyed by (set, collector number) and by name"""
+
+    # Only the fields needed to download the images are kept:
+    KEEP_FIELDS = ('id', 'name', 'set', 'collector_number', 'layout', 'image_uris', 'card_faces')
+
+    # Fields kept from each face of a multi-faced card:
+    KEEP_FACE_FIELDS = ('name', 'image_uris')
+
+    # Size of each chunk read from the dump (the whole file is never loaded):
+    CHUNK_SIZE = 1024 * 1024
+
+    # Pattern of the text between two objects of the array:
+    SEPARATORS = re.compile(r'[\s\[,]*')
+
+    # Number of cards inserted per transaction:
+    BATCH_SIZE = 1000
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, db_path="indice_offline.sqlite3"):
+
+        # Store the database path:
+        self.db_path = Path(db_path)
+
+        # Create the parent folder if needed:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Open the database (shared by the download workers):
+        self.connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+
+        # Lock to share the connection between threads:
+        self.lock = threading.Lock()
+
+        # Create the table and the name indexes if needed:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS cards ("
+                "set_code TEXT NOT NULL, collector_number TEXT NOT NULL, name TEXT NOT NULL, "
+                "front_name TEXT, released_at TEXT, "
+                "data TEXT NOT NULL, PRIMARY KEY (set_code, collector_number))"
+            )
+
+            # Add the front face name and release date to indexes built by older versions:
+            columns = {row[1] for row in self.connection.execute("PRAGMA table_info(cards)")}
+            if 'front_name' not in columns:
+                self.connection.execute("ALTER TABLE cards ADD COLUMN front_name TEXT")
+                self.connection.execute(
+                    "UPDATE cards SET front_name = CASE WHEN instr(name, ' // ') > 0 "
+                    "THEN substr(name, 1, instr(name, ' // ') - 1) ELSE name END"
+                )
+            if 'released_at' not in columns:
+                self.connection.execute("ALTER TABLE cards ADD COLUMN released_at TEXT")
+
+            # Index both names, so a lookup by name never scans the table:
+            self.connection.execute("CREATE INDEX IF NOT EXISTS cards_name ON cards (name)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS cards_front_name ON cards (front_name)")
+
+    #
+    # Helper function to keep only the fields needed from a card object:
+    #
+    def compact(self, card):
+
+        # Copy the main fields:
+        data = {field: card[field] for field in self.KEEP_FIELDS if field in card}
+
+        # If the card has faces, keep only their names and images:
+        if 'card_faces' in data:
+            data['card_faces'] = [
+                {field: face[field] for field in self.KEEP_FACE_FIELDS if field in face}
+                for face in data['card_faces']
+            ]
+
+        # Return the compact card:
+        return data
+
+    #
+    # Generator that streams the card objects of a JSON array, one at a time:
+    #
+    def iter_cards(self, dump_path):
+
+        # Open the dump (compressed or not) as text:
+        opener = gzip.open if str(dump_path).endswith('.gz') else open
+        with opener(dump_path, 'rt', encoding='utf-8') as f:
+
+            # Create the JSON decoder:
+            decoder = json.JSONDecoder()
+
+            # Initialise the text buffer and the current position inside it:
+            buffer = ""
+            position = 0
+
+            # Flag to know when the end of the file was reached:
+            eof = False
+
+            # Keep going until everything was read:
+            while True:
+
+                # Skip the array symbols and whitespaces between objects:
+                position = self.SEPARATORS.match(buffer, position).end()
+
+                # Try to decode the next object:
+                try:
+
+                    # If the buffer is empty or the array ended, there is nothing to decode yet:
+                    if position >= len(buffer) or buffer[position] == "]":
+                        raise ValueError("Fin del búfer")
+
+                    # Decode the object:
+                    card, position = decoder.raw_decode(buffer, position)
+
+                # If the object is cut in half (or the buffer is empty), read more text:
+                except ValueError:
+
+                    # At the end of the file, stop if everything was decoded:
+                    if eof:
+
+                        # Stop if only the end of the array is left:
+                        if position >= len(buffer) or buffer[position] == "]":
+                            return
+
+                        # Otherwise, the file is damaged:
+                        raise
+
+                    # Read the next chunk:
+                    chunk = f.read(self.CHUNK_SIZE)
+                    eof = not chunk
+
+                    # Keep only the text not decoded yet, so memory stays bounded:
+                    buffer = buffer[position:] + chunk
+                    position = 0
+                    continue
+
+                # Return the card:
+                yield card
+
+    #
+    # Ingest a bulk-data dump ('default_cards' or 'all_cards'):
+    #
+    def ingest(self, dump_path, log=print):
+
+        # Initialise the list of rows to insert:
+        rows = []
+
+        # Initialise the counter:
+        count = 0
+
+        # Iterate through each card of the dump:
+        for card in self.iter_cards(dump_path):
+
+            # Skip objects that are not cards (or have no printing data):
+            if card.get('object') != 'card' or 'set' not in card:
+                continue
+
+            # Get the name (keys are lowercase, like the downloader keys):
+            name = card.get('name', '').lower()
+
+            # Add the row (double-faced cards also store the name of their front face):
+            rows.append((
+                card['set'].lower(),
+                str(card['collector_number']).lower(),
+                name,
+                name.split(" // ")[0],
+                card.get('released_at'),
+                json.dumps(self.compact(card), separators=(',', ':'))
+            ))
+
+            # If the batch is full:
+            if len(rows) >= self.BATCH_SIZE:
+
+                # Insert it:
+                count += self.insert(rows)
+                rows = []
+
+                # Log the progress:
+                log(f"Indexadas: {count} cartas")
+
+        # Insert the last rows:
+        count += self.insert(rows)
+
+        # Log the final count:
+        log(f"Índice offline completado: {count} cartas")
+
+        # Return the number of indexed cards:
+        return count
+
+    #
+    # Helper function to insert a batch of rows:
+    #
+    def insert(self, rows):
+
+        # Only one thread can use the connection at a time:
+        with self.lock, self.connection:
+
+            # Insert or replace the rows:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO cards "
+                "(set_code, collector_number, name, front_name, released_at, data) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+        # Return the number of rows:
+        return len(rows)
+
+    #
+    # Get a card by set code and collector number (None if it is not indexed):
+    #
+    def get(self, set_code, collector_number):
+
+        # Only one thread can use the connection at a time:
+        with self.lock:
+
+            # Look for the card:
+            row = self.connection.execute(
+                "SELECT data FROM cards WHERE set_code = ? AND collector_number = ?",
+                (str(set_code).lower(), str(collector_number).lower())
+            ).fetchone()
+
+        # Return the card object:
+        return json.loads(row[0]) if row else None
+
+    #
+    # Get every printing of a set, in collector number order (empty if the set is not indexed):
+    #
+    def get_set(self, set_code):
+
+        # Only one thread can use the connection at a time:
+        with self.lock:
+
+            # Look for the cards (the primary key starts with the set code):
+            rows = self.connection.execute(
+                "SELECT data FROM cards WHERE set_code = ? "
+                "ORDER BY CAST(collector_number AS INTEGER), collector_number",
+                (str(set_code).lower(),)
+            ).fetchall()
+
+        # Return the card objects:
+        return [json.loads(row[0]) for row in rows]
+
+    #
+    # Get a printing of a card by its name (None if it is not indexed):
+    #
+    def get_by_name(self, name):
+
+        # Only one thread can use the connection at a time:
+        with self.lock:
+
+            # Look for the newest printing (double-faced cards also match their front face name,
+            # both columns are indexed and ties are broken by set and collector number):
+            row = self.connection.execute(
+                "SELECT data FROM cards WHERE name = ? OR front_name = ? "
+                "ORDER BY released_at DESC, set_code, collector_number LIMIT 1",
+                (name.lower(), name.lower())
+            ).fetchone()
+
+        # Return the card object:
+        return json.loads(row[0]) if row else None
+
+    #
+    # Close the database:
+    #
+    def close(self):
+
+        # Close the connection:
+        with self.lock:
+            self.connection.close()
+
+# Ingest a dump from the command line: python bulk_index.py <dump.json> [index.sqlite3]
+if __name__ == "__main__":
+
+    # Check the arguments:
+    if len(sys.argv) < 2:
+        print("Uso: python bulk_index.py <default_cards.json> [indice_offline.sqlite3]")
+        sys.exit(2)
+
+    # Create the index:
+    index = BulkIndex(sys.argv[2] if len(sys.argv) > 2 else "indice_offline.sqlite3")
+
+    # Ingest the dump:
+    index.ingest(sys.argv[1])
+
+    # Close the index:
+    index.close()
@@ -0,0 +1,189 @@
+###############################################
+# THIS FILE HAS THE STREAMING DECKLIST PARSER #
+###############################################
+
+# Supported line formats:
+#   Moxfield:          1 Lightning Bolt (M10) 146 *F*
+#   Arena / MTGO:      4 Lightning Bolt   or   4x Lightning Bolt
+#   Name only:         Lightning Bolt
+#   Section headers:   Deck, Sideboard, Commander, Companion, Maybeboard ("SIDEBOARD:", "// Sideboard"...)
+#   Type headers:      Creatures (20), Lands: 24, Instants... (skipped, the section doesn't change)
+#   About block:       About + Name My Deck (Arena exports, skipped until the next section or empty line)
+#   Comments:          # comment   or   // comment   or   //comment
+
+# Import the required libraries:
+import re
+
+# Pattern of the unwanted symbols at the end of a line, such as *F* (foil), *E* (etched) or ★:
+SYMBOLS_PATTERN = re.compile(r'\s*(\*[A-Z]\*|★)\s*$')
+
+# Pattern of a line with a quantity: Moxfield (name, set code and collector number) or Arena/MTGO (name only):
+CARD_PATTERN = re.compile(r'^(\d+)x?\s+(.+?)(?:\s+\(([A-Za-z0-9]+)\)\s+(\S+))?$')
+
+# Pattern of the section headers:
+SECTION_PATTERN = re.compile(
+    r'^(?://\s*)?(deck|main|mainboard|sideboard|commander|commanders|companion|maybeboard|considering|about)'
+    r'\s*:?\s*(?:\(\d+\))?$',
+    re.IGNORECASE
+)
+
+# Pattern of the card type headers of the grouped exports (e.g. "Creatures (20)"), they are not card names:
+TYPE_HEADER_PATTERN = re.compile(
+    r'^(creatures?|instants?|sorcer(?:y|ies)|artifacts?|enchantments?|planeswalkers?|lands?|battles?|tokens?|'
+    r'spells|other)\s*:?\s*(?:\(\d+\)|\d+)?$',
+    re.IGNORECASE
+)
+
+# Declare the card request class:
+class CardRequest:
+    """A single decklist line: the quantity, the card name and, if given, the exact printing"""
+
+    # Slots keep each record small (decklists can have thousands of lines):
+    __slots__ = ('quantity', 'name', 'set', 'collector_number', 'section')
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, quantity, name, set=None, collector_number=None, section="deck"):
+
+        # Store the number of copies:
+        self.quantity = quantity
+
+        # Store the card name:
+        self.name = name
+
+        # Store the set code (None for name-only lines):
+        self.set = set
+
+        # Store the collector number (None for name-only lines):
+        self.collector_number = collector_number
+
+        # Store the decklist section (deck, sideboard, commander...):
+        self.section = section
+
+    #
+    # Key used to store the resolved card (the printing, or the name if there is no printing):
+    #
+    def key(self):
+
+        # If the exact printing is known:
+        if self.set:
+
+            # Use the set code and the collector number (lowercase, like the Scryfall data):
+            return (self.set.lower(), self.collector_number.lower())
+
+        # Otherwise, use the name:
+        return ("", self.name.lower())
+
+    #
+    # Identifier for the Scryfall '/cards/collection' endpoint:
+    #
+    def identifier(self):
+
+        # If the exact printing is known, ask for it:
+        if self.set:
+            return {"set": self.set, "collector_number": self.collector_number}
+
+        # Otherwise, ask for the card by name:
+        return {"name": self.name}
+
+    #
+    # Text representation (for debugging):
+    #
+    def __repr__(self):
+        return f"CardRequest({self.quantity}, {self.name!r}, {self.set!r}, {self.collector_number!r}, {self.section!r})"
+
+#
+# Parse a single line (returns the new section name for headers, a CardRequest, or None):
+#
+def parse_line(line, section="deck"):
+
+    # Remove whitespaces from the beginning and end:
+    line = line.strip()
+
+    # Check if the line is empty or a comment:
+    if not line or line.startswith('#'):
+        return None
+
+    # Remove unwanted symbols such as *F* (foil), ★, and others:
+    if line[-1] in '*★':
+        line = SYMBOLS_PATTERN.sub('', line)
+
+    # Lines starting with a quantity are the most common ones, so try them first:
+    if line[0].isdigit():
+
+        # Try the Moxfield and Arena/MTGO formats at once:
+        match = CARD_PATTERN.match(line)
+        if match:
+
+            # Unpack the groups (the set code and the collector number are None in Arena/MTGO lines):
+            quantity, name, set_code, collector_number = match.groups()
+
+            # Return the card:
+            return CardRequest(int(quantity), name, set_code.upper() if set_code else None, collector_number, section)
+
+    # Check if the line is a section header:
+    match = SECTION_PATTERN.match(line)
+    if match:
+
+        # Return the section name:
+        return match.group(1).lower()
+
+    # Any other line starting with '//' is a comment:
+    if line.startswith('//'):
+        return None
+
+    # The lines of the 'About' block are the deck details, not cards:
+    if section == "about":
+        return None
+
+    # Card type headers are skipped:
+    if TYPE_HEADER_PATTERN.match(line):
+        return None
+
+    # A line with no letters can't be a card name:
+    if not any(char.isalpha() for char in line):
+        raise ValueError(line)
+
+    # Otherwise, it is a name-only line (one copy):
+    return CardRequest(1, line, section=section)
+
+#
+# Generator that parses a decklist file line by line (the file is never read at once):
+#
+def iter_decklist(file_path, log=None):
+
+    # Start in the main deck section:
+    section = "deck"
+
+    # Open the file:
+    with open(file_path, 'r', encoding='utf-8') as f:
+
+        # Iterate through each line:
+        for line in f:
+
+            # The 'About' block ends with the first empty line:
+            if section == "about" and not line.strip():
+                section = "deck"
+
+            # Parse the line:
+            try:
+                result = parse_line(line, section)
+
+            # If the line can't be parsed:
+            except ValueError:
+
+                # Log the error message:
+                if log:
+                    log(f"No se pudo parsear: {line.strip()}")
+
+                # Move on to the next line:
+                continue
+
+            # If it is a section header, change the current section:
+            if isinstance(result, str):
+                section = result
+
+            # If it is a card, return it:
+            elif result is not None:
+                yield result
@@ -0,0 +1,489 @@
+##################################################
+# THIS FILE HAS THE SHARED DOWNLOAD SERVICE MODE #
+##################################################
+
+# Usage (one server for the whole shop, every client posts its decklists to it):
+#   python download_server.py [--host 0.0.0.0] [--port 8080] [--jobs trabajos] [--cache cache] [-w 8]
+#
+#   POST /jobs?dfc=both          decklist text in the body -> job (same decklist = same job)
+#   GET  /jobs                   every job
+#   GET  /jobs/<id>              status, statistics and files of a job
+#   GET  /jobs/<id>/files/<name> one image of a finished job
+#   GET  /jobs/<id>/zip          every image of a finished job in a ZIP (stored, streamed)
+
+# Import the required libraries:
+import argparse
+import hashlib
+import json
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+# Import the downloader and the multi-deck batch scheduler:
+from scryfall_downloader import ScryfallDownloader
+from batch_scheduler import BatchScheduler
+
+# Declare the class:
+class DownloadServer:
+    """HTTP service that queues decklist jobs and runs them with one shared downloader (session, rate limiter, caches)"""
+
+    # Largest decklist accepted (bytes):
+    MAX_BODY = 1024 * 1024
+
+    # Valid DFC policies of a job:
+    DFC_POLICIES = ("front", "back", "both")
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, downloader, jobs_folder="trabajos", host="127.0.0.1", port=8080):
+
+        # Store the shared downloader (every job uses its session, rate limiter and caches):
+        self.downloader = downloader
+
+        # Store the folder of the jobs (one subfolder per job, with its decklist and images):
+        self.jobs_folder = Path(jobs_folder)
+        self.jobs_folder.mkdir(parents=True, exist_ok=True)
+
+        # The summary of each run points at the jobs folder:
+        self.downloader.output_folder = self.jobs_folder
+
+        # Receive the progress events of the downloader (the deck events update the jobs):
+        self.event_callback = downloader.event_callback
+        self.downloader.event_callback = self.handle_event
+
+        # Jobs, keyed by id:
+        self.jobs = {}
+
+        # Condition to queue the jobs and wake up the runner:
+        self.condition = threading.Condition()
+
+        # Load the jobs of previous runs:
+        self.load_jobs()
+
+        # Create the HTTP server (one thread per request, the downloads run in the runner thread):
+        self.server = ThreadingHTTPServer((host, port), self.create_handler())
+        self.server.daemon_threads = True
+
+        # Initialise the runner thread and the stop flag:
+        self.runner = None
+        self.stopping = False
+
+    #
+    # Helper function to get the folder of a job:
+    #
+    def job_folder(self, job_id):
+        return self.jobs_folder / job_id
+
+    #
+    # Helper function to save the state of a job (so it survives a restart):
+    #
+    def save_job(self, job):
+
+        # Write the file in a single step:
+        path = self.job_folder(job['id']) / "job.json"
+        temp_path = path.with_name("job.json.tmp")
+        temp_path.write_text(json.dumps(job, indent=2, ensure_ascii=False), encoding="utf-8")
+        temp_path.replace(path)
+
+    #
+    # Helper function to load the jobs saved by previous runs:
+    #
+    def load_jobs(self):
+
+        # Iterate through each saved job:
+        for path in sorted(self.jobs_folder.glob("*/job.json")):
+
+            # Attempt to read it:
+            try:
+                job = json.loads(path.read_text(encoding="utf-8"))
+
+            # Skip the damaged files:
+            except (OSError, ValueError):
+                continue
+
+            # Jobs interrupted by the restart go back to the queue (their manifests skip what was done):
+            if job.get('status') in ("queued", "running"):
+                job['status'] = "queued"
+
+            # Store the job:
+            self.jobs[job['id']] = job
+
+    #
+    # Submit a decklist (returns the job and whether it already existed):
+    #
+    def submit(self, text, dfc_policy="both"):
+
+        # Normalise the decklist, so the same list always gives the same job:
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+        # The id is the hash of the decklist and the options:
+        digest = hashlib.sha256("\n".join([dfc_policy, *self.downloader.image_variants, *lines]).encode("utf-8"))
+        job_id = digest.hexdigest()[:16]
+
+        # Only one request can queue jobs at a time:
+        with self.condition:
+
+            # If the job exists and didn't fail, return it (the decklist is downloaded only once):
+            job = self.jobs.get(job_id)
+            if job and job['status'] != "failed":
+                return job, True
+
+            # Write the decklist in the job folder:
+            folder = self.job_folder(job_id)
+            folder.mkdir(parents=True, exist_ok=True)
+            (folder / "decklist.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+            # Create the job:
+            job = {
+                'id': job_id,
+                'status': "queued",
+                'dfc': dfc_policy,
+                'lines': len(lines),
+                'submitted': time.time(),
+                'finished': None,
+                'successful': 0,
+                'failed': 0,
+                'total': 0
+            }
+
+            # Store it and wake up the runner:
+            self.jobs[job_id] = job
+            self.save_job(job)
+            self.condition.notify()
+
+        # Return the new job:
+        return job, False
+
+    #
+    # Helper function to receive the progress events of the downloader:
+    #
+    def handle_event(self, event):
+
+        # Send the event to the original callback, if provided:
+        if self.event_callback:
+            self.event_callback(event)
+
+        # The deck events carry the result of each job:
+        if event.get('event') != "deck":
+            return
+
+        # Only one thread can use the jobs at a time:
+        with self.condition:
+
+            # Get the job of the deck (the decklist is inside its folder):
+            job = self.jobs.get(Path(event['decklist']).parent.name)
+            if not job:
+                return
+
+            # Update the job:
+            job.update(
+                status="failed" if event['file_error'] else "done",
+                finished=time.time(),
+                successful=event['successful'],
+                failed=event['failed'],
+                total=event['total']
+            )
+            self.save_job(job)
+
+    #
+    # Runner thread: take every queued job with the same options and run them as one batch:
+    #
+    def run_jobs(self):
+
+        # The runner is the thread that shows the log messages:
+        self.downloader.owner_thread = threading.get_ident()
+
+        # Keep going until the server stops:
+        while True:
+
+            # Wait for queued jobs, showing the messages of the request threads in the meantime:
+            with self.condition:
+                while not self.stopping and not any(job['status'] == "queued" for job in self.jobs.values()):
+                    self.condition.wait(timeout=1.0)
+                    self.downloader.flush_log()
+
+                # Stop if requested:
+                if self.stopping:
+                    return
+
+                # Take the queued jobs of the oldest DFC policy (the same images are fetched once across them):
+                queued = sorted((job for job in self.jobs.values() if job['status'] == "queued"),
+                                key=lambda job: job['submitted'])
+                batch = [job for job in queued if job['dfc'] == queued[0]['dfc']]
+
+                # Mark them as running:
+                for job in batch:
+                    job['status'] = "running"
+                    self.save_job(job)
+
+            # Run the batch:
+            self.run_batch(batch)
+
+    #
+    # Helper function to run a batch of jobs with the shared downloader:
+    #
+    def run_batch(self, batch):
+
+        # Store the downloader in a short variable:
+        d = self.downloader
+
+        # Reset the per-run state (the session, rate limiter and caches are kept):
+        d.stats = {'successful': 0, 'failed': 0, 'total': 0}
+        d.card_data = {}
+        d.decklists = {}
+        d.manifests = {}
+
+        # Give every batch the whole retry budget and closed circuits, so a bad batch doesn't starve the next ones:
+        for policy in d.retry_policies.values():
+            policy.reset()
+        for breaker in d.breakers.values():
+            breaker.reset()
+
+        # Start the metrics from zero (reset in place, the session adapter reports to the same object):
+        d.metrics.reset()
+
+        # Create the batch scheduler with a deck per job:
+        scheduler = BatchScheduler(d)
+        for job in batch:
+            folder = self.job_folder(job['id'])
+            scheduler.add_decklist(folder / "decklist.txt", folder / "imagenes")
+
+        # Log the start of the batch:
+        d.log(f"Procesando {len(batch)} trabajo(s): {', '.join(job['id'] for job in batch)}")
+
+        # Attempt to run it:
+        try:
+            scheduler.run(batch[0]['dfc'])
+
+        # If the batch fails, its jobs fail (they can be submitted again):
+        except Exception as e:
+            d.log(f"Error procesando los trabajos: {e}")
+
+        # Save the cache index (its saves are throttled while the batch runs):
+        if d.image_cache:
+            d.image_cache.save()
+
+        # Any job with no deck event failed:
+        with self.condition:
+            for job in batch:
+                if job['status'] == "running":
+                    job.update(status="failed", finished=time.time())
+                    self.save_job(job)
+
+    #
+    # Helper function to list the images of a job (relative names, in order):
+    #
+    def job_files(self, job_id):
+
+        # Get the images folder:
+        folder = self.job_folder(job_id) / "imagenes"
+
+        # Return every image (the manifest and temporary files are skipped):
+        return [
+            path.relative_to(folder).as_posix()
+            for path in sorted(folder.rglob("*"))
+            if path.is_file() and path.name != "manifest.json" and not path.name.endswith((".part", ".tmp"))
+        ]
+
+    #
+    # Helper function to create the request handler class bound to this server:
+    #
+    def create_handler(self):
+
+        # Store the server in a variable for the handler:
+        service = self
+
+        # Declare the handler class:
+        class Handler(BaseHTTPRequestHandler):
+
+            # Send the requests to the downloader log instead of stderr:
+            def log_message(self, format, *args):
+                service.downloader.log(f"{self.address_string()} {format % args}")
+
+            # Helper function to send a JSON answer:
+            def send_json(self, status, data):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # Helper function to send an error:
+            def send_message(self, status, message):
+                self.send_json(status, {'error': message})
+
+            # Submit a decklist:
+            def do_POST(self):
+
+                # Only the jobs collection accepts submissions:
+                url = urlparse(self.path)
+                if url.path.rstrip("/") != "/jobs":
+                    return self.send_message(404, "Ruta desconocida")
+
+                # Check the DFC policy:
+                dfc_policy = parse_qs(url.query).get('dfc', ["both"])[0]
+                if dfc_policy not in service.DFC_POLICIES:
+                    return self.send_message(400, f"Política de doble cara desconocida: {dfc_policy}")
+
+                # Check the size of the decklist:
+                length = int(self.headers.get("Content-Length") or 0)
+                if not 0 < length <= service.MAX_BODY:
+                    return self.send_message(413 if length else 400, "Decklist vacía o demasiado grande")
+
+                # Read the decklist:
+                text = self.rfile.read(length).decode("utf-8", errors="replace")
+
+                # Queue the job (or get the existing one):
+                job, existing = service.submit(text, dfc_policy)
+
+                # Answer with the job:
+                self.send_json(200 if existing else 202, job)
+
+            # Get the jobs, a job, its files or its ZIP:
+            def do_GET(self):
+
+                # Split the path:
+                parts = [unquote(part) for part in urlparse(self.path).path.strip("/").split("/")]
+
+                # Take a copy of the jobs (the runner thread and other requests update them):
+                with service.condition:
+                    jobs = {job_id: dict(job) for job_id, job in service.jobs.items()}
+
+                # Every job:
+                if parts == ["jobs"]:
+                    return self.send_json(200, list(jobs.values()))
+
+                # Check the job:
+                if len(parts) < 2 or parts[0] != "jobs" or parts[1] not in jobs:
+                    return self.send_message(404, "Trabajo desconocido")
+                job = jobs[parts[1]]
+
+                # Status of the job (with its files once finished):
+                if len(parts) == 2:
+                    files = service.job_files(job['id']) if job['status'] == "done" else []
+                    return self.send_json(200, {**job, 'files': files})
+
+                # The images are only served once the job is finished:
+                if job['status'] != "done":
+                    return self.send_message(409, f"El trabajo no ha terminado ({job['status']})")
+
+                # One image:
+                if parts[2] == "files" and len(parts) > 3:
+                    return self.send_file(job, "/".join(parts[3:]))
+
+                # Every image in a ZIP:
+                if parts[2] == "zip" and len(parts) == 3:
+                    return self.send_zip(job)
+
+                # Unknown route:
+                self.send_message(404, "Ruta desconocida")
+
+            # Helper function to send one image of a job:
+            def send_file(self, job, name):
+
+                # Only the listed images can be served (no paths outside the job):
+                if name not in service.job_files(job['id']):
+                    return self.send_message(404, "Archivo desconocido")
+                path = service.job_folder(job['id']) / "imagenes" / name
+
+                # Send the headers:
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png" if path.suffix == ".png" else "image/jpeg")
+                self.send_header("Content-Length", str(path.stat().st_size))
+                self.end_headers()
+
+                # Send the file in chunks:
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(ScryfallDownloader.CHUNK_SIZE), b""):
+                        self.wfile.write(chunk)
+
+            # Helper function to stream every image of a job in a ZIP (stored, the images are already compressed):
+            def send_zip(self, job):
+
+                # Send the headers (no length: the ZIP is written as it is built and the connection is closed):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/zip")
+                self.send_header("Content-Disposition", f'attachment; filename="{job["id"]}.zip"')
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                # Write each image straight to the socket:
+                folder = service.job_folder(job['id']) / "imagenes"
+                with zipfile.ZipFile(self.wfile, 'w', zipfile.ZIP_STORED) as archive:
+                    for name in service.job_files(job['id']):
+                        archive.write(folder / name, name)
+
+        # Return the handler class:
+        return Handler
+
+    #
+    # Start the runner thread and serve the requests (blocks until stopped):
+    #
+    def serve_forever(self):
+
+        # Start the runner thread:
+        self.runner = threading.Thread(target=self.run_jobs, daemon=True)
+        self.runner.start()
+
+        # Log the address:
+        host, port = self.server.server_address[:2]
+        self.downloader.log(f"Servidor de descargas en http://{host}:{port} ({self.jobs_folder.absolute()})")
+
+        # Serve the requests:
+        self.server.serve_forever()
+
+    #
+    # Stop the server and the runner (safe to call from any thread):
+    #
+    def stop(self):
+
+        # Stop serving the requests:
+        self.server.shutdown()
+        self.server.server_close()
+
+        # Wake up the runner so it stops (a running batch is cancelled):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.downloader.cancel()
+
+        # Wait for the runner:
+        if self.runner:
+            self.runner.join()
+
+# Run the server when called as a script:
+if __name__ == "__main__":
+
+    # Create the argument parser:
+    parser = argparse.ArgumentParser(description="Servidor de descargas compartido (una cola, un limitador y una caché)")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección de escucha (0.0.0.0 para toda la red)")
+    parser.add_argument("--port", type=int, default=8080, help="Puerto de escucha")
+    parser.add_argument("--jobs", default="trabajos", help="Carpeta de los trabajos")
+    parser.add_argument("--cache", default="cache", help="Carpeta de caché de imágenes y metadatos")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="Número de descargas simultáneas")
+    args = parser.parse_args()
+
+    # Create the shared downloader:
+    downloader = ScryfallDownloader(
+        output_folder=args.jobs,
+        workers=args.workers,
+        cache_folder=Path(args.cache) / "imagenes",
+        metadata_db=Path(args.cache) / "metadatos.sqlite3"
+    )
+
+    # Create the server:
+    service = DownloadServer(downloader, args.jobs, args.host, args.port)
+
+    # Serve until Ctrl+C:
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        service.stop()
+
+    # Close the pooled connections and caches:
+    downloader.close()
@@ -10,9 +10,36 @@ from window_functions import error_window, info_window, create_progress_window,
 import tkinter as tk
 from tkinter import filedialog
 
-# File handler library:
+# File handler libraries:
+import os
+import sys
 from pathlib import Path
 
+# Background thread libraries:
+import queue
+import threading
+import time
+
+#
+# Helper function to get the cache folder of the user (the caches don't depend on the current directory):
+#
+def cache_base_folder():
+
+    # Windows keeps the caches in the local application data folder:
+    if sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local")
+
+    # macOS keeps them in the library caches folder:
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+
+    # Linux and the rest follow the XDG base directories:
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+
+    # Return the folder of the program:
+    return base / "MTGDecklistDownloader"
+
 #
 # File selection function:
 #
@@ -43,37 +70,46 @@ def file_select(root):
         # End the function:
         return
 
-    # Create a temporary instance to validate:
-    checker = ScryfallDownloader()
-
-    # Check for double-faced cards:
-    has_dfcs = checker.check_for_dfcs(file_path)
+    # Extract the filename without extension to use as folder name:
+    folder_name = Path(file_path).stem
     
-    # Set the default value to 'front':
-    policy = "front"
+    # Create the full path inside the outputs directory:
+    final_output_path = Path("imagenes_descargadas") / folder_name
 
-    # If there are DFCs:
-    if has_dfcs:
+    # Get the folder of the caches (shared by every decklist, wherever the program is started from):
+    cache_folder = cache_base_folder()
 
-        # Ask for a DFC policy:
-        policy = ask_dfc_option(root)
-        
-        # If the user closed the window (policy is None):
-        if policy is None:
-
-            # Bring back the previous window:
-            root.deiconify()
-            return
+    # Create the downloader instance with the output folder (it keeps the card data between steps):
+    downloader = ScryfallDownloader(output_folder=final_output_path, cache_folder=cache_folder / "imagenes",
+                                    metadata_db=cache_folder / "metadatos.sqlite3")
 
     # Hide the main window:
     root.withdraw()
 
+    # Queue of messages and progress events sent by the download thread:
+    ui_queue = queue.Queue()
+
+    #
+    # Internal function to cancel the download:
+    #
+    def on_cancel():
+
+        # Ask the downloader to stop (it finishes the current chunks and stops):
+        downloader.cancel()
+
+        # Show it in the window:
+        label.config(text="Cancelando...")
+
     # If everything is fine, run the download process and open an extra window:
-    window_progress, _, text_log = create_progress_window(root)
+    window_progress, label, text_log, progress_bar, stats_label = create_progress_window(root, on_cancel)
 
     # Handle the closure of the progress window:
     def on_closing():
 
+        # Stop the download (and free a worker waiting for the DFC policy):
+        downloader.cancel()
+        answered.set()
+
         # Close the window:
         window_progress.destroy()
 
@@ -83,56 +119,172 @@ def file_select(root):
     # Set the window protocol:
     window_progress.protocol("WM_DELETE_WINDOW", on_closing)
 
-    # Extract the filename without extension to use as folder name:
-    folder_name = Path(file_path).stem
-    
-    # Create the full path inside the outputs directory:
-    final_output_path = Path("imagenes_descargadas") / folder_name
+    # Send the downloader messages and events to the queue (never to Tk directly):
+    downloader.log_callback = lambda message: ui_queue.put(("log", message))
+    downloader.event_callback = lambda event: ui_queue.put(("event", event))
+
+    # Dictionary to store the result of the download thread (and the DFC policy chosen in the UI):
+    result = {}
+
+    # Event set when the DFC policy was chosen (or the prompt was closed):
+    answered = threading.Event()
+
+    #
+    # Internal function that runs the DFC check and the download in a background thread:
+    #
+    def worker():
+
+        # Attempt the download process:
+        try:
+
+            # Set the default value to 'front':
+            policy = "front"
+
+            # Check for double-faced cards (this also resolves every card for the download, so it
+            # runs here and not in the UI thread):
+            if downloader.check_for_dfcs(file_path):
+
+                # Ask the UI thread for a DFC policy and wait for the answer:
+                ui_queue.put(("ask_dfc", None))
+                answered.wait()
+                policy = result.get('policy')
+
+                # If the user closed the prompt, stop here:
+                if policy is None:
+                    return
+
+            # Process the decklist file:
+            downloader.process_decklist(file_path, dfc_policy=policy)
+
+        # Catch any critical error during the process:
+        except Exception as e:
+
+            # Send the error to the GUI:
+            result['error'] = e
+
+        # Close the pooled connections and caches:
+        finally:
+            downloader.close()
+
+    # Start the download thread:
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+
+    # Store the start time (for the speed and the remaining time):
+    start_time = time.time()
 
     #
-    # Internal function to update the UI:
+    # Internal function to update the UI with the queued messages, in batches:
     #
-    def update_ui(mensaje):
+    def drain_queue():
+
+        # If the user closed the window, stop updating it:
+        if not window_progress.winfo_exists():
+            return
+
+        # Initialise the list of new log lines:
+        lines = []
+
+        # Read up to 500 queued items per tick:
+        for _ in range(500):
+
+            # Get the next item:
+            try:
+                kind, item = ui_queue.get_nowait()
+
+            # Stop when the queue is empty:
+            except queue.Empty:
+                break
+
+            # If it is a log message:
+            if kind == "log":
+
+                # Add it to the batch:
+                lines.append(item)
+
+            # If the worker found DFCs, ask for a policy and send it back:
+            elif kind == "ask_dfc":
+                result['policy'] = ask_dfc_option(window_progress)
+                answered.set()
+
+            # If the download started with unknown counts (the decklist is still being read), the bar
+            # moves with no size until the final start event:
+            elif item['event'] == "start" and item['copies'] is None:
+                progress_bar.config(mode="indeterminate")
+                progress_bar.start(20)
+                label.config(text="Descargando imágenes...")
+
+            # If the download started, set the size of the progress bar:
+            elif item['event'] == "start":
+                progress_bar.stop()
+                progress_bar.config(mode="determinate", maximum=max(1, item['copies']))
+                label.config(text=f"Descargando {item['copies']} imágenes...")
+
+            # If a card was finished:
+            elif item['event'] == "card":
 
-        # Insert the message at the end of the text area:
-        text_log.insert(tk.END, mensaje + "\n")
+                # Calculate the speed:
+                done = item['successful'] + item['failed']
+                elapsed = max(time.time() - start_time, 0.001)
+                speed = done / elapsed
 
-        # Auto scrolling to the last line:
-        text_log.see(tk.END)
+                # While the size is unknown, show only the counter and the speed:
+                if str(progress_bar.cget("mode")) == "indeterminate":
+                    stats_label.config(text=f"{done} · {speed:.1f} img/s")
+                    continue
 
-        # Update the window so it doesn't freeze during the process:
-        window_progress.update()
+                # Update the progress bar:
+                progress_bar.config(value=done)
 
-    # Attempt the download process:
-    try:
+                # Calculate the remaining time:
+                remaining = (float(progress_bar.cget("maximum")) - done) / speed if speed else 0
 
-        # Create the downloader instance with the output folder and callback:
-        downloader = ScryfallDownloader(
-            output_folder=final_output_path, 
-            log_callback=update_ui
-        )
+                # Show them:
+                stats_label.config(text=f"{done}/{int(float(progress_bar.cget('maximum')))} · "
+                                        f"{speed:.1f} img/s · quedan {int(remaining)}s")
+
+        # If there are new log lines:
+        if lines:
+
+            # Insert them all at once at the end of the text area:
+            text_log.insert(tk.END, "\n".join(lines) + "\n")
+
+            # Auto scrolling to the last line:
+            text_log.see(tk.END)
+
+        # If the thread is still running or there are messages left, check again later:
+        if thread.is_alive() or not ui_queue.empty():
+            window_progress.after(100, drain_queue)
+            return
 
-        # Process the decklist file:
-        downloader.process_decklist(file_path, dfc_policy=policy)
-        
         # Close the progress window when finished:
-        if window_progress.winfo_exists():
-            window_progress.destroy()
-
-        # Show a success information window:
-        info_window(root, "¡Descarga completada con éxito!")
-        
-    # Catch any critical error during the process:
-    except Exception as e:
-
-        # If the progress window still exists:
-        if window_progress.winfo_exists(): 
-            
-            # Close it:
-            window_progress.destroy()
-
-        # Bring back the main window:
-        root.deiconify()
+        window_progress.destroy()
+
+        # If the DFC prompt was closed, go back to the main window:
+        if answered.is_set() and result.get('policy') is None:
+            root.deiconify()
+            return
+
+        # If there was a critical error:
+        if 'error' in result:
+
+            # Bring back the main window:
+            root.deiconify()
+
+            # Show an error window with the critical error details:
+            error_window(root, f"Error crítico: {str(result['error'])}")
+
+        # If the download was cancelled:
+        elif downloader.cancel_event.is_set():
+
+            # Show an information window:
+            info_window(root, "Descarga cancelada. Al repetirla solo se descargará lo que falta.")
+
+        # If everything went fine:
+        else:
+
+            # Show a success information window:
+            info_window(root, "¡Descarga completada con éxito!")
 
-        # Show an error window with the critical error details:
-        error_window(root, f"Error crítico: {str(e)}")
\ No newline at end of file
+    # Start updating the UI:
+    window_progress.after(100, drain_queue)
@@ -0,0 +1,233 @@
+#############################################
+# THIS FILE HAS THE LOCAL IMAGE CACHE CLASS #
+#############################################
+
+# Import the required libraries:
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Declare the class:
+class ImageCache:
+    """On-disk image cache shared between decklists, with a size cap and LRU eviction"""
+
+    # Default size cap (2 GB):
+    DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+    # Name of the index file:
+    INDEX_NAME = "index.json"
+
+    # Minimum number of seconds between two saves of the index while the run is going:
+    SAVE_INTERVAL = 1.0
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, folder="cache_imagenes", max_bytes=DEFAULT_MAX_BYTES):
+
+        # Store the cache folder path:
+        self.folder = Path(folder)
+
+        # Store the size cap:
+        self.max_bytes = max_bytes
+
+        # Create the cache folder if needed:
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+        # Store the index file path:
+        self.index_path = self.folder / self.INDEX_NAME
+
+        # Lock to share the cache between download workers:
+        self.lock = threading.Lock()
+
+        # Store the time of the last save:
+        self.last_save = 0
+
+        # Load the index (key -> file, size and last use time):
+        self.index = self.load_index()
+
+        # Keep the total size, so the cache is only sorted when it is over the cap:
+        self.total = sum(entry['size'] for entry in self.index.values())
+
+        # Images being linked or copied right now (key -> number of users), never evicted until released:
+        self.pinned = {}
+
+    #
+    # Helper function to load the index from disk:
+    #
+    def load_index(self):
+
+        # Attempt to read the index:
+        try:
+
+            # Open the index file:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+
+                # Return the parsed entries:
+                return json.load(f)
+
+        # If the index doesn't exist or is damaged, start from scratch:
+        except (OSError, ValueError):
+            return {}
+
+    #
+    # Helper function to save the index to disk:
+    #
+    def save(self, force=True):
+
+        # Only one thread can save the index at a time:
+        with self.lock:
+
+            # Skip the save if the last one was very recent (unless forced, e.g. when the run ends):
+            if not force and time.time() - self.last_save < self.SAVE_INTERVAL:
+                return
+
+            # Write to a temporary file first:
+            temp_path = self.index_path.with_suffix(".tmp")
+
+            # Open the temporary file:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+
+                # Write the entries:
+                json.dump(self.index, f)
+
+            # Replace the old index in a single step:
+            os.replace(temp_path, self.index_path)
+
+            # Store the time of the save:
+            self.last_save = time.time()
+
+    #
+    # Helper function to build the key of an image:
+    #
+    def key(self, card_id, face, variant):
+
+        # Join the Scryfall card id, the face and the image variant:
+        return f"{card_id}_{face or 'main'}_{variant}"
+
+    #
+    # Helper function to get the path where an image is stored:
+    #
+    def path_for(self, key):
+
+        # Hash the key to get a safe filename:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+        # Split the files in subfolders to avoid huge directories:
+        path = self.folder / digest[:2] / digest
+
+        # Create the subfolder if needed:
+        path.parent.mkdir(exist_ok=True)
+
+        # Return the path:
+        return path
+
+    #
+    # Get the path of a cached image (None if it is not in the cache), pinned until 'release' is called:
+    #
+    def get(self, key):
+
+        # Only one thread can read the index at a time:
+        with self.lock:
+
+            # Get the entry:
+            entry = self.index.get(key)
+
+            # If the image is not in the cache:
+            if entry is None:
+                return None
+
+            # Build the path of the file:
+            path = self.folder / entry['file']
+
+            # If the file was deleted by hand, forget the entry:
+            if not path.exists():
+                self.total -= self.index.pop(key)['size']
+                return None
+
+            # Mark the image as recently used and pin it:
+            entry['last_used'] = time.time()
+            self.pinned[key] = self.pinned.get(key, 0) + 1
+
+            # Return the path:
+            return path
+
+    #
+    # Release an image pinned by 'get' or 'add' (it can be evicted again once every user released it):
+    #
+    def release(self, key):
+
+        # Only one thread can update the pins at a time:
+        with self.lock:
+
+            # Decrease the number of users, forgetting the pin when there are none left:
+            if self.pinned.get(key, 0) > 1:
+                self.pinned[key] -= 1
+            else:
+                self.pinned.pop(key, None)
+
+    #
+    # Register an image already written to 'path_for(key)' (pinned like 'get', until 'release' is called):
+    #
+    def add(self, key):
+
+        # Get the path of the file:
+        path = self.path_for(key)
+
+        # Only one thread can update the index at a time:
+        with self.lock:
+
+            # Forget the size of a previous entry with the same key:
+            if key in self.index:
+                self.total -= self.index[key]['size']
+
+            # Store the entry:
+            self.index[key] = {
+                'file': path.relative_to(self.folder).as_posix(),
+                'size': path.stat().st_size,
+                'last_used': time.time()
+            }
+            self.total += self.index[key]['size']
+
+            # Pin it (the caller links or copies it next):
+            self.pinned[key] = self.pinned.get(key, 0) + 1
+
+            # Remove old images if the cache is too big:
+            if self.total > self.max_bytes:
+                self.evict()
+
+        # Save the index (at most once per interval, the last save is forced when the run ends):
+        self.save(force=False)
+
+    #
+    # Helper function to remove the least recently used images until the cache fits the cap:
+    #
+    def evict(self):
+
+        # Sort the entries from the oldest to the newest use:
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]['last_used']):
+
+            # Stop when the cache fits the cap:
+            if self.total <= self.max_bytes:
+                break
+
+            # Skip the pinned images (a worker is linking or copying them right now):
+            if key in self.pinned:
+                continue
+
+            # Delete the file (hardlinked copies in output folders keep their data):
+            try:
+                (self.folder / entry['file']).unlink()
+
+            # If the file was already removed:
+            except FileNotFoundError:
+                pass
+
+            # Remove the entry:
+            del self.index[key]
+
+            # Update the size:
+            self.total -= entry['size']
@@ -0,0 +1,189 @@
+########################################
+# THIS FILE HAS THE JOB MANIFEST CLASS #
+########################################
+
+# Import the required libraries:
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Declare the class:
+class JobManifest:
+    """Per output folder record of every planned file, its source, size, checksum and status"""
+
+    # Name of the manifest file inside the output folder:
+    FILE_NAME = "manifest.json"
+
+    # Minimum number of seconds between two saves while the run is going:
+    SAVE_INTERVAL = 1.0
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, output_folder):
+
+        # Store the manifest path:
+        self.path = Path(output_folder) / self.FILE_NAME
+
+        # Lock to share the manifest between download workers:
+        self.lock = threading.Lock()
+
+        # Store the time of the last save:
+        self.last_save = 0
+
+        # Cache of checksums, keyed by file identity (hardlinked copies are only read once):
+        self.digests = {}
+
+        # Load the entries from a previous run (filename -> url, size, checksum and status):
+        self.entries = self.load()
+
+    #
+    # Helper function to load the manifest from disk:
+    #
+    def load(self):
+
+        # Attempt to read the manifest:
+        try:
+
+            # Open the manifest file:
+            with open(self.path, 'r', encoding='utf-8') as f:
+
+                # Return the entries:
+                return json.load(f).get('files', {})
+
+        # If there is no manifest or it is damaged, start from scratch:
+        except (OSError, ValueError):
+            return {}
+
+    #
+    # Save the manifest to disk:
+    #
+    def save(self, force=True):
+
+        # Only one thread can save at a time:
+        with self.lock:
+
+            # Skip the save if the last one was very recent (unless forced):
+            if not force and time.time() - self.last_save < self.SAVE_INTERVAL:
+                return
+
+            # Write to a temporary file first:
+            temp_path = self.path.with_suffix(".tmp")
+
+            # Open the temporary file:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+
+                # Write the entries:
+                json.dump({'files': self.entries}, f, indent=1, ensure_ascii=False)
+
+            # Replace the old manifest in a single step:
+            os.replace(temp_path, self.path)
+
+            # Store the save time:
+            self.last_save = time.time()
+
+    #
+    # Helper function to calculate the checksum of a file:
+    #
+    def checksum(self, filepath):
+
+        # Get the file information:
+        info = os.stat(filepath)
+
+        # Build the identity of the file (hardlinks share it):
+        identity = (info.st_dev, info.st_ino, info.st_size, info.st_mtime_ns)
+
+        # If the file was already read, reuse the checksum:
+        if identity in self.digests:
+            return self.digests[identity]
+
+        # Create the hash:
+        digest = hashlib.sha256()
+
+        # Open the file in BINARY READ MODE:
+        with open(filepath, 'rb') as f:
+
+            # Read it in chunks:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        # Store the checksum:
+        self.digests[identity] = digest.hexdigest()
+
+        # Return it:
+        return self.digests[identity]
+
+    #
+    # Record a planned file and its source URL:
+    #
+    def plan(self, filepath, url):
+
+        # Only one thread can update the entries at a time:
+        with self.lock:
+
+            # Get the previous entry:
+            entry = self.entries.get(filepath.name)
+
+            # If the file is new or its source changed, (re)start it:
+            if entry is None or entry.get('url') != url:
+                self.entries[filepath.name] = {'url': url, 'size': None, 'sha256': None, 'status': "pending"}
+
+        # Save the manifest from time to time:
+        self.save(force=False)
+
+    #
+    # Check whether a file was completed in a previous run and is still valid:
+    #
+    def is_complete(self, filepath, url):
+
+        # Get the entry:
+        entry = self.entries.get(filepath.name)
+
+        # The entry must be complete and come from the same URL:
+        if not entry or entry.get('status') != "done" or entry.get('url') != url:
+            return False
+
+        # Attempt to validate the file on disk:
+        try:
+
+            # The size and the checksum must match:
+            return os.path.getsize(filepath) == entry['size'] and self.checksum(filepath) == entry['sha256']
+
+        # If the file doesn't exist anymore:
+        except OSError:
+            return False
+
+    #
+    # Mark a file as completed:
+    #
+    def mark_done(self, filepath, url):
+
+        # Calculate the size and checksum of the file:
+        size = os.path.getsize(filepath)
+        sha256 = self.checksum(filepath)
+
+        # Only one thread can update the entries at a time:
+        with self.lock:
+
+            # Store the entry:
+            self.entries[filepath.name] = {'url': url, 'size': size, 'sha256': sha256, 'status': "done"}
+
+        # Save the manifest from time to time:
+        self.save(force=False)
+
+    #
+    # Mark a file as failed (it will be retried in the next run):
+    #
+    def mark_failed(self, filepath, url, error):
+
+        # Only one thread can update the entries at a time:
+        with self.lock:
+
+            # Store the entry:
+            self.entries[filepath.name] = {'url': url, 'size': None, 'sha256': None, 'status': "failed", 'error': str(error)}
+
+        # Save the manifest from time to time:
+        self.save(force=False)
@@ -0,0 +1,107 @@
+###############################################
+# THIS FILE HAS THE CARD METADATA CACHE CLASS #
+###############################################
+
+# Import the required libraries:
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Declare the class:
+class MetadataCache:
+    """Persistent SQLite cache of Scryfall card objects, with a TTL and HTTP validators"""
+
+    # Default time to live (7 days, printings almost never change):
+    DEFAULT_TTL = 7 * 24 * 3600
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, db_path="cache_metadatos.sqlite3", ttl=DEFAULT_TTL):
+
+        # Store the database path:
+        self.db_path = Path(db_path)
+
+        # Store the time to live (in seconds):
+        self.ttl = ttl
+
+        # Create the parent folder if needed:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Open the database (shared by the download workers):
+        self.connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+
+        # Lock to share the connection between threads:
+        self.lock = threading.Lock()
+
+        # Create the table if needed:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS cards ("
+                "key TEXT PRIMARY KEY, data TEXT NOT NULL, etag TEXT, "
+                "last_modified TEXT, fetched_at REAL NOT NULL)"
+            )
+
+    #
+    # Get a cached card (None if it is not in the cache):
+    #
+    def get(self, key):
+
+        # Only one thread can use the connection at a time:
+        with self.lock:
+
+            # Look for the card:
+            row = self.connection.execute(
+                "SELECT data, etag, last_modified, fetched_at FROM cards WHERE key = ?", (key,)
+            ).fetchone()
+
+        # If the card is not in the cache:
+        if row is None:
+            return None
+
+        # Unpack the row:
+        data, etag, last_modified, fetched_at = row
+
+        # Return the card with its validators and whether it is still fresh:
+        return {
+            'card': json.loads(data),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': time.time() - fetched_at < self.ttl
+        }
+
+    #
+    # Store a card in the cache:
+    #
+    def put(self, key, card, etag=None, last_modified=None):
+
+        # Only one thread can use the connection at a time:
+        with self.lock, self.connection:
+
+            # Insert or replace the card:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO cards (key, data, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(card), etag, last_modified, time.time())
+            )
+
+    #
+    # Mark a cached card as fresh again (after a '304 Not Modified' answer):
+    #
+    def touch(self, key):
+
+        # Only one thread can use the connection at a time:
+        with self.lock, self.connection:
+
+            # Update the fetch time:
+            self.connection.execute("UPDATE cards SET fetched_at = ? WHERE key = ?", (time.time(), key))
+
+    #
+    # Close the database:
+    #
+    def close(self):
+
+        # Close the connection:
+        with self.lock:
+            self.connection.close()
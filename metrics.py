@@ -0,0 +1,303 @@
+######################################################
+# THIS FILE HAS THE TIMING METRICS OF A DOWNLOAD RUN #
+######################################################
+
+# Import the required libraries:
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Declare the metrics class:
+class Metrics:
+    """Thread-safe timings per stage and counters of a run, exported as JSON or Prometheus text"""
+
+    # Prefix of the Prometheus metric names:
+    PREFIX = "mtg_downloader"
+
+    # Stages reported in the log summary, with their Spanish labels:
+    LABELS = {
+        'connect': "conexión (DNS + TCP)",
+        'tls': "TLS",
+        'ttfb_api': "primer byte API",
+        'ttfb_image': "primer byte imágenes",
+        'transfer': "transferencia",
+        'disk_write': "escritura en disco",
+        'copies': "copias",
+        'limiter_wait': "espera del limitador",
+        'retry_wait': "espera de reintentos"
+    }
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self):
+
+        # Timings of each stage: [count, total seconds, max seconds]:
+        self.timings = {}
+
+        # Counters (requests, bytes, cache hits, retries...):
+        self.counters = {}
+
+        # Lock to update the metrics from several workers:
+        self.lock = threading.Lock()
+
+        # Connection setup time of the request being sent by each thread (taken out of its time to first byte):
+        self.local = threading.local()
+
+    #
+    # Forget every timing and counter (a new run starts, the session keeps reporting to this object):
+    #
+    def reset(self):
+
+        # Only one worker can update the metrics at a time:
+        with self.lock:
+            self.timings = {}
+            self.counters = {}
+
+    #
+    # Register the time spent in a stage:
+    #
+    def observe(self, stage, seconds):
+
+        # Only one worker can update the metrics at a time:
+        with self.lock:
+
+            # Get the timing of the stage (created the first time):
+            timing = self.timings.setdefault(stage, [0, 0.0, 0.0])
+
+            # Add the measure:
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    #
+    # Add the setup time of a connection opened by the current thread (DNS, TCP and TLS):
+    #
+    def add_setup(self, seconds):
+        self.local.setup = getattr(self.local, 'setup', 0.0) + seconds
+
+    #
+    # Get and clear the connection setup time of the current thread (0 if the connection was reused):
+    #
+    def take_setup(self):
+
+        # Get the time:
+        seconds = getattr(self.local, 'setup', 0.0)
+
+        # Clear it for the next request:
+        self.local.setup = 0.0
+
+        # Return the time:
+        return seconds
+
+    #
+    # Add to a counter:
+    #
+    def increment(self, name, amount=1):
+
+        # Only one worker can update the metrics at a time:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    #
+    # Measure the time spent in a block of code:
+    #
+    @contextmanager
+    def timer(self, stage):
+
+        # Store the start time:
+        start = time.perf_counter()
+
+        # Run the block, registering its time even if it fails:
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    #
+    # Build the report of the run:
+    #
+    def report(self):
+
+        # Take a consistent copy of the metrics:
+        with self.lock:
+            timings = {stage: list(timing) for stage, timing in self.timings.items()}
+            counters = dict(self.counters)
+
+        # Build the stages part:
+        stages = {
+            stage: {
+                'count': count,
+                'total': round(total, 4),
+                'mean': round(total / count, 4) if count else 0.0,
+                'max': round(maximum, 4)
+            }
+            for stage, (count, total, maximum) in sorted(timings.items())
+        }
+
+        # Calculate the hit rate of every '<name>_hit' / '<name>_miss' pair:
+        hit_rates = {}
+        for name in counters:
+            if name.endswith(("_hit", "_miss")):
+                base = name.rsplit("_", 1)[0]
+                hits, misses = counters.get(base + "_hit", 0), counters.get(base + "_miss", 0)
+                hit_rates[base] = round(hits / (hits + misses), 4)
+
+        # Return the report:
+        return {'stages': stages, 'counters': dict(sorted(counters.items())), 'hit_rates': hit_rates}
+
+    #
+    # Build the summary lines shown in the log:
+    #
+    def summary_lines(self):
+
+        # Get the report:
+        report = self.report()
+
+        # Initialise the list of lines:
+        lines = []
+
+        # Add a line per measured stage:
+        for stage, label in self.LABELS.items():
+            if stage in report['stages']:
+                timing = report['stages'][stage]
+                lines.append(f"{label}: {timing['total']:.2f}s en {timing['count']} (máx {timing['max']:.2f}s)")
+
+        # Add a line per cache:
+        for name, rate in report['hit_rates'].items():
+            lines.append(f"aciertos {name}: {rate:.0%}")
+
+        # Add the retries:
+        retries = sum(value for name, value in report['counters'].items() if name.startswith("retries_"))
+        if retries or report['counters'].get('throttled'):
+            lines.append(f"reintentos: {retries}, respuestas 429: {report['counters'].get('throttled', 0)}")
+
+        # Return the lines:
+        return lines
+
+    #
+    # Write the report as a JSON file:
+    #
+    def write_json(self, path):
+
+        # Write the file in a single step:
+        self.write_file(path, json.dumps(self.report(), indent=2, ensure_ascii=False))
+
+    #
+    # Write the metrics in the Prometheus text format (for the node_exporter textfile collector):
+    #
+    def write_prometheus(self, path):
+
+        # Get the report:
+        report = self.report()
+
+        # Initialise the list of lines:
+        lines = []
+
+        # Add the stage timings:
+        name = f"{self.PREFIX}_stage_seconds"
+        lines.append(f"# HELP {name} Time spent in each stage of the run.")
+        lines.append(f"# TYPE {name} summary")
+        for stage, timing in report['stages'].items():
+            lines.append(f'{name}_sum{{stage="{stage}"}} {timing["total"]}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {timing["count"]}')
+
+        # Add the longest time of each stage:
+        name = f"{self.PREFIX}_stage_max_seconds"
+        lines.append(f"# HELP {name} Longest single measure of each stage.")
+        lines.append(f"# TYPE {name} gauge")
+        for stage, timing in report['stages'].items():
+            lines.append(f'{name}{{stage="{stage}"}} {timing["max"]}')
+
+        # Add the counters:
+        name = f"{self.PREFIX}_events_total"
+        lines.append(f"# HELP {name} Requests, bytes, cache hits and retries of the run.")
+        lines.append(f"# TYPE {name} counter")
+        for counter, value in report['counters'].items():
+            lines.append(f'{name}{{event="{counter}"}} {value}')
+
+        # Write the file in a single step:
+        self.write_file(path, "\n".join(lines) + "\n")
+
+    #
+    # Helper function to write a file in a single step (readers never see half a file):
+    #
+    def write_file(self, path, text):
+
+        # Write to a temporary file:
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        # Replace the old file:
+        os.replace(temp_path, path)
+
+#
+# Helper function to create a connection pool class whose connections time their setup:
+#
+def timed_pool(pool_class, connection_class, metrics):
+
+    # Declare the connection class:
+    class TimedConnection(connection_class):
+
+        # Time the socket creation (DNS lookup + TCP handshake):
+        def _new_conn(self):
+            start = time.perf_counter()
+            try:
+                return super()._new_conn()
+            finally:
+                self.tcp_time = time.perf_counter() - start
+                metrics.observe('connect', self.tcp_time)
+
+        # Time the whole connection, the rest is the TLS handshake (the whole setup is also kept for the
+        # request being sent, so its time to first byte doesn't count it twice):
+        def connect(self):
+            self.tcp_time = 0.0
+            start = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                metrics.add_setup(time.perf_counter() - start)
+            if isinstance(self, HTTPSConnection):
+                metrics.observe('tls', time.perf_counter() - start - self.tcp_time)
+
+    # Declare the pool class:
+    class TimedPool(pool_class):
+        ConnectionCls = TimedConnection
+
+    # Return the pool class:
+    return TimedPool
+
+# Declare the adapter class:
+class TimedAdapter(HTTPAdapter):
+    """HTTP adapter that registers the connection setup times of its pools"""
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, metrics, **kwargs):
+
+        # Store the metrics (the parent creates the pools, so it must be stored first):
+        self.metrics = metrics
+
+        # Initialise the adapter:
+        super().__init__(**kwargs)
+
+    #
+    # Create the pool manager with the timed pools:
+    #
+    def init_poolmanager(self, *args, **kwargs):
+
+        # Create the pool manager:
+        super().init_poolmanager(*args, **kwargs)
+
+        # Use the timed pools for both schemes:
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': timed_pool(HTTPConnectionPool, HTTPConnection, self.metrics),
+            'https': timed_pool(HTTPSConnectionPool, HTTPSConnection, self.metrics)
+        }
@@ -0,0 +1,216 @@
+##################################################
+# HEADLESS COMMAND LINE ENTRY POINT (NO TKINTER) #
+##################################################
+
+# Usage:
+#   python -m mtg_downloader deck1.txt "decks/*.txt" -o imagenes_descargadas --dfc both -w 8 --cache cache
+#   python -m mtg_downloader --set neo --set mh3 -o imagenes_descargadas --cache cache
+#
+# Every line written to stdout is a JSON progress event. The exit code is 0 when every card
+# was downloaded, 1 when something failed and 2 for invalid arguments.
+
+# Import the required libraries:
+import argparse
+import glob
+import json
+import sys
+import threading
+from pathlib import Path
+
+# Import the downloader (it doesn't import tkinter):
+from scryfall_downloader import ScryfallDownloader
+
+# Import the multi-deck batch scheduler:
+from batch_scheduler import BatchScheduler
+
+# Import the print sheets module (to check whether Pillow is available):
+import print_sheets
+
+# Import the image post-processor:
+from post_process import PostProcessor
+
+# Lock so the JSON lines are never mixed:
+output_lock = threading.Lock()
+
+#
+# Helper function to write a JSON progress event:
+#
+def write_event(event):
+
+    # Only one thread can write at a time:
+    with output_lock:
+
+        # Write the event as a single JSON line:
+        sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+        # Flush it so other programs can read the progress live:
+        sys.stdout.flush()
+
+#
+# Helper function to expand the decklist arguments (files or glob patterns):
+#
+def expand_decklists(patterns):
+
+    # Initialise the list of decklists:
+    decklists = []
+
+    # Iterate through each argument:
+    for pattern in patterns:
+
+        # Expand the glob pattern (sorted, so the order is stable):
+        matches = sorted(glob.glob(pattern))
+
+        # If nothing matched, keep the argument so the error is reported:
+        decklists.extend(matches or [pattern])
+
+    # Return the decklists without duplicates, keeping the order:
+    return list(dict.fromkeys(decklists))
+
+#
+# Helper function to create the argument parser:
+#
+def create_parser():
+
+    # Create the parser:
+    parser = argparse.ArgumentParser(
+        prog="mtg_downloader",
+        description="Descarga las imágenes de una o varias decklists desde Scryfall, sin interfaz gráfica."
+    )
+
+    # Add the arguments:
+    parser.add_argument("decklists", nargs="*", help="Decklists (.txt) o patrones glob")
+    parser.add_argument("--set", action="append", default=[], metavar="CÓDIGO",
+                        help="Descarga todas las cartas de una colección (p. ej. --set neo), repetible")
+    parser.add_argument("-o", "--output", default="imagenes_descargadas",
+                        help="Carpeta de salida (cada decklist va en su propia subcarpeta)")
+    parser.add_argument("--dfc", choices=["front", "back", "both"], default="both",
+                        help="Caras a descargar de las cartas de doble cara")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Número de descargas simultáneas")
+    parser.add_argument("--cache", help="Carpeta de caché de imágenes y metadatos (desactivada por defecto)")
+    parser.add_argument("--offline-index", help="Índice offline creado con bulk_index.py (no usa la API)")
+    parser.add_argument("--profile", choices=list(ScryfallDownloader.IMAGE_PROFILES), default="png",
+                        help="Variante de imagen: png, large, normal, small, border_crop o art_crop")
+    parser.add_argument("--fallback", nargs="*", metavar="VARIANTE",
+                        help="Variantes a probar si una carta no tiene la del perfil (sustituye a las del perfil)")
+    parser.add_argument("--preview", action="store_true",
+                        help="Descarga primero imágenes pequeñas de todo el mazo y después las definitivas")
+    parser.add_argument("--sheets", choices=["pdf", "png"],
+                        help="Compone hojas de impresión 3x3 de cada mazo (necesita Pillow)")
+    parser.add_argument("--page", choices=["a4", "letter"], default="a4", help="Tamaño de página de las hojas")
+    parser.add_argument("--bleed", type=float, default=0.0, help="Sangrado de las hojas en milímetros")
+    parser.add_argument("--crop-marks", action="store_true", help="Dibuja marcas de corte en las hojas")
+    parser.add_argument("--post", nargs="+", choices=list(PostProcessor.PROFILES), metavar="PERFIL",
+                        help="Posprocesa cada imagen: print (sangrado 3 mm, JPEG CMYK) y/o web (JPEG reducido)")
+    parser.add_argument("--archive", choices=["zip", "tar"],
+                        help="Guarda las imágenes de cada mazo en un único archivo ZIP o tar en lugar de sueltas")
+    parser.add_argument("--metrics", help="Guarda un informe JSON con los tiempos de cada etapa")
+    parser.add_argument("--prometheus", help="Guarda las métricas en formato de texto de Prometheus")
+    parser.add_argument("--request-events", action="store_true",
+                        help="Envía un evento por petición con sus tiempos (conexión, primer byte, transferencia y escritura)")
+
+    # Return the parser:
+    return parser
+
+#
+# Main function of the command line:
+#
+def main(argv=None):
+
+    # Parse the arguments:
+    parser = create_parser()
+    args = parser.parse_args(argv)
+
+    # At least one decklist or set is needed:
+    if not args.decklists and not args.set:
+        parser.error("indica al menos una decklist o una colección (--set)")
+
+    # The print sheets and the post-processing read the loose files, so they can't be used with the archives:
+    if args.archive and (args.sheets or args.post):
+        parser.error("--archive no se puede combinar con --sheets ni con --post")
+
+    # The print sheets and the post-processing need Pillow:
+    if (args.sheets or args.post) and print_sheets.Image is None:
+        write_event({"event": "error", "message": "Las hojas de impresión y el posprocesado necesitan Pillow (pip install pillow)"})
+        return 1
+
+    # Expand the decklist arguments:
+    decklists = expand_decklists(args.decklists)
+
+    # Initialise the overall success flag:
+    success = True
+
+    # Create a single downloader for the whole batch, sending the log messages as JSON events:
+    downloader = ScryfallDownloader(
+        output_folder=args.output,
+        log_callback=lambda message: write_event({"event": "log", "message": message}),
+        workers=args.workers,
+        cache_folder=Path(args.cache) / "imagenes" if args.cache else None,
+        metadata_db=Path(args.cache) / "metadatos.sqlite3" if args.cache else None,
+        offline_index=args.offline_index,
+        event_callback=write_event,
+        echo=False,
+        metrics_file=args.metrics,
+        prometheus_file=args.prometheus,
+        image_profile=args.profile,
+        image_fallback=args.fallback,
+        archive_format=args.archive,
+        request_events=args.request_events
+    )
+
+    # Create the batch scheduler (every printing is fetched once across all the decks):
+    scheduler = BatchScheduler(downloader)
+
+    # Add each decklist:
+    for decklist in decklists:
+
+        # If the decklist doesn't exist:
+        if not Path(decklist).is_file():
+
+            # Report the error and move on:
+            write_event({"event": "error", "decklist": decklist, "message": "No existe el archivo"})
+            success = False
+            continue
+
+        # Add the decklist (each one goes in its own subfolder):
+        scheduler.add_decklist(decklist)
+
+    # Add each set (enumerated with the search pages, each one goes in its own subfolder):
+    for set_code in args.set:
+
+        # Attempt to enumerate the set:
+        try:
+            scheduler.add_set(set_code)
+
+        # If it fails, report the error and move on:
+        except Exception as e:
+            write_event({"event": "error", "set": set_code, "message": str(e)})
+            success = False
+
+    # Create the post-processor, if requested (its outputs are cached next to the downloads):
+    post_processor = None
+    if args.post:
+        post_processor = PostProcessor(
+            args.post,
+            cache_folder=Path(args.cache) / "procesado" if args.cache else None,
+            log=downloader.log
+        )
+
+    # Run the batch:
+    sheet_options = {'page_size': args.page, 'bleed': args.bleed, 'crop_marks': args.crop_marks}
+    if scheduler.decks and not scheduler.run(args.dfc, args.preview, args.sheets, sheet_options, post_processor):
+        success = False
+
+    # Wait for the post-processing:
+    if post_processor:
+        post_processor.close()
+        downloader.flush_log()
+
+    # Close the pooled connections and caches:
+    downloader.close()
+
+    # Return the exit code:
+    return 0 if success else 1
+
+# Run the command line when called as a script or with 'python -m mtg_downloader':
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,576 @@
+#############################################
+# THIS FILE HAS THE DOWNLOAD PIPELINE CLASS #
+#############################################
+
+# Import the required libraries:
+import queue
+import threading
+
+# Import the streaming decklist parser:
+from decklist_parser import iter_decklist
+
+# Declare the class:
+class DownloadPipeline:
+    """Producer/consumer pipeline with bounded queues: parse -> resolve (batched) -> fetch (concurrent) -> write"""
+
+    # Marker sent through the queues when a stage has no more items:
+    DONE = object()
+
+    # Seconds the resolve stage waits for more cards before sending an incomplete batch:
+    BATCH_WAIT = 0.2
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, downloader, dfc_policy="both", fetch_workers=4, write_workers=2,
+                 queue_size=64, batch_size=75, variants=None, output_folder=None, compositor=None,
+                 post_processor=None, preview_variants=None, preview_folder=None):
+
+        # Store the downloader (its session, rate limiter, caches and manifests are used by every stage):
+        self.downloader = downloader
+
+        # Store the DFC policy:
+        self.dfc_policy = dfc_policy
+
+        # Store the image variants and the output folder (the downloader ones by default):
+        self.variants = variants
+        self.output_folder = output_folder
+
+        # Store the variants and the folder of the previews (None to skip them): each batch sends its small
+        # images to the fetch stage before the full-size ones, so the previews arrive first in the same run:
+        self.preview_variants = preview_variants
+        self.preview_folder = preview_folder
+
+        # Statistics of the previews (not counted in the run), the previews still in the pipeline and a flag
+        # set once the preview event was sent:
+        self.preview_stats = {'successful': 0, 'failed': 0, 'total': 0}
+        self.previews_left = 0
+        self.preview_sent = False
+
+        # Store the print sheet compositor and the post-processor that receive every written face (None to skip them):
+        self.compositor = compositor
+        self.post_processor = post_processor
+
+        # Store the number of workers of the concurrent stages:
+        self.fetch_workers = max(1, fetch_workers)
+        self.write_workers = max(1, write_workers)
+
+        # Store the number of cards per collection request:
+        self.batch_size = batch_size
+
+        # Create the bounded queues between the stages (a full queue pauses the stage before it):
+        self.resolve_queue = queue.Queue(maxsize=queue_size)
+        self.fetch_queue = queue.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+
+        # Cards with faces still in the pipeline (card -> faces left and result):
+        self.cards = {}
+
+        # Copies numbered so far of each image (keyed by cache key or URL), so a printing repeated in a later
+        # batch continues the numbering instead of overwriting the files:
+        self.copies = {}
+
+        # Lock to update the cards from several workers:
+        self.cards_lock = threading.Lock()
+
+        # Flag set when the resolve stage is done:
+        self.resolved = False
+
+        # Flag set if the decklist couldn't be read:
+        self.file_error = False
+
+    #
+    # Parse stage: read the decklist line by line and send each card to the resolve stage:
+    #
+    def parse_stage(self, file_path, card_infos=None):
+
+        # Store the downloader in a short variable:
+        d = self.downloader
+
+        # Initialise the counters for the start event:
+        cards = 0
+        copies = 0
+
+        # Attempt to read the decklist:
+        try:
+
+            # Use the given cards (set mode), the parsed decklist if the DFC check already read it,
+            # or stream the file:
+            if card_infos is None:
+                card_infos = d.decklists.get(str(file_path))
+            streamed = card_infos is None
+            if streamed:
+                card_infos = iter_decklist(file_path, d.log)
+
+            # Send the start event right away: a list is counted directly, while a streamed file or the set
+            # pages are only counted as they are read (the counts are None until the final event below):
+            if isinstance(card_infos, list):
+                estimate = (len(card_infos), sum(info.quantity for info in card_infos))
+            else:
+                estimate = (None, None)
+            d.emit("start", decklist=str(file_path), cards=estimate[0], copies=estimate[1])
+
+            # Iterate through each card:
+            for info in card_infos:
+
+                # Stop if the run was cancelled:
+                if d.cancel_event.is_set():
+                    break
+
+                # Count the card and its copies:
+                cards += 1
+                copies += info.quantity
+
+                # Send it to the resolve stage (waits if the queue is full):
+                self.resolve_queue.put(info)
+
+            # Send the start event again with the final counts, if they weren't known at the start:
+            if estimate != (cards, copies) and not d.cancel_event.is_set():
+                d.emit("start", decklist=str(file_path), cards=cards, copies=copies)
+
+        # Catch any general file processing errors:
+        except Exception as e:
+
+            # Log the error:
+            d.log(f"Error procesando archivo: {e}")
+
+            # Set the file error flag:
+            self.file_error = True
+
+        # Tell the resolve stage that there are no more cards:
+        finally:
+            self.resolve_queue.put(self.DONE)
+
+    #
+    # Resolve stage: group the cards in batches and resolve them with a single request per batch:
+    #
+    def resolve_stage(self):
+
+        # Initialise the current batch:
+        batch = []
+
+        # Attempt to resolve every card:
+        try:
+
+            # Keep going until the parse stage is done:
+            while True:
+
+                # Get the next card (if the batch has cards, don't wait too long for more):
+                try:
+                    item = self.resolve_queue.get(timeout=self.BATCH_WAIT if batch else None)
+
+                # If no more cards arrived in time, send the incomplete batch:
+                except queue.Empty:
+                    self.resolve_batch(batch)
+                    batch = []
+                    continue
+
+                # If the parse stage is done, send the last batch and stop:
+                if item is self.DONE:
+                    self.resolve_batch(batch)
+                    break
+
+                # Add the card to the batch:
+                batch.append(item)
+
+                # If the batch is full, send it:
+                if len(batch) >= self.batch_size:
+                    self.resolve_batch(batch)
+                    batch = []
+
+        # Tell every fetch worker that there are no more images:
+        finally:
+            for _ in range(self.fetch_workers):
+                self.fetch_queue.put(self.DONE)
+
+            # No more previews will be queued, so the preview event can be sent once they are done:
+            with self.cards_lock:
+                self.resolved = True
+            self.send_preview()
+
+    #
+    # Helper function to resolve a batch and send the faces of each card to the fetch stage:
+    #
+    def resolve_batch(self, batch):
+
+        # Store the downloader in a short variable:
+        d = self.downloader
+
+        # Skip empty batches and cancelled runs:
+        if not batch or d.cancel_event.is_set():
+            return
+
+        # Resolve every card of the batch at once:
+        d.resolve_cards(batch)
+
+        # Initialise the images of the batch, keyed by cache key or URL (the lines of a repeated printing, e.g.
+        # in the deck and the sideboard, share one image with their copies merged):
+        images = {}
+
+        # Initialise the previews of the batch, keyed the same way:
+        previews = {}
+
+        # Iterate through each card:
+        for info in batch:
+
+            # Get the faces to download:
+            try:
+
+                # Get the resolved card object:
+                card_data = d.get_card_data(info)
+
+                # Get the URL, the name suffix and the variant of each face:
+                faces = d.image_urls(card_data, self.dfc_policy, self.variants)
+
+            # Catch any API exceptions:
+            except Exception as e:
+
+                # Log the API error:
+                d.log(f"Error API ({info.name}): {e}")
+
+                # Increment the failed counter:
+                d.add_stats(failed=1)
+
+                # Send the progress event:
+                d.emit_card(info, "failed", str(e))
+
+                # Move on to the next card:
+                continue
+
+            # Get the faces of the preview too, if any (a card with no small image just has no preview):
+            preview_faces = []
+            if self.preview_variants:
+                try:
+                    preview_faces = d.image_urls(card_data, self.dfc_policy, self.preview_variants)
+                except Exception:
+                    pass
+
+            # Add the copies of each face to its image, and of each preview face to its preview:
+            for url, face_suffix, variant in faces:
+                self.add_face(images, info, card_data, url, face_suffix, variant)
+            for url, face_suffix, variant in preview_faces:
+                self.add_face(previews, info, card_data, url, face_suffix, variant)
+
+            # Register the card before its faces start moving:
+            with self.cards_lock:
+                self.cards[info] = {'left': len(faces), 'ok': True, 'cancelled': False}
+
+            # If the card has no faces to download, it is already complete:
+            if not faces:
+                self.finish_card(info)
+
+        # Count the previews before they start moving:
+        with self.cards_lock:
+            self.previews_left += len(previews)
+
+        # Send the previews first (with no cards, so they don't count in the run), then the full-size images:
+        self.send_images(previews, self.preview_folder, preview=True)
+        self.send_images(images, self.output_folder)
+
+    #
+    # Helper function to add the copies of a card face to the image that downloads it:
+    #
+    def add_face(self, images, info, card_data, url, face_suffix, variant):
+
+        # Get the cache key of the face:
+        cache_key = self.downloader.image_cache_key(card_data, face_suffix, variant)
+
+        # Get the image (created the first time it appears in the batch):
+        image = images.setdefault(cache_key or url, {
+            'url': url,
+            'cache_key': cache_key,
+            'card_data': card_data,
+            'face_suffix': face_suffix,
+            'variant': variant,
+            'quantity': 0,
+            'cards': []
+        })
+
+        # Add the copies and the card:
+        image['quantity'] += info.quantity
+        image['cards'].append(info)
+
+    #
+    # Helper function to number the copies of the images of a batch and send them to the fetch stage:
+    #
+    def send_images(self, images, output_folder, preview=False):
+
+        # Iterate through each image:
+        for key, image in images.items():
+
+            # Number its copies after the ones of the previous batches (the previews have their own numbering):
+            counter_key = ("preview", key) if preview else key
+            first = self.copies.get(counter_key, 0) + 1
+            self.copies[counter_key] = first - 1 + image['quantity']
+
+            # Get the numbered files of every copy:
+            filepaths = self.downloader.image_filepaths(image['card_data'], image['face_suffix'], image['quantity'],
+                                                        output_folder, image['variant'], first)
+
+            # Send it to the fetch stage (waits if the queue is full), a preview with no cards:
+            self.fetch_queue.put((None if preview else image['cards'], image['url'], filepaths, image['cache_key']))
+
+    #
+    # Fetch stage worker: download each image once (or take it from the cache):
+    #
+    def fetch_stage(self):
+
+        # Store the downloader in a short variable:
+        d = self.downloader
+
+        # Keep going until the resolve stage is done:
+        while True:
+
+            # Get the next face:
+            item = self.fetch_queue.get()
+
+            # Stop when there are no more faces:
+            if item is self.DONE:
+                return
+
+            # Unpack the image (the cards that use it, its URL, the files of every copy and its cache key):
+            cards, url, filepaths, cache_key = item
+
+            # If the run was cancelled, skip the face:
+            if d.cancel_event.is_set():
+                self.face_done(cards, None, filepaths)
+                continue
+
+            # Attempt the download (checking the previous run also reads and hashes the files):
+            try:
+
+                # If every file was completed in a previous run, there is nothing to download:
+                if d.face_is_complete(url, filepaths):
+                    self.send_written(cards, filepaths)
+                    self.face_done(cards, True, filepaths)
+                    continue
+
+                # Fetch the image once:
+                source_path = d.fetch_face(url, filepaths, cache_key)
+
+            # If anything fails, the face fails (the worker keeps going, so the queues never block):
+            except Exception as e:
+
+                # Record the failure:
+                d.fail_face(url, filepaths, e)
+                self.face_done(cards, False, filepaths)
+                continue
+
+            # Send the image to the write stage (waits if the queue is full):
+            self.write_queue.put((cards, url, filepaths, cache_key, source_path))
+
+    #
+    # Write stage worker: write every copy of each fetched image:
+    #
+    def write_stage(self):
+
+        # Store the downloader in a short variable:
+        d = self.downloader
+
+        # Keep going until the fetch stage is done:
+        while True:
+
+            # Get the next image:
+            item = self.write_queue.get()
+
+            # Stop when there are no more images:
+            if item is self.DONE:
+                return
+
+            # Unpack the image:
+            cards, url, filepaths, cache_key, source_path = item
+
+            # Attempt to write the copies:
+            try:
+
+                # Write every copy and record them:
+                d.fan_out_face(source_path, url, filepaths, cache_key)
+
+                # Send the face to the print sheets and the post-processor:
+                self.send_written(cards, filepaths)
+
+                # Mark the face as done:
+                self.face_done(cards, True, filepaths)
+
+            # If the copies can't be written:
+            except Exception as e:
+
+                # Record the failure:
+                d.fail_face(url, filepaths, e)
+                self.face_done(cards, False, filepaths)
+
+    #
+    # Helper function to send a written face to the print sheets (once, with its number of copies)
+    # and to the post-processor (transformed once, with an output per copy), unless it is a preview:
+    #
+    def send_written(self, cards, filepaths):
+
+        # The previews have no cards and are not sent:
+        if cards is None:
+            return
+
+        # Only if a compositor was given:
+        if self.compositor:
+            self.compositor.add(filepaths[0], len(filepaths))
+
+        # Only if a post-processor was given:
+        if self.post_processor:
+            self.post_processor.add_files(filepaths)
+
+    #
+    # Helper function to record the result of an image in every card that uses it (None if it was cancelled):
+    #
+    def face_done(self, cards, ok, filepaths):
+
+        # If it is a preview, count it in the preview statistics instead:
+        if cards is None:
+            self.preview_done(ok, len(filepaths))
+            return
+
+        # Iterate through each card:
+        for info in cards:
+
+            # Only one worker can update the cards at a time:
+            with self.cards_lock:
+
+                # Get the card state:
+                state = self.cards[info]
+
+                # Update it with the result:
+                state['left'] -= 1
+                if ok is None:
+                    state['cancelled'] = True
+                elif not ok:
+                    state['ok'] = False
+
+                # If the card has faces left, move on to the next card:
+                if state['left'] > 0:
+                    continue
+
+            # The card is complete:
+            self.finish_card(info)
+
+    #
+    # Helper function to record the result of a preview (counted per copy, cancelled previews are not counted):
+    #
+    def preview_done(self, ok, copies):
+
+        # Only one worker can update the previews at a time:
+        with self.cards_lock:
+
+            # One preview less in the pipeline:
+            self.previews_left -= 1
+
+            # Count its copies:
+            if ok is not None:
+                self.preview_stats['total'] += copies
+                self.preview_stats['successful' if ok else 'failed'] += copies
+
+        # Send the preview event if it was the last one:
+        self.send_preview()
+
+    #
+    # Helper function to send the preview event once every preview is done (and no more can be queued):
+    #
+    def send_preview(self):
+
+        # Only one worker can check the previews at a time:
+        with self.cards_lock:
+
+            # Skip it if there is no preview, if some are still in the pipeline, or if it was already sent:
+            if not self.preview_variants or self.previews_left or not self.resolved or self.preview_sent:
+                return
+
+            # Mark it as sent and copy the statistics:
+            self.preview_sent = True
+            stats = dict(self.preview_stats)
+
+        # Send the preview event:
+        self.downloader.emit("preview", decklist=str(self.file_path), output=str(self.preview_folder.absolute()), **stats)
+
+        # Log the end of the preview:
+        self.downloader.log(f"Vista previa lista: {stats['successful']}/{stats['total']}")
+
+    #
+    # Helper function to update the statistics when every face of a card is done:
+    #
+    def finish_card(self, info):
+
+        # Store the downloader in a short variable:
+        d = self.downloader
+
+        # Remove the card state:
+        with self.cards_lock:
+            state = self.cards.pop(info)
+
+        # Cancelled cards are not counted:
+        if state['cancelled']:
+            return
+
+        # If every face was written:
+        if state['ok']:
+
+            # Increment the total and successful counters with every copy:
+            d.add_stats(total=info.quantity, successful=info.quantity)
+
+            # Send the progress event:
+            d.emit_card(info, "ok")
+
+        # If any face failed:
+        else:
+
+            # Increment the total and failed counters with every copy:
+            d.add_stats(total=info.quantity, failed=info.quantity)
+
+            # Send the progress event:
+            d.emit_card(info, "failed")
+
+    #
+    # Helper function to wait for some threads while showing the worker log messages:
+    #
+    def wait_for(self, threads):
+
+        # Keep waiting while any thread is running:
+        while any(thread.is_alive() for thread in threads):
+
+            # Wait a moment for the first thread still running:
+            next(thread for thread in threads if thread.is_alive()).join(timeout=0.1)
+
+            # Show the messages sent by the workers in the meantime:
+            self.downloader.flush_log()
+
+        # Show the last messages:
+        self.downloader.flush_log()
+
+    #
+    # Run the whole pipeline for a decklist (returns False if the file couldn't be read):
+    #
+    def run(self, file_path, card_infos=None):
+
+        # Store the decklist path (for the preview event):
+        self.file_path = file_path
+
+        # Create the threads of each stage:
+        upstream = [
+            threading.Thread(target=self.parse_stage, args=(file_path, card_infos), daemon=True),
+            threading.Thread(target=self.resolve_stage, daemon=True)
+        ]
+        upstream += [threading.Thread(target=self.fetch_stage, daemon=True) for _ in range(self.fetch_workers)]
+        writers = [threading.Thread(target=self.write_stage, daemon=True) for _ in range(self.write_workers)]
+
+        # Start every stage at once, so the stages overlap:
+        for thread in upstream + writers:
+            thread.start()
+
+        # Wait for the parse, resolve and fetch stages:
+        self.wait_for(upstream)
+
+        # Tell every write worker that there are no more images:
+        for _ in range(self.write_workers):
+            self.write_queue.put(self.DONE)
+
+        # Wait for the write stage:
+        self.wait_for(writers)
+
+        # Return True if the decklist was read:
+        return not self.file_error
@@ -0,0 +1,264 @@
+################################################
+# THIS FILE HAS THE IMAGE POST-PROCESSOR CLASS #
+################################################
+
+# Import the required libraries:
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Import the image helpers of the print sheets (Pillow is optional, Image is None without it):
+from print_sheets import Image, SheetCompositor, add_bleed, flatten, mm_to_px
+
+# Import the image cache (the processed outputs are cached like the downloads):
+from image_cache import ImageCache
+
+#
+# Worker function (runs in the process pool): transform an image and save it as a JPEG:
+#
+def transform_image(source_path, target_path, params):
+
+    # Open the image and flatten it to RGB:
+    with Image.open(source_path) as image:
+        image = flatten(image)
+
+    # Print profile: resize to the card size at the given resolution and add the mirrored bleed:
+    if params.get('dpi'):
+        card_size = tuple(mm_to_px(mm, params['dpi']) for mm in SheetCompositor.CARD_SIZE)
+        image = add_bleed(image.resize(card_size, Image.LANCZOS), mm_to_px(params.get('bleed', 0), params['dpi']))
+
+    # Web profile: downscale to the given width, keeping the aspect ratio:
+    if params.get('width') and image.width > params['width']:
+        image = image.resize((params['width'], round(image.height * params['width'] / image.width)), Image.LANCZOS)
+
+    # Convert to the output colour mode:
+    image = image.convert(params.get('mode', "RGB"))
+
+    # Save to a temporary file and rename it in a single step:
+    temp_path = f"{target_path}.{os.getpid()}.tmp"
+    image.save(temp_path, "JPEG", quality=params.get('quality', 90), dpi=(params.get('dpi') or 72,) * 2)
+    os.replace(temp_path, target_path)
+
+# Declare the class:
+class PostProcessor:
+    """Transforms every written image in a process pool (print bleed, CMYK JPEG, web size), with a cache of the outputs"""
+
+    # Transform profiles: parameters and subfolder of the outputs:
+    PROFILES = {
+        'print': ({'dpi': 300, 'bleed': 3.0, 'mode': "CMYK", 'quality': 95}, "impresion"),
+        'web': ({'width': 488, 'mode': "RGB", 'quality': 80}, "web")
+    }
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, profiles=("print", "web"), cache_folder=None, cache_size=ImageCache.DEFAULT_MAX_BYTES,
+                 workers=None, log=print):
+
+        # Pillow is required:
+        if Image is None:
+            raise ImportError("El posprocesado necesita Pillow (pip install pillow)")
+
+        # Check the profiles:
+        for profile in profiles:
+            if profile not in self.PROFILES:
+                raise ValueError(f"Perfil de posprocesado desconocido: {profile}")
+
+        # Store the profiles and the log function:
+        self.profiles = tuple(profiles)
+        self.log = log
+
+        # Create the cache of the outputs, if a folder was given:
+        self.cache = ImageCache(cache_folder, cache_size) if cache_folder else None
+
+        # Create the process pool (spawned, since the downloader threads are running):
+        workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+        # Transforms in flight, in order (bounded, so the writers wait if the pool falls behind):
+        self.pending = deque()
+        self.max_pending = 4 * workers
+
+        # Lock to add images from several workers:
+        self.lock = threading.Lock()
+
+        # Initialise the statistics:
+        self.stats = {'processed': 0, 'cached': 0, 'failed': 0}
+
+    #
+    # Helper function to build the cache key of an output (source hash plus transform parameters):
+    #
+    def cache_key(self, source_path, profile):
+
+        # Hash the source file:
+        digest = hashlib.sha256()
+        with open(source_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        # Join it with the parameters:
+        params = json.dumps(self.PROFILES[profile][0], sort_keys=True)
+        return f"{digest.hexdigest()}_{profile}_{hashlib.sha1(params.encode('utf-8')).hexdigest()[:12]}"
+
+    #
+    # Helper function to get the output paths of a profile (one per copy, next to each file):
+    #
+    def output_paths(self, filepaths, profile):
+
+        # Get the subfolder of the profile:
+        subfolder = self.PROFILES[profile][1]
+
+        # Build the output path of each file:
+        return [path.parent / subfolder / f"{path.stem}.jpg" for path in map(Path, filepaths)]
+
+    #
+    # Helper function to write the copies of an output (hardlinks if possible):
+    #
+    def write_outputs(self, source_path, targets):
+
+        # Iterate through each target:
+        for target in targets:
+
+            # Skip the file itself:
+            if target == source_path:
+                continue
+
+            # Create the folder and remove any previous file:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.unlink(missing_ok=True)
+
+            # Try a hardlink first, otherwise copy the bytes:
+            try:
+                os.link(source_path, target)
+            except OSError:
+                shutil.copyfile(source_path, target)
+
+    #
+    # Add the written files of an image (every copy gets its outputs, the image is transformed once):
+    #
+    def add_files(self, filepaths):
+
+        # Iterate through each profile:
+        for profile in self.profiles:
+
+            # Get the output paths:
+            targets = self.output_paths(filepaths, profile)
+
+            # Attempt to queue the transform:
+            try:
+
+                # Look for the output in the cache:
+                key = self.cache_key(filepaths[0], profile) if self.cache else None
+                cached_path = self.cache.get(key) if key else None
+
+                # If it is cached, write the copies with no processing (then release the cached output):
+                if cached_path:
+                    try:
+                        self.write_outputs(cached_path, targets)
+                    finally:
+                        self.cache.release(key)
+                    with self.lock:
+                        self.stats['cached'] += 1
+                    continue
+
+                # Otherwise, write to the cache (or straight to the first output):
+                target = self.cache.path_for(key) if key else targets[0]
+                target.parent.mkdir(parents=True, exist_ok=True)
+
+                # Only one worker can queue transforms at a time:
+                with self.lock:
+
+                    # Send the transform to the process pool:
+                    future = self.pool.submit(transform_image, str(filepaths[0]), str(target), self.PROFILES[profile][0])
+                    self.pending.append((future, key, target, targets))
+
+                    # Finish the oldest transforms while there are too many in flight:
+                    while len(self.pending) > self.max_pending:
+                        self.finish_next()
+
+            # If it fails, the download itself is still valid:
+            except Exception as e:
+
+                # Log the error:
+                self.log(f"Error en el posprocesado de {Path(filepaths[0]).name}: {e}")
+
+                # Count the failure:
+                with self.lock:
+                    self.stats['failed'] += 1
+
+    #
+    # Helper function to wait for the oldest transform and write its outputs:
+    #
+    def finish_next(self):
+
+        # Get the oldest transform:
+        future, key, target, targets = self.pending.popleft()
+
+        # Attempt to finish it:
+        try:
+
+            # Wait for the result (raises the worker error):
+            future.result()
+
+            # Register the output in the cache and write every copy (then release it, so it can be evicted):
+            if key:
+                self.cache.add(key)
+                try:
+                    self.write_outputs(target, targets)
+                finally:
+                    self.cache.release(key)
+
+            # With no cache, write the rest of the copies:
+            else:
+                self.write_outputs(target, targets)
+
+            # Count it:
+            self.stats['processed'] += 1
+
+        # If the transform failed:
+        except Exception as e:
+
+            # Log the error:
+            self.log(f"Error en el posprocesado de {targets[0].name}: {e}")
+
+            # Count the failure:
+            self.stats['failed'] += 1
+
+    #
+    # Wait for every transform and stop the pool (returns the statistics):
+    #
+    def close(self):
+
+        # Finish every transform left:
+        with self.lock:
+            while self.pending:
+                self.finish_next()
+
+        # Stop the process pool:
+        self.pool.shutdown()
+
+        # Save the cache index:
+        if self.cache:
+            self.cache.save()
+
+        # Log the result:
+        self.log(f"Posprocesado: {self.stats['processed']} imágenes, {self.stats['cached']} desde caché, "
+                 f"{self.stats['failed']} errores")
+
+        # Return the statistics:
+        return self.stats
+
+    #
+    # Context manager support:
+    #
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
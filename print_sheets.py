@@ -0,0 +1,448 @@
+##################################################
+# THIS FILE HAS THE PRINT SHEET COMPOSITOR CLASS #
+##################################################
+
+# Usage (compose an already downloaded folder):
+#   python print_sheets.py imagenes_descargadas hojas.pdf [--page a4|letter] [--bleed 3] [--crop-marks]
+
+# Import the required libraries:
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Pillow is optional (only needed for the print sheets):
+try:
+    from PIL import Image, ImageDraw, ImageOps
+except ImportError:
+    Image = None
+
+#
+# Helper function to create the process pool that prepares the cards (spawned, since the downloader threads are running):
+#
+def create_pool(workers=None):
+
+    # Get the number of processes (one per CPU by default):
+    workers = workers or os.cpu_count() or 1
+
+    # Create the pool:
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    # Attach its in-flight budget, shared by every compositor that uses the pool:
+    pool.budget = InFlightBudget(2 * workers)
+
+    # Return the pool:
+    return pool
+
+# Declare the budget class:
+class InFlightBudget:
+    """Number of cards being prepared in a process pool, shared by every compositor that submits to it"""
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, limit):
+
+        # Store the maximum number of cards in flight:
+        self.limit = limit
+
+        # Initialise the number of cards in flight:
+        self.count = 0
+
+        # Lock to update the count from several compositors:
+        self.lock = threading.Lock()
+
+    #
+    # Count a card sent to the pool:
+    #
+    def acquire(self):
+        with self.lock:
+            self.count += 1
+
+    #
+    # Count a card taken from the pool:
+    #
+    def release(self):
+        with self.lock:
+            self.count -= 1
+
+    #
+    # Check whether the pool has too many cards in flight:
+    #
+    def exceeded(self):
+        with self.lock:
+            return self.count > self.limit
+
+#
+# Helper function to convert millimetres to pixels:
+#
+def mm_to_px(mm, dpi):
+
+    # 25.4 mm per inch:
+    return round(mm / 25.4 * dpi)
+
+#
+# Helper function to flatten a card image to RGB (the transparent rounded corners take the border colour):
+#
+def flatten(image):
+
+    # Images with no transparency only need the conversion:
+    if image.mode not in ("RGBA", "LA", "P") or (image.mode == "P" and "transparency" not in image.info):
+        return image.convert("RGB")
+
+    # Convert the image to RGBA:
+    image = image.convert("RGBA")
+
+    # Take the border colour from the middle of the top edge:
+    border = image.getpixel((image.width // 2, min(5, image.height - 1)))[:3]
+
+    # Paste the image over a background of that colour:
+    background = Image.new("RGB", image.size, border)
+    background.paste(image, mask=image.getchannel("A"))
+
+    # Return the flattened image:
+    return background
+
+#
+# Helper function to add a mirrored bleed around an image (the edges are reflected outwards):
+#
+def add_bleed(image, bleed):
+
+    # Nothing to do without bleed:
+    if bleed <= 0:
+        return image
+
+    # Get the size of the image:
+    width, height = image.size
+
+    # Create the bigger image and paste the original in the middle:
+    result = Image.new(image.mode, (width + 2 * bleed, height + 2 * bleed))
+    result.paste(image, (bleed, bleed))
+
+    # Reflect the left and right edges:
+    result.paste(ImageOps.mirror(image.crop((0, 0, bleed, height))), (0, bleed))
+    result.paste(ImageOps.mirror(image.crop((width - bleed, 0, width, height))), (width + bleed, bleed))
+
+    # Reflect the top and bottom edges (with the side bleed, so the corners are filled too):
+    result.paste(ImageOps.flip(result.crop((0, bleed, width + 2 * bleed, 2 * bleed))), (0, 0))
+    result.paste(ImageOps.flip(result.crop((0, height, width + 2 * bleed, height + bleed))), (0, height + bleed))
+
+    # Return the image with bleed:
+    return result
+
+#
+# Worker function (runs in the process pool): decode, resize and add the bleed to a card image:
+#
+def prepare_card(path, width, height, bleed):
+
+    # Open the image:
+    with Image.open(path) as image:
+
+        # Flatten it and resize it to the card size:
+        card = flatten(image).resize((width, height), Image.LANCZOS)
+
+    # Add the bleed:
+    card = add_bleed(card, bleed)
+
+    # Return the raw pixels (cheaper to send back than an encoded image):
+    return card.size, card.tobytes()
+
+# Declare the class:
+class SheetCompositor:
+    """Lays out card images 3x3 on printable pages as they arrive, streaming each page to a PDF or PNG files"""
+
+    # Page sizes (millimetres):
+    PAGE_SIZES = {
+        'a4': (210.0, 297.0),
+        'letter': (215.9, 279.4)
+    }
+
+    # Card size (millimetres):
+    CARD_SIZE = (63.0, 88.0)
+
+    # Maximum number of columns and rows per page:
+    GRID = (3, 3)
+
+    # Length of the crop marks and gap between them and the cards (millimetres):
+    CROP_MARK = 5.0
+    CROP_GAP = 1.0
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, output_path, page_size="a4", dpi=300, bleed=0.0, crop_marks=False, workers=None, executor=None,
+                 log=print):
+
+        # Pillow is required:
+        if Image is None:
+            raise ImportError("Las hojas de impresión necesitan Pillow (pip install pillow)")
+
+        # Store the output path and its format (one PDF or one PNG file per page):
+        self.output_path = Path(output_path)
+        self.format = "pdf" if self.output_path.suffix.lower() == ".pdf" else "png"
+
+        # Store the resolution and the options:
+        self.dpi = dpi
+        self.crop_marks = crop_marks
+        self.log = log
+
+        # Calculate the sizes in pixels:
+        self.card_px = tuple(mm_to_px(mm, dpi) for mm in self.CARD_SIZE)
+        self.bleed_px = mm_to_px(bleed, dpi)
+        self.cell_px = tuple(size + 2 * self.bleed_px for size in self.card_px)
+        self.page_px = tuple(mm_to_px(mm, dpi) for mm in self.PAGE_SIZES[page_size])
+
+        # Fit as many cards as possible, up to 3x3 (a big bleed may not fit 3 rows on Letter):
+        self.columns = min(self.GRID[0], self.page_px[0] // self.cell_px[0])
+        self.rows = min(self.GRID[1], self.page_px[1] // self.cell_px[1])
+
+        # Check that at least one card fits:
+        if not self.columns or not self.rows:
+            raise ValueError("La carta no cabe en la página con ese sangrado")
+
+        # Center the grid on the page:
+        self.origin = (
+            (self.page_px[0] - self.columns * self.cell_px[0]) // 2,
+            (self.page_px[1] - self.rows * self.cell_px[1]) // 2
+        )
+
+        # Use the given process pool (shared by the compositors of a batch), or create one that decodes
+        # and resizes the images:
+        workers = workers or os.cpu_count() or 1
+        self.pool = executor or create_pool(workers)
+
+        # Store whether the pool belongs to this compositor (a shared pool is stopped by its owner):
+        self.owns_pool = executor is None
+
+        # Cards being prepared, in order, with their number of copies:
+        self.pending = deque()
+
+        # The cards in flight are bounded per pool, not per compositor, so few bitmaps are held at once (the
+        # compositors of a batch share the budget of their pool):
+        self.budget = getattr(self.pool, 'budget', None) or InFlightBudget(2 * workers)
+
+        # Lock to add cards from several workers:
+        self.lock = threading.Lock()
+
+        # Initialise the current page, its next free slot and the counters:
+        self.page = None
+        self.slot = 0
+        self.pages = 0
+        self.cards = 0
+
+        # Create the output folder and remove a previous PDF (pages are appended to it):
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.format == "pdf":
+            self.output_path.unlink(missing_ok=True)
+
+    #
+    # Add a card image with its number of copies (safe to call from any thread):
+    #
+    def add(self, path, count=1):
+
+        # Only one worker can add cards at a time:
+        with self.lock:
+
+            # Send the image to the process pool (the download goes on even if the sheets fail):
+            try:
+                future = self.pool.submit(prepare_card, str(path), *self.card_px, self.bleed_px)
+            except Exception as e:
+                self.log(f"Error en la hoja de impresión: {e}")
+                return
+            self.pending.append((future, count))
+            self.budget.acquire()
+
+            # Place the oldest cards of this compositor while the pool has too many in flight (this card is the one
+            # over the budget, so placing one card is enough):
+            while self.pending and self.budget.exceeded():
+                self.place_next()
+
+    #
+    # Helper function to place the oldest prepared card on the pages:
+    #
+    def place_next(self):
+
+        # Get the oldest card:
+        future, count = self.pending.popleft()
+        self.budget.release()
+
+        # Wait for the image:
+        try:
+            size, data = future.result()
+
+        # If it can't be read, skip it:
+        except Exception as e:
+            self.log(f"Error en la hoja de impresión: {e}")
+            return
+
+        # Rebuild the image:
+        card = Image.frombytes("RGB", size, data)
+
+        # Place every copy (the image is decoded only once):
+        for _ in range(count):
+            self.place(card)
+
+    #
+    # Helper function to paste a card in the next free slot:
+    #
+    def place(self, card):
+
+        # Start a new white page if needed:
+        if self.page is None:
+            self.page = Image.new("RGB", self.page_px, "white")
+
+        # Calculate the position of the slot:
+        column, row = self.slot % self.columns, self.slot // self.columns
+        x = self.origin[0] + column * self.cell_px[0]
+        y = self.origin[1] + row * self.cell_px[1]
+
+        # Paste the card:
+        self.page.paste(card, (x, y))
+
+        # Move to the next slot:
+        self.slot += 1
+        self.cards += 1
+
+        # If the page is full, write it:
+        if self.slot == self.columns * self.rows:
+            self.flush_page()
+
+    #
+    # Helper function to draw the crop marks in the margins, aligned with the trim lines:
+    #
+    def draw_crop_marks(self):
+
+        # Create the drawing object:
+        draw = ImageDraw.Draw(self.page)
+
+        # Calculate the sizes in pixels:
+        length = mm_to_px(self.CROP_MARK, self.dpi)
+        gap = mm_to_px(self.CROP_GAP, self.dpi)
+        line = max(1, self.dpi // 150)
+
+        # Calculate the grid limits:
+        left, top = self.origin
+        right = left + self.columns * self.cell_px[0]
+        bottom = top + self.rows * self.cell_px[1]
+
+        # Calculate the trim lines of every column and row:
+        xs = [left + column * self.cell_px[0] + self.bleed_px + offset
+              for column in range(self.columns) for offset in (0, self.card_px[0])]
+        ys = [top + row * self.cell_px[1] + self.bleed_px + offset
+              for row in range(self.rows) for offset in (0, self.card_px[1])]
+
+        # Draw the vertical marks above and below the grid:
+        for x in xs:
+            draw.line([(x, max(0, top - gap - length)), (x, max(0, top - gap))], fill="black", width=line)
+            draw.line([(x, bottom + gap), (x, bottom + gap + length)], fill="black", width=line)
+
+        # Draw the horizontal marks on both sides of the grid:
+        for y in ys:
+            draw.line([(max(0, left - gap - length), y), (max(0, left - gap), y)], fill="black", width=line)
+            draw.line([(right + gap, y), (right + gap + length, y)], fill="black", width=line)
+
+    #
+    # Helper function to write the current page and free it:
+    #
+    def flush_page(self):
+
+        # Draw the crop marks:
+        if self.crop_marks:
+            self.draw_crop_marks()
+
+        # Count the page:
+        self.pages += 1
+
+        # Append it to the PDF (only the current page is kept in memory):
+        if self.format == "pdf":
+            self.page.save(self.output_path, "PDF", resolution=self.dpi, append=self.pages > 1)
+
+        # Or write it as a numbered PNG file:
+        else:
+            page_path = self.output_path.with_name(f"{self.output_path.stem}_{self.pages:03d}.png")
+            self.page.save(page_path, dpi=(self.dpi, self.dpi))
+
+        # Free the page:
+        self.page = None
+        self.slot = 0
+
+    #
+    # Place the remaining cards, write the last page and stop the pool (returns the number of pages):
+    #
+    def close(self):
+
+        # Only one worker can touch the pages at a time:
+        with self.lock:
+
+            # Place every card left:
+            while self.pending:
+                self.place_next()
+
+            # Write the last page, even if it is not full:
+            if self.page is not None:
+                self.flush_page()
+
+        # Stop the process pool, if it is not shared:
+        if self.owns_pool:
+            self.pool.shutdown()
+
+        # Log the result:
+        self.log(f"Hojas de impresión: {self.cards} cartas en {self.pages} páginas ({self.output_path.name})")
+
+        # Return the number of pages:
+        return self.pages
+
+    #
+    # Context manager support:
+    #
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+#
+# Compose the images of an already downloaded folder (copies are grouped by their source URL in the manifest):
+#
+def compose_folder(folder, output_path, **options):
+
+    # Read the job manifest of the folder:
+    with open(Path(folder) / "manifest.json", encoding="utf-8") as f:
+        files = json.load(f).get('files', {})
+
+    # Group the completed files by source image, keeping their order:
+    groups = {}
+    for name, entry in files.items():
+        if entry.get('status') == "done" and (Path(folder) / name).is_file():
+            groups.setdefault(entry.get('url') or name, []).append(name)
+
+    # Add each image once with its number of copies:
+    with SheetCompositor(output_path, **options) as compositor:
+        for names in groups.values():
+            compositor.add(Path(folder) / names[0], len(names))
+
+    # Return the number of pages:
+    return compositor.pages
+
+# Run the compositor when called as a script:
+if __name__ == "__main__":
+
+    # Create the argument parser:
+    parser = argparse.ArgumentParser(description="Compone hojas de impresión 3x3 con las imágenes descargadas")
+    parser.add_argument("folder", help="Carpeta con las imágenes y su manifest.json")
+    parser.add_argument("output", help="Archivo de salida (.pdf, o .png para un archivo por página)")
+    parser.add_argument("--page", choices=list(SheetCompositor.PAGE_SIZES), default="a4", help="Tamaño de página")
+    parser.add_argument("--dpi", type=int, default=300, help="Resolución")
+    parser.add_argument("--bleed", type=float, default=0.0, help="Sangrado en milímetros")
+    parser.add_argument("--crop-marks", action="store_true", help="Dibuja marcas de corte")
+    args = parser.parse_args()
+
+    # Compose the folder:
+    compose_folder(args.folder, args.output, page_size=args.page, dpi=args.dpi,
+                   bleed=args.bleed, crop_marks=args.crop_marks)
+    sys.exit(0)
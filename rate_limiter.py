@@ -0,0 +1,198 @@
+############################################
+# THIS FILE HAS THE API RATE LIMITER CLASS #
+############################################
+
+# Import the required libraries:
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Declare the class:
+class RateLimiter:
+    """Thread-safe adaptive token bucket, shared by every worker that calls the same host"""
+
+    # Lowest rate the limiter can slow down to (requests per second):
+    MIN_RATE = 0.5
+
+    # Base delay of the exponential backoff (seconds):
+    BACKOFF_BASE = 1.0
+
+    # Maximum delay of the exponential backoff (seconds):
+    BACKOFF_MAX = 60.0
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, rate, burst=1):
+
+        # Store the target number of tokens added per second:
+        self.target_rate = rate
+
+        # Store the current rate (it slows down after a 429 and recovers after successes):
+        self.rate = rate
+
+        # Store the maximum number of tokens (requests allowed in a burst):
+        self.burst = burst
+
+        # Start with a full bucket:
+        self.tokens = burst
+
+        # Store the last time the bucket was refilled:
+        self.last_refill = time.monotonic()
+
+        # No request is allowed before this time (set by 429 answers):
+        self.blocked_until = 0
+
+        # Number of 429 answers in a row (for the exponential backoff):
+        self.throttles = 0
+
+        # Lock to share the bucket between threads:
+        self.lock = threading.Lock()
+
+    #
+    # Helper function to refill the bucket with the time elapsed:
+    #
+    def refill(self):
+
+        # Get the current time:
+        now = time.monotonic()
+
+        # Add the tokens earned since the last refill, without going over the burst size:
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+
+        # Store the refill time:
+        self.last_refill = now
+
+    #
+    # Take a token if one is available (returns 0, or the seconds to wait before trying again):
+    #
+    def try_acquire(self):
+
+        # Only one thread can check the bucket at a time:
+        with self.lock:
+
+            # If the server asked us to wait, wait until then:
+            wait_time = self.blocked_until - time.monotonic()
+            if wait_time > 0:
+                return wait_time
+
+            # Refill the bucket:
+            self.refill()
+
+            # If there is a token available:
+            if self.tokens >= 1:
+
+                # Take it and let the request through:
+                self.tokens -= 1
+                return 0
+
+            # Otherwise, return the time until the next token:
+            return (1 - self.tokens) / self.rate
+
+    #
+    # Block until a request is allowed (returns the seconds spent waiting):
+    #
+    def acquire(self):
+
+        # Initialise the waited time:
+        waited = 0.0
+
+        # Keep trying until a token is available:
+        while wait_time := self.try_acquire():
+
+            # Sleep outside the lock so other threads can check the bucket:
+            time.sleep(wait_time)
+            waited += wait_time
+
+        # Return the waited time:
+        return waited
+
+    #
+    # Wait until a request is allowed without blocking the event loop (asyncio version of 'acquire'):
+    #
+    async def acquire_async(self):
+
+        # Initialise the waited time:
+        waited = 0.0
+
+        # Keep trying until a token is available:
+        while wait_time := self.try_acquire():
+
+            # Sleep, letting the other tasks run:
+            await asyncio.sleep(wait_time)
+            waited += wait_time
+
+        # Return the waited time:
+        return waited
+
+    #
+    # Register a successful request (the rate recovers step by step):
+    #
+    def succeeded(self):
+
+        # Only one thread can update the bucket at a time:
+        with self.lock:
+
+            # Reset the backoff:
+            self.throttles = 0
+
+            # Increase the rate a little, up to the target:
+            self.rate = min(self.target_rate, self.rate + self.target_rate * 0.1)
+
+    #
+    # Register a '429 Too Many Requests' answer and return the seconds to wait:
+    #
+    def throttled(self, retry_after=None):
+
+        # Only one thread can update the bucket at a time:
+        with self.lock:
+
+            # Count the throttle:
+            self.throttles += 1
+
+            # Halve the rate:
+            self.rate = max(self.MIN_RATE, self.rate / 2)
+
+            # Use the delay asked by the server, if any:
+            delay = self.parse_retry_after(retry_after)
+
+            # Otherwise, back off exponentially with jitter:
+            if delay is None:
+                delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** (self.throttles - 1))
+                delay = delay / 2 + random.uniform(0, delay / 2)
+
+            # Block every worker until then:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+            # Empty the bucket so the requests restart slowly:
+            self.tokens = 0
+
+            # Return the delay:
+            return delay
+
+    #
+    # Helper function to read a 'Retry-After' header (seconds or HTTP date):
+    #
+    def parse_retry_after(self, value):
+
+        # If there is no header:
+        if not value:
+            return None
+
+        # Attempt to read it as a number of seconds:
+        try:
+            return max(0.0, float(value))
+
+        # If it is not a number:
+        except ValueError:
+            pass
+
+        # Attempt to read it as a date:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+
+        # If it can't be read, use the backoff:
+        except (TypeError, ValueError):
+            return None
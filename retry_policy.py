@@ -0,0 +1,240 @@
+#######################################################
+# THIS FILE HAS THE RETRY AND CIRCUIT BREAKER CLASSES #
+#######################################################
+
+# Import the required libraries:
+import asyncio
+import random
+import threading
+import time
+import requests
+
+# Declare the error raised when a transfer ends before the expected size:
+class IncompleteDownloadError(IOError):
+    """The connection was closed before the whole body was received"""
+
+# Declare the retry policy class:
+class RetryPolicy:
+    """Retry rules for one class of requests (API or image CDN), with backoff and a retry budget"""
+
+    # HTTP status codes worth retrying (timeouts and server errors):
+    RETRY_STATUSES = (408, 500, 502, 503, 504)
+
+    # Errors worth retrying (network blips):
+    RETRY_ERRORS = (
+        requests.ConnectionError,
+        requests.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+        IncompleteDownloadError
+    )
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, max_retries=3, backoff_base=1.0, backoff_max=30.0, budget=100):
+
+        # Store the number of retries allowed per request:
+        self.max_retries = max_retries
+
+        # Store the base and maximum delays of the exponential backoff (seconds):
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Store the number of retries left for the whole run (and the initial one, to start a new run):
+        self.budget = budget
+        self.initial_budget = budget
+
+        # Lock to share the budget between workers:
+        self.lock = threading.Lock()
+
+    #
+    # Check whether an error is transient (worth retrying):
+    #
+    def is_transient(self, error):
+
+        # HTTP errors are only retried for the statuses above:
+        if isinstance(error, requests.HTTPError):
+            return error.response is not None and error.response.status_code in self.RETRY_STATUSES
+
+        # Network errors are always retried:
+        return isinstance(error, self.RETRY_ERRORS)
+
+    #
+    # Check whether another retry is allowed (it spends one retry of the budget):
+    #
+    def allow_retry(self, attempt):
+
+        # Only one worker can spend the budget at a time:
+        with self.lock:
+
+            # Stop if this request used all its retries or the run used all its budget:
+            if attempt >= self.max_retries or self.budget <= 0:
+                return False
+
+            # Spend one retry:
+            self.budget -= 1
+
+            # Return True:
+            return True
+
+    #
+    # Restore the whole budget (a new run starts, e.g. a batch of the download server):
+    #
+    def reset(self):
+
+        # Only one worker can change the budget at a time:
+        with self.lock:
+            self.budget = self.initial_budget
+
+    #
+    # Calculate the delay before a retry (exponential backoff with jitter):
+    #
+    def delay(self, attempt):
+
+        # Double the delay with each attempt, up to the maximum:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+
+        # Add jitter so the workers don't retry all at once:
+        return delay / 2 + random.uniform(0, delay / 2)
+
+# Declare the circuit breaker class:
+class CircuitBreaker:
+    """Pauses every worker when an upstream host is clearly down, then lets a single trial request through"""
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, failure_threshold=5, cooldown=30.0):
+
+        # Store the number of failures in a row that opens the circuit:
+        self.failure_threshold = failure_threshold
+
+        # Store the pause (seconds) before trying the host again:
+        self.cooldown = cooldown
+
+        # Initialise the state ('closed' lets everything through, 'open' pauses, 'half_open' tests):
+        self.state = "closed"
+
+        # Initialise the number of failures in a row:
+        self.failures = 0
+
+        # Store the time the circuit was opened:
+        self.opened_at = 0
+
+        # Flag to know whether the trial request is in flight:
+        self.trial_running = False
+
+        # Lock to share the breaker between workers:
+        self.lock = threading.Lock()
+
+    #
+    # Check whether a request is allowed (returns 0, or the seconds to wait before checking again):
+    #
+    def check(self):
+
+        # Only one worker can check the state at a time:
+        with self.lock:
+
+            # If the circuit is closed, let the request through:
+            if self.state == "closed":
+                return 0
+
+            # If the pause is over, move to the test state:
+            if self.state == "open" and time.monotonic() >= self.opened_at + self.cooldown:
+                self.state = "half_open"
+
+            # In the test state, only one trial request goes through:
+            if self.state == "half_open" and not self.trial_running:
+                self.trial_running = True
+                return 0
+
+            # Return the time left in the pause (or check again soon while a trial runs):
+            return max(0.1, self.opened_at + self.cooldown - time.monotonic())
+
+    #
+    # Block while the circuit is open (returns early if the run is cancelled):
+    #
+    def wait(self, cancel_event=None):
+
+        # Keep checking until the request is allowed:
+        while wait_time := self.check():
+
+            # If the run was cancelled, stop waiting:
+            if cancel_event is not None and cancel_event.wait(min(wait_time, 1.0)):
+                return
+
+            # Without a cancel event, sleep:
+            if cancel_event is None:
+                time.sleep(min(wait_time, 1.0))
+
+    #
+    # Wait while the circuit is open without blocking the event loop (asyncio version of 'wait'):
+    #
+    async def wait_async(self, cancel_event=None):
+
+        # Keep checking until the request is allowed or the run is cancelled:
+        while (wait_time := self.check()) and not (cancel_event is not None and cancel_event.is_set()):
+
+            # Sleep, letting the other tasks run:
+            await asyncio.sleep(min(wait_time, 1.0))
+
+    #
+    # Register a request that reached the host:
+    #
+    def record_success(self):
+
+        # Only one worker can update the state at a time:
+        with self.lock:
+
+            # Close the circuit and reset the counter:
+            self.state = "closed"
+            self.failures = 0
+            self.trial_running = False
+
+    #
+    # Give back the trial request of the test state without a result (e.g. the run was cancelled mid-request),
+    # so the next request can test the host:
+    #
+    def release_trial(self):
+
+        # Only one worker can update the state at a time:
+        with self.lock:
+
+            # Free the trial slot (nothing to do in the other states):
+            if self.state == "half_open":
+                self.trial_running = False
+
+    #
+    # Register a transient failure (returns True if the circuit was just opened):
+    #
+    def record_failure(self):
+
+        # Only one worker can update the state at a time:
+        with self.lock:
+
+            # Count the failure:
+            self.failures += 1
+
+            # Store whether the circuit was already open:
+            was_open = self.state == "open"
+
+            # Open the circuit if the trial failed or there were too many failures in a row:
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.trial_running = False
+
+            # Return True if the circuit was just opened:
+            return self.state == "open" and not was_open
+
+    #
+    # Close the circuit and forget the failures (a new run starts, e.g. a batch of the download server):
+    #
+    def reset(self):
+
+        # Only one worker can update the state at a time:
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+            self.opened_at = 0
+            self.trial_running = False
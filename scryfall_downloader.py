@@ -1,8 +1,50 @@
 # Import the required libraries:
 import requests
 import time
-import re
+import os
+import sys
+import shutil
+import tempfile
+import queue
+import threading
 from pathlib import Path
+from urllib.parse import quote
+
+# Import the streaming decklist parser:
+from decklist_parser import CardRequest, iter_decklist
+
+# Import the API rate limiter:
+from rate_limiter import RateLimiter
+
+# Import the retry policy and circuit breaker:
+from retry_policy import RetryPolicy, CircuitBreaker, IncompleteDownloadError
+
+# Import the local image cache:
+from image_cache import ImageCache
+
+# Import the card metadata cache:
+from metadata_cache import MetadataCache
+
+# Import the offline bulk-data index:
+from bulk_index import BulkIndex
+
+# Import the job manifest (resumable runs):
+from job_manifest import JobManifest
+
+# Import the archive writer (ZIP or tar output):
+from archive_writer import ArchiveWriter
+
+# Import the download pipeline:
+from pipeline import DownloadPipeline
+
+# Import the run metrics and the timed HTTP adapter:
+from metrics import Metrics, TimedAdapter
+
+# The fcntl module is only available on Unix systems (used for reflinks):
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # Declare the class:
 class ScryfallDownloader:
@@ -11,13 +53,52 @@ class ScryfallDownloader:
     # Scryfall URL:
     BASE_URL = "https://api.scryfall.com"
 
-    # A 100ms delay between requests is required to avoid blockage:
+    # A 100ms delay between requests is required to avoid blockage (target rate of the limiter):
     DELAY = 0.1
+
+    # Number of times a throttled (429) API request is requeued before failing:
+    MAX_THROTTLE_RETRIES = 8
+
+    # Headers sent with every request (Scryfall asks for a User-Agent and an Accept header):
+    HEADERS = {
+        "User-Agent": "MTGDecklistDownloader/1.1.1",
+        "Accept": "application/json;q=0.9,*/*;q=0.8"
+    }
+
+    # Size of each chunk written to disk while downloading (64 KB):
+    CHUNK_SIZE = 64 * 1024
+
+    # Largest image kept in memory in archive mode before it spills to a temporary file (16 MB):
+    SPOOL_SIZE = 16 * 1024 * 1024
+
+    # Linux ioctl request code to clone a file (reflink):
+    FICLONE = 0x40049409
+
+    # Image profiles, with the variants tried in order when a card doesn't have the first one:
+    IMAGE_PROFILES = {
+        'png': ("png", "large", "normal"),
+        'large': ("large", "png", "normal"),
+        'normal': ("normal", "large", "png"),
+        'small': ("small", "normal", "large"),
+        'border_crop': ("border_crop", "large", "png"),
+        'art_crop': ("art_crop",)
+    }
+
+    # Variants of the previews (fetched before the full-size images of each batch):
+    PREVIEW_VARIANTS = ("small", "normal")
+
+    # Subfolder of the output folder where the previews are saved:
+    PREVIEW_FOLDER = "vista_previa"
     
     #
     # Initialisation function:
     #
-    def __init__(self, output_folder="imagenes_descargadas", log_callback=None):
+    def __init__(self, output_folder="imagenes_descargadas", log_callback=None, workers=4, write_workers=2, queue_size=64,
+                 pool_size=None, retries=3, timeout=30, api_retry=None, image_retry=None, cache_folder=None,
+                 cache_size=ImageCache.DEFAULT_MAX_BYTES, metadata_db=None,
+                 metadata_ttl=MetadataCache.DEFAULT_TTL, offline_index=None,
+                 event_callback=None, echo=True, metrics_file=None, prometheus_file=None,
+                 image_profile="png", image_fallback=None, archive_format=None, request_events=False):
 
         # Store the output folder path:
         self.output_folder = Path(output_folder)
@@ -25,6 +106,106 @@ class ScryfallDownloader:
         # Store the callback function to update the GUI:
         self.log_callback = log_callback 
 
+        # Store the callback function that receives the progress events:
+        self.event_callback = event_callback
+
+        # Store whether the log messages are printed to the console:
+        self.echo = echo
+
+        # Store the number of concurrent download workers (1 means sequential):
+        self.workers = max(1, int(workers))
+
+        # Store the number of disk writers and the size of the pipeline queues:
+        self.write_workers = max(1, int(write_workers))
+        self.queue_size = queue_size
+
+        # Store the timeout (in seconds) for every request:
+        self.timeout = timeout
+
+        # Check the image profile:
+        if image_profile not in self.IMAGE_PROFILES:
+            raise ValueError(f"Perfil de imagen desconocido: {image_profile}")
+
+        # Store the image variants of the run (the profile first, then its fallback chain or the given one):
+        if image_fallback is None:
+            self.image_variants = self.IMAGE_PROFILES[image_profile]
+        else:
+            self.image_variants = tuple(dict.fromkeys((image_profile, *image_fallback)))
+
+        # Create the timings and counters of the run (created before the session, which reports to it):
+        self.metrics = Metrics()
+
+        # Store the paths of the JSON report and the Prometheus text file (None to skip them):
+        self.metrics_file = metrics_file
+        self.prometheus_file = prometheus_file
+
+        # Store whether an event with the timings of every request is sent:
+        self.request_events = request_events
+
+        # Create the pooled HTTP session, shared by the API and image requests:
+        self.session = self.create_session(pool_size or max(10, self.workers))
+
+        # Store the retry policy of each request class (API and image CDN):
+        self.retry_policies = {
+            'api': api_retry or RetryPolicy(max_retries=retries, backoff_base=1.0, budget=100),
+            'image': image_retry or RetryPolicy(max_retries=retries, backoff_base=0.5, budget=300)
+        }
+
+        # Create a circuit breaker per request class (pauses the pool if the host is down):
+        self.breakers = {
+            'api': CircuitBreaker(),
+            'image': CircuitBreaker()
+        }
+
+        # Create the local image cache, if a folder was given:
+        self.image_cache = ImageCache(cache_folder, cache_size) if cache_folder else None
+
+        # Open the persistent card metadata cache, if a database path was given:
+        self.metadata_cache = MetadataCache(metadata_db, metadata_ttl) if metadata_db else None
+
+        # Open the offline bulk-data index, if a path was given (no API calls are made then):
+        self.offline_index = BulkIndex(offline_index) if offline_index else None
+
+        # Shared limiter for api.scryfall.com only (the image CDN is not throttled):
+        self.api_limiter = RateLimiter(rate=1 / self.DELAY)
+
+        # Queue of log messages sent by the worker threads:
+        self.log_queue = queue.Queue()
+
+        # Thread that owns the callback (the GUI must only be updated from it):
+        self.owner_thread = threading.get_ident()
+
+        # Lock to update the statistics from several workers:
+        self.stats_lock = threading.Lock()
+
+        # Event set when the run is cancelled (from the GUI or any other thread):
+        self.cancel_event = threading.Event()
+
+        # Job manifests, keyed by output folder (completed files are skipped when rerun):
+        self.manifests = {}
+
+        # Lock to create the manifests from several workers:
+        self.manifests_lock = threading.Lock()
+
+        # Check the archive format ('zip', 'tar' or None for loose files):
+        if archive_format is not None and archive_format not in ArchiveWriter.FORMATS:
+            raise ValueError(f"Formato de archivo desconocido: {archive_format}")
+
+        # Store the archive format:
+        self.archive_format = archive_format
+
+        # Archive writers, keyed by output folder (one archive and one file handle per deck):
+        self.archives = {}
+
+        # Lock to create the archives from several workers:
+        self.archives_lock = threading.Lock()
+
+        # Cache of parsed decklists, keyed by file path (parsed only once per run):
+        self.decklists = {}
+
+        # Cache of resolved card objects, keyed by (set, collector number):
+        self.card_data = {}
+
         # Initialise the statistics dictionary:
         self.stats = {
             'successful': 0,
@@ -38,127 +219,632 @@ class ScryfallDownloader:
         # End time variable:
         self.end_time = None
 
+    #
+    # Helper function to create a pooled HTTP session (keep-alive connections are reused):
+    #
+    def create_session(self, pool_size):
+
+        # Create the session:
+        session = requests.Session()
+
+        # Add the default headers:
+        session.headers.update(self.HEADERS)
+
+        # Create the adapter with one pool per host (API and image CDN); the retries are
+        # handled by the retry policies, so the adapter itself never retries, and the
+        # connection setup times are registered in the metrics:
+        adapter = TimedAdapter(self.metrics, pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+
+        # Use the adapter for every URL:
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        # Return the session:
+        return session
+
+    #
+    # Helper function to close the pooled connections:
+    #
+    def close(self):
+
+        # Close the session (the async engine creates its own client for each run):
+        if self.session:
+            self.session.close()
+
+        # Close the metadata cache:
+        if self.metadata_cache:
+            self.metadata_cache.close()
+
+        # Close the offline index:
+        if self.offline_index:
+            self.offline_index.close()
+
+        # Save the image cache index:
+        if self.image_cache:
+            self.image_cache.save()
+
     #
     # Logging function:
     #
     def log(self, message):
 
-        # Print the message:
-        print(message)
+        # Queue the message (workers can't touch the GUI directly):
+        self.log_queue.put(("log", message))
+
+        # If the message comes from the owner thread, show it right away:
+        if threading.get_ident() == self.owner_thread:
+            self.flush_log()
+
+    #
+    # Progress event function (machine-readable progress for the GUI or the CLI):
+    #
+    def emit(self, event, **data):
+
+        # Queue the event with the same order as the log messages:
+        self.log_queue.put(("event", {"event": event, **data}))
+
+        # If the event comes from the owner thread, send it right away:
+        if threading.get_ident() == self.owner_thread:
+            self.flush_log()
+
+    #
+    # Send the timings of a request (connection setup, first byte, transfer and write), if enabled:
+    #
+    def emit_request(self, kind, url, status, **timings):
+
+        # Skip it unless the request events were requested:
+        if not self.request_events:
+            return
+
+        # Send the event (seconds rounded like the metrics report, byte counts as they are):
+        self.emit("request", kind=kind, url=url, status=status,
+                  **{name: value if isinstance(value, int) else round(value, 4) for name, value in timings.items()})
+
+    #
+    # Helper function to show the queued log messages and events, in order:
+    #
+    def flush_log(self):
+
+        # Keep going while there are messages:
+        while True:
+
+            # Get the next message:
+            try:
+                kind, message = self.log_queue.get_nowait()
+
+            # Stop when the queue is empty:
+            except queue.Empty:
+                return
+
+            # If it is a progress event:
+            if kind == "event":
+
+                # Send it to the event callback, if provided:
+                if self.event_callback:
+                    self.event_callback(message)
+
+                # Move on to the next message:
+                continue
+
+            # Print the message, unless the console output is disabled:
+            if self.echo:
+                print(message)
+
+            # If a GUI callback is provided:
+            if self.log_callback:
+
+                # Send the message to the GUI window:
+                self.log_callback(message)
+
+    #
+    # Cancel the run (safe to call from any thread):
+    #
+    def cancel(self):
+
+        # Set the cancel event (workers stop before the next card or chunk):
+        self.cancel_event.set()
 
-        # If a GUI callback is provided:
-        if self.log_callback:
+    #
+    # Helper function to update the statistics from any worker:
+    #
+    def add_stats(self, total=0, successful=0, failed=0):
 
-            # Send the message to the GUI window:
-            self.log_callback(message)
+        # Only one worker can update the counters at a time:
+        with self.stats_lock:
+
+            # Add the values:
+            self.stats['total'] += total
+            self.stats['successful'] += successful
+            self.stats['failed'] += failed
     
     #
-    # Define the parsing function for Moxfield lines:
+    # Helper function to run a request with the retry policy and circuit breaker of its class:
     #
-    def parse_moxfield_line(self, line):
+    def with_retry(self, kind, operation):
 
-        # Remove whitespaces from the beginning and end:
-        line = line.strip()
-        
-        # Check if the line is empty or starts with a comment:
-        if not line or line.startswith('#'):
+        # Get the retry policy and the circuit breaker:
+        policy = self.retry_policies[kind]
+        breaker = self.breakers[kind]
 
-            # End the function if it is not a valid card line:
-            return None
+        # Initialise the attempt counter:
+        attempt = 0
 
-        # Remove unwanted symbols such as *F* (foil), ★, and others:
-        line = re.sub(r'\s*(\*F\*|★)\s*$', '', line)
+        # Keep trying while the policy allows it:
+        while True:
 
-        # Define the regular expression pattern for Moxfield format:
-        pattern = r'^(\d+)\s+(.+?)\s+\(([A-Z0-9]+)\)\s+(\S+)$'
+            # Wait while the host is considered down:
+            with self.metrics.timer('breaker_wait'):
+                breaker.wait(self.cancel_event)
 
-        # Try to match the line with the pattern:
-        match = re.match(pattern, line)
-        
-        # If the line matches the expected format:
-        if match:
+            # If the run was cancelled while waiting, stop here (giving back the trial slot, if it was taken):
+            if self.cancel_event.is_set():
+                breaker.release_trial()
+                raise IOError("descarga cancelada")
 
-            # Extract the quantity from the first group:
-            quantity = int(match.group(1))
+            # Attempt the operation:
+            try:
 
-            # Extract the card name from the second group:
-            name = match.group(2).strip()
+                # Run it:
+                result = operation()
 
-            # Extract the set code from the third group:
-            set = match.group(3).upper()
+                # The host answered, so the circuit stays closed:
+                breaker.record_success()
 
-            # Extract the collector number from the fourth group:
-            collector_number = match.group(4)
-            
-            # Return a dictionary with the extracted data:
-            return {
-                'quantity': quantity,
-                'name': name,
-                'set': set,
-                'collector_number': collector_number
-            }
-        
-        # If the line format is incorrect:
+                # Return the result:
+                return result
+
+            # If it fails:
+            except Exception as e:
+
+                # If the run was cancelled, don't retry (a trial request gives its slot back, so the
+                # breaker doesn't stay half-open for the next run):
+                if self.cancel_event.is_set():
+                    breaker.release_trial()
+                    raise
+
+                # If the error is not transient (e.g. 404), the host is fine but there is no point in retrying:
+                if not policy.is_transient(e):
+                    breaker.record_success()
+                    raise
+
+                # Register the failure (and log it if the circuit was opened):
+                if breaker.record_failure():
+                    self.log(f"Servidor no disponible, pausando las descargas {breaker.cooldown:.0f}s")
+
+                # If there are no retries left, give up:
+                if not policy.allow_retry(attempt):
+                    raise
+
+                # Calculate the delay before the next attempt:
+                delay = policy.delay(attempt)
+
+                # Log the retry:
+                self.log(f"Error temporal ({e}), reintento {attempt + 1}/{policy.max_retries} en {delay:.1f}s")
+
+                # Count the retry:
+                self.metrics.increment(f"retries_{kind}")
+
+                # Wait (stop waiting if the run is cancelled):
+                with self.metrics.timer('retry_wait'):
+                    self.cancel_event.wait(delay)
+
+                # Count the attempt:
+                attempt += 1
+
+    #
+    # Helper function to make a request to api.scryfall.com (throttling and retries included):
+    #
+    def api_request(self, method, url, **kwargs):
+
+        # Run the request with the API retry policy:
+        return self.with_retry('api', lambda: self.send_api_request(method, url, **kwargs))
+
+    #
+    # Helper function to send an API request, requeueing it if it is throttled:
+    #
+    def send_api_request(self, method, url, **kwargs):
+
+        # Use the default timeout:
+        kwargs.setdefault('timeout', self.timeout)
+
+        # Try again every time the API answers '429 Too Many Requests':
+        for attempt in range(self.MAX_THROTTLE_RETRIES + 1):
+
+            # Wait for the API rate limiter (the time spent waiting is registered):
+            self.metrics.observe('limiter_wait', self.api_limiter.acquire())
+
+            # Make the request (forgetting the setup time of a connection that failed before):
+            self.metrics.take_setup()
+            response = self.session.request(method, url, **kwargs)
+
+            # Get the connection setup time, if a new connection was opened (the elapsed time includes it):
+            setup = self.metrics.take_setup()
+            ttfb = max(0.0, response.elapsed.total_seconds() - setup)
+
+            # Register the request and its time to first byte:
+            self.metrics.increment('requests_api')
+            self.metrics.observe('ttfb_api', ttfb)
+            self.emit_request('api', url, response.status_code, connect=setup, ttfb=ttfb)
+
+            # If the request was not throttled:
+            if response.status_code != 429:
+
+                # Let the limiter recover its rate:
+                self.api_limiter.succeeded()
+
+                # Raise the transient server errors, so the retry policy handles them:
+                if response.status_code in RetryPolicy.RETRY_STATUSES:
+                    response.raise_for_status()
+
+                # Return the response:
+                return response
+
+            # If there are no attempts left, stop here:
+            if attempt == self.MAX_THROTTLE_RETRIES:
+                break
+
+            # Count the throttle:
+            self.metrics.increment('throttled')
+
+            # Slow down every worker for the time asked by the server (or an exponential backoff):
+            delay = self.api_limiter.throttled(response.headers.get('Retry-After'))
+
+            # Log the throttle:
+            self.log(f"API saturada (429), reintentando en {delay:.1f}s")
+
+        # Return the last response (it raises the 429 error later):
+        return response
+
+    #
+    # Helper function to read and parse a decklist only once:
+    #
+    def read_decklist(self, file_path):
+
+        # Use the file path as the cache key:
+        key = str(file_path)
+
+        # If the decklist was not parsed yet:
+        if key not in self.decklists:
+
+            # Parse it line by line, in a single pass:
+            self.decklists[key] = list(iter_decklist(file_path, self.log))
+
+        # Return the parsed cards:
+        return self.decklists[key]
+
+    #
+    # Enumerate every card of a set through the paginated search endpoint (one request per 175 cards):
+    #
+    def iter_set(self, set_code):
+
+        # In offline mode, take the set from the local bulk-data index (no API calls are made):
+        if self.offline_index:
+
+            # Get the cards of the set:
+            cards = self.offline_index.get_set(set_code)
+            if not cards:
+                raise LookupError(f"la colección {set_code} no está en el índice offline")
+
+            # Store and send each card (they are not copied to the metadata cache):
+            yield from self.set_card_requests(cards, cache=False)
+            return
+
+        # Build the URL and the query of the first page (every printing, in collector number order):
+        url = f"{self.BASE_URL}/cards/search"
+        params = {'q': f"e:{set_code}", 'unique': "prints", 'order': "set"}
+
+        # Keep going while there are more pages:
+        while url:
+
+            # Make the request (paced by the API rate limiter):
+            resp = self.api_request("GET", url, params=params)
+
+            # Scryfall answers '404' when the search has no cards:
+            if resp.status_code == 404:
+                raise LookupError(f"la colección {set_code} no existe o no tiene cartas")
+
+            # Raise an error for other bad responses:
+            resp.raise_for_status()
+
+            # Get the page:
+            page = resp.json()
+
+            # Store and send each card of the page:
+            yield from self.set_card_requests(page.get('data', []))
+
+            # The next page URL already carries the query:
+            url = page.get('next_page') if page.get('has_more') else None
+            params = None
+
+    #
+    # Helper function to store the cards of a set and build their requests (a single copy of each printing):
+    #
+    def set_card_requests(self, cards, cache=True):
+
+        # Initialise the list of requests:
+        card_requests = []
+
+        # Iterate through each card:
+        for card in cards:
+
+            # Build the key of the card:
+            key = self.card_key(card.get('set'), card.get('collector_number'))
+
+            # Store it, so the resolve stage makes no API calls:
+            if cache:
+                self.store_card(key, card)
+            else:
+                self.card_data[key] = card
+
+            # Add the request:
+            card_requests.append(CardRequest(1, card.get('name', ""), card.get('set'), card.get('collector_number'), "set"))
+
+        # Return the requests:
+        return card_requests
+
+    #
+    # Helper function to build the key of a card (set code and collector number):
+    #
+    def card_key(self, set_code, collector_number):
+
+        # Scryfall returns lowercase set codes, so normalise both values:
+        return (str(set_code).lower(), str(collector_number).lower())
+
+    #
+    # Metadata resolution stage: fetch every card object through batched collection calls:
+    #
+    def resolve_cards(self, card_infos):
+
+        # Resolve what is possible locally (offline index and metadata cache):
+        unresolved = self.resolve_local(card_infos)
+
+        # Consult the Scryfall API in batches (stale cached cards are refetched here too, 75 per request, instead of
+        # one conditional request each through the rate limiter):
+        for i in range(0, len(unresolved), 75):
+
+            # Slice the list to get the current batch:
+            batch = unresolved[i:i+75]
+
+            # Attempt the web request:
+            try:
+
+                # Make the POST request (paced by the API rate limiter):
+                resp = self.api_request("POST", f"{self.BASE_URL}/cards/collection",
+                                        json={"identifiers": [info.identifier() for info in batch]})
+
+                # Raise an error for bad responses:
+                resp.raise_for_status()
+
+                # Store the cards data:
+                self.store_collection(batch, resp.json().get('data', []))
+
+            # If the batch fails, those cards will be requested one by one later:
+            except Exception as e:
+
+                # Log the error:
+                self.log(f"Error API (lote {i // 75 + 1}): {e}")
+
+    #
+    # Helper function to resolve cards with no API calls (returns the cards to request, the stale cached ones included):
+    #
+    def resolve_local(self, card_infos):
+
+        # Initialise a list to store the cards not resolved yet:
+        unresolved = []
+
+        # Initialise a set to avoid asking for the same card twice:
+        pending = set()
+
+        # Iterate through each parsed card:
+        for info in card_infos:
+
+            # Build the card key (the printing, or the name for name-only lines):
+            key = info.key()
+
+            # Skip cards already resolved or already queued:
+            if key in self.card_data or key in pending:
+                continue
+
+            # Queue the card:
+            pending.add(key)
+
+            # In offline mode, resolve the card from the local bulk-data index only:
+            if self.offline_index:
+
+                # Look for the card by printing, or by name for name-only lines:
+                if info.set:
+                    card = self.offline_index.get(info.set, info.collector_number)
+                else:
+                    card = self.offline_index.get_by_name(info.name)
+
+                # If it was found, store it:
+                if card:
+                    self.card_data[key] = card
+
+                # Count the hit or miss:
+                self.metrics.increment('offline_index_hit' if card else 'offline_index_miss')
+
+                # Never call the API:
+                continue
+
+            # Look for the card in the metadata cache:
+            cached = self.metadata_cache.get("/".join(key)) if self.metadata_cache else None
+
+            # Count the hit or miss (stale cards are misses):
+            if self.metadata_cache:
+                self.metrics.increment('metadata_cache_hit' if cached and cached['fresh'] else 'metadata_cache_miss')
+
+            # If the cached card is still fresh, use it with no API calls:
+            if cached and cached['fresh']:
+                self.card_data[key] = cached['card']
+                continue
+
+            # Add the card to the list (a stale card is refetched in the batch, if the batch misses it, it is
+            # revalidated later with a conditional request):
+            unresolved.append(info)
+
+        # Return the list:
+        return unresolved
+
+    #
+    # Helper function to store the cards returned by a collection request:
+    #
+    def store_collection(self, batch, cards):
+
+        # Initialise the lookup of the returned cards by name (for name-only lines):
+        by_name = {}
+
+        # Iterate through each card object:
+        for card in cards:
+
+            # Store the card by its printing:
+            self.store_card(self.card_key(card.get('set'), card.get('collector_number')), card)
+
+            # Register the full name and the name of each face:
+            by_name[card.get('name', '').lower()] = card
+            for face in card.get('card_faces', []):
+                by_name.setdefault(face.get('name', '').lower(), card)
+
+        # Store the cards requested by name:
+        for info in batch:
+            if not info.set and info.name.lower() in by_name:
+                self.store_card(info.key(), by_name[info.name.lower()])
+
+    #
+    # Helper function to store a resolved card (also in the metadata cache for the next runs):
+    #
+    def store_card(self, key, card):
+
+        # Store the card object:
+        self.card_data[key] = card
+
+        # Store it in the metadata cache:
+        if self.metadata_cache:
+            self.metadata_cache.put("/".join(key), card)
+
+    #
+    # Helper function to get the data of a single card:
+    #
+    def get_card_data(self, card_info):
+
+        # Build the card key:
+        key = card_info.key()
+
+        # If the card was resolved in the batch stage, return it with no extra requests:
+        if key in self.card_data:
+            return self.card_data[key]
+
+        # In offline mode, a card missing from the index can't be requested:
+        if self.offline_index:
+            raise LookupError("la carta no está en el índice offline")
+
+        # Look for the card in the metadata cache (stale entries are revalidated):
+        cached = self.metadata_cache.get("/".join(key)) if self.metadata_cache else None
+
+        # Request the card from the API:
+        return self.fetch_card(card_info, cached)
+
+    #
+    # Helper function to request a single card, conditionally if it is cached:
+    #
+    def fetch_card(self, card_info, cached=None):
+
+        # Build the URL and the conditional headers:
+        api_url, headers = self.card_request(card_info, cached)
+
+        # GET request to the Scryfall API (paced by the API rate limiter):
+        response = self.api_request("GET", api_url, headers=headers)
+
+        # Store and return the card:
+        return self.store_card_response(card_info, cached, response)
+
+    #
+    # Helper function to build the URL and headers of a single card request:
+    #
+    def card_request(self, card_info, cached=None):
+
+        # Construct the Scryfall API URL for the card (by printing, or by exact name):
+        if card_info.set:
+            api_url = f"{self.BASE_URL}/cards/{card_info.set}/{card_info.collector_number}"
         else:
+            api_url = f"{self.BASE_URL}/cards/named?exact={quote(card_info.name)}"
 
-            # Log the error message if the line format:
-            self.log(f"No se pudo parsear: {line}")
+        # Initialise the conditional request headers:
+        headers = {}
+
+        # If the card is cached with validators, only ask for it if it changed:
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        # Return both:
+        return api_url, headers
 
-            # End the function:
-            return None
-        
     #
-    # Helper function to check whether the decklist has DFCs:
+    # Helper function to store the answer of a single card request (returns the card data):
     #
-    def check_for_dfcs(self, file_path):
+    def store_card_response(self, card_info, cached, response):
 
-        # Attempt the web request:
-        try:
-            
-            # Open the file:
-            with open(file_path, 'r', encoding='utf-8') as f:
+        # Build the card key:
+        key = card_info.key()
 
-                # Read the lines:
-                lines = f.readlines()
-            
-            # Initialise a list to store identifiers:
-            identifiers = []
+        # If the cached card didn't change:
+        if response.status_code == 304 and cached:
 
-            # Iterate through each line:
-            for line in lines:
+            # Count the revalidation:
+            self.metrics.increment('metadata_revalidated')
 
-                # Extract the card info:
-                info = self.parse_moxfield_line(line)
+            # Mark it as fresh again:
+            self.metadata_cache.touch("/".join(key))
 
-                # If the line is valid:
-                if info:
+            # Store and return the cached card:
+            self.card_data[key] = cached['card']
+            return self.card_data[key]
 
-                    # Add the set and collector number to the list:
-                    identifiers.append({"set": info['set'], "collector_number": info['collector_number']})
-            
-            # Consult the Scryfall API in batches:
-            for i in range(0, len(identifiers), 75):
+        # Ensure the response is successful:
+        response.raise_for_status()
+
+        # Parse and store the JSON data:
+        self.card_data[key] = response.json()
 
-                # Slice the list to get the current batch:
-                batch = identifiers[i:i+75]
+        # Store it in the metadata cache with its validators:
+        if self.metadata_cache:
+            self.metadata_cache.put(
+                "/".join(key),
+                self.card_data[key],
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+
+        # Return the card data:
+        return self.card_data[key]
+
+    #
+    # Helper function to check whether the decklist has DFCs:
+    #
+    def check_for_dfcs(self, file_path):
 
-                # Make the POST request:
-                resp = requests.post(f"{self.BASE_URL}/cards/collection", json={"identifiers": batch})
+        # Attempt the web request:
+        try:
+            
+            # Read the parsed decklist:
+            card_infos = self.read_decklist(file_path)
 
-                # If the response is successful:
-                if resp.status_code == 200:
+            # Resolve every card in batches (the results are kept for the download):
+            self.resolve_cards(card_infos)
 
-                    # Extract the cards data:
-                    cards = resp.json().get('data', [])
+            # For each card:
+            for info in card_infos:
 
-                    # For each card:
-                    for card in cards:
+                # Get the resolved card object:
+                card = self.card_data.get(info.key(), {})
 
-                        # If a card has faces but no main image URI, it is a DFC:
-                        if 'card_faces' in card and 'image_uris' not in card:
+                # If a card has faces but no main image URI, it is a DFC:
+                if 'card_faces' in card and 'image_uris' not in card:
 
-                            # Return True the first time a DFC is found:
-                            return True
+                    # Return True the first time a DFC is found:
+                    return True
                         
             # If no DFCs were found, return False:
             return False
@@ -170,19 +856,80 @@ class ScryfallDownloader:
             return False
     
     #
-    # Image file download method:
+    # Helper function to write the extra copies of an already downloaded file:
     #
-    def download_image(self, card_data, dfc_policy="both", copy_number=None, copy_suffix=""):
+    def write_copies(self, source_path, copy_paths):
 
-        # Clean the name for filenames (replace / or // with _):
-        card_name = card_data.get('name', 'Unknown').replace(" // ", "_").replace("/", "_")
+        # Iterate through each extra copy path:
+        for copy_path in copy_paths:
 
-        # Get the set code from the data:
-        set_code = card_data.get('set', 'Unknown')
+            # Remove any previous file so the link can be created:
+            if copy_path.exists():
+                copy_path.unlink()
+
+            # Try a hardlink first, it costs no extra disk space:
+            try:
+                os.link(source_path, copy_path)
+                continue
+
+            # If the filesystem doesn't support hardlinks:
+            except OSError:
+                pass
+
+            # Try a reflink (copy-on-write clone) where the filesystem supports it:
+            if self.reflink(source_path, copy_path):
+                continue
+
+            # Otherwise, copy the bytes:
+            shutil.copyfile(source_path, copy_path)
+
+    #
+    # Helper function to clone a file with a reflink (Linux only: Btrfs, XFS...):
+    #
+    def reflink(self, source_path, copy_path):
+
+        # Reflinks are only available through the Linux FICLONE ioctl:
+        if fcntl is None or not sys.platform.startswith("linux"):
+            return False
+
+        # Attempt the clone:
+        try:
+
+            # Open both files and ask the kernel to share the data blocks:
+            with open(source_path, 'rb') as src, open(copy_path, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), self.FICLONE, src.fileno())
+
+            # Return True if the clone worked:
+            return True
+
+        # If the filesystem doesn't support reflinks:
+        except OSError:
+
+            # Remove the empty file left behind:
+            if copy_path.exists():
+                copy_path.unlink()
+
+            # Return False to fall back to a regular copy:
+            return False
+
+    #
+    # Helper function to pick the first available image variant of a card or face:
+    #
+    def pick_variant(self, image_uris, variants=None):
+
+        # Try each variant of the fallback chain in order:
+        for variant in variants or self.image_variants:
+            if image_uris.get(variant):
+                return image_uris[variant], variant
+
+        # If none is available, the card can't be downloaded:
+        raise LookupError(f"ninguna imagen disponible ({', '.join(variants or self.image_variants)})")
+
+    #
+    # Helper function to get the image URLs of a card, following the DFC policy and the image profile:
+    #
+    def image_urls(self, card_data, dfc_policy="both", variants=None):
 
-        # Get the collector number from the data:
-        collector_num = card_data.get('collector_number', 'Unknown')
-        
         # Initialise the list of URLs to process:
         urls_to_download = []
 
@@ -196,7 +943,8 @@ class ScryfallDownloader:
             if dfc_policy in ["front", "both"]:
 
                 # Add the front face URL:
-                urls_to_download.append((faces[0]['image_uris']['png'], "front"))
+                url, variant = self.pick_variant(faces[0]['image_uris'], variants)
+                urls_to_download.append((url, "front", variant))
 
             # If 'back' was chosen as the selected policy:
             if dfc_policy in ["back", "both"]:
@@ -205,159 +953,589 @@ class ScryfallDownloader:
                 if 'image_uris' in faces[1]:
 
                     # Add the back face URL:
-                    urls_to_download.append((faces[1]['image_uris']['png'], "back"))
+                    url, variant = self.pick_variant(faces[1]['image_uris'], variants)
+                    urls_to_download.append((url, "back", variant))
 
         # If it is a single-faced card:
         else:
 
             # Add the main URL with no suffix:
-            urls_to_download.append((card_data['image_uris']['png'], ""))
+            url, variant = self.pick_variant(card_data['image_uris'], variants)
+            urls_to_download.append((url, "", variant))
 
-        # Initialise the success flag:
-        success = True
+        # Return the list of URLs, face suffixes and variants:
+        return urls_to_download
 
-        # Copy number suffix:
-        copy_suffix = f"_{copy_number}" if copy_number else ""
+    #
+    # Helper function to get the numbered file paths of every copy of a face (numbered from 'first', so the copies
+    # of a printing repeated in a later line don't overwrite the earlier ones):
+    #
+    def image_filepaths(self, card_data, face_suffix, quantity=1, output_folder=None, variant="png", first=1):
 
-        # Iterate through each URL to download:
-        for url, face_suffix in urls_to_download:
+        # Clean the name for filenames (replace / or // with _):
+        card_name = card_data.get('name', 'Unknown').replace(" // ", "_").replace("/", "_")
+
+        # Get the set code from the data:
+        set_code = card_data.get('set', 'Unknown')
+
+        # Get the collector number from the data:
+        collector_num = card_data.get('collector_number', 'Unknown')
+
+        # Format the suffix string if it exists:
+        face_str = f"_{face_suffix}" if face_suffix else ""
+
+        # Only the 'png' variant is a PNG file, the rest are JPEG files:
+        extension = "png" if variant == "png" else "jpg"
+
+        # Use the downloader output folder by default:
+        output_folder = Path(output_folder) if output_folder else self.output_folder
+
+        # Initialise the list of numbered files for this face:
+        filepaths = []
+
+        # Construct the filename of each copy:
+        for copy_number in range(first, first + quantity):
+
+            # Add a copy number suffix to avoid overwriting if multiple copies:
+            copy_suffix = f"_{copy_number}" if quantity > 1 or first > 1 else ""
 
-            # Format the suffix string if it exists:
-            face_str = f"_{face_suffix}" if face_suffix else ""
-            
             # Construct the final filename:
-            filename = f"{card_name}{face_str}{copy_suffix}_{set_code}_{collector_num}.png"
+            filename = f"{card_name}{face_str}{copy_suffix}_{set_code}_{collector_num}.{extension}"
 
             # Construct the full filepath:
-            filepath = self.output_folder / filename
-            
-            # Start the download attempt:
+            filepaths.append(output_folder / filename)
+
+        # Return the file paths:
+        return filepaths
+
+    #
+    # Helper function to build the image cache key of a face (None if the cache is disabled):
+    #
+    def image_cache_key(self, card_data, face_suffix, variant="png"):
+
+        # Use the Scryfall card id, the face and the image variant:
+        return self.image_cache.key(card_data.get('id'), face_suffix, variant) if self.image_cache else None
+
+    #
+    # Helper function to stream a download to a temporary file and rename it when complete:
+    #
+    def stream_to_file(self, url, filepath):
+
+        # Write to a temporary file, so no half-written images are left behind (one per thread, since
+        # repeated decklist lines can fetch the same file at the same time):
+        temp_path = filepath.with_name(f"{filepath.name}.{threading.get_ident()}.part")
+
+        # Attempt the transfer:
+        try:
+
+            # Open the temporary file in BINARY WRITE MODE and write the body to it:
+            with open(temp_path, 'wb') as f:
+                self.stream_body(url, f)
+
+            # Rename the complete file in a single step:
+            os.replace(temp_path, filepath)
+
+        # If anything fails (or the run is interrupted):
+        except BaseException:
+
+            # Remove the temporary file:
+            temp_path.unlink(missing_ok=True)
+
+            # Raise the error again:
+            raise
+
+    #
+    # Helper function to stream a download into a spooled buffer (archive mode: the image is kept in memory,
+    # or in an anonymous temporary file if it is very big, until its entries are written):
+    #
+    def stream_to_spool(self, url):
+
+        # Create the spooled buffer:
+        spool = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE)
+
+        # Attempt the transfer, with the image retry policy:
+        try:
+            self.with_retry('image', lambda: self.stream_body(url, spool))
+
+        # If it fails, release the buffer:
+        except BaseException:
+            spool.close()
+            raise
+
+        # Return the buffer:
+        return spool
+
+    #
+    # Helper function to make the GET request of an image and write its body to a file object in chunks:
+    #
+    def stream_body(self, url, target):
+
+        # Start from an empty target (a retry writes the whole body again):
+        target.seek(0)
+        target.truncate()
+
+        # Make the GET request, reading the body in chunks (forgetting the setup time of a connection that failed before):
+        self.metrics.take_setup()
+        with self.session.get(url, timeout=self.timeout, stream=True) as res:
+
+            # Get the connection setup time, if a new connection was opened (the elapsed time includes it):
+            setup = self.metrics.take_setup()
+            ttfb = max(0.0, res.elapsed.total_seconds() - setup)
+
+            # Register the request and its time to first byte:
+            self.metrics.increment('requests_image')
+            self.metrics.observe('ttfb_image', ttfb)
+
+            # Raise an error for bad responses (their request event has no transfer):
+            if not res.ok:
+                self.emit_request('image', url, res.status_code, connect=setup, ttfb=ttfb)
+            res.raise_for_status()
+
+            # Get the expected size (only comparable if the body is not compressed):
+            expected_size = None if res.headers.get('Content-Encoding') else res.headers.get('Content-Length')
+
+            # Initialise the written bytes counter:
+            written = 0
+
+            # Initialise the time spent receiving and writing the body:
+            transfer_time = write_time = 0.0
+
+            # Store the time the transfer started:
+            mark = time.perf_counter()
+
+            # Write each chunk as it arrives:
+            for chunk in res.iter_content(chunk_size=self.CHUNK_SIZE):
+
+                # Add the time spent waiting for the chunk:
+                received = time.perf_counter()
+                transfer_time += received - mark
+
+                # Stop the transfer if the run was cancelled:
+                if self.cancel_event.is_set():
+                    raise IOError("descarga cancelada")
+
+                # Write the chunk:
+                target.write(chunk)
+                written += len(chunk)
+
+                # Add the time spent writing it:
+                mark = time.perf_counter()
+                write_time += mark - received
+
+            # Add the time spent waiting for the end of the body:
+            transfer_time += time.perf_counter() - mark
+
+        # Register the transfer, the disk write and the bytes received:
+        self.metrics.observe('transfer', transfer_time)
+        self.metrics.observe('disk_write', write_time)
+        self.metrics.increment('bytes_image', written)
+        self.emit_request('image', url, res.status_code, connect=setup, ttfb=ttfb, transfer=transfer_time,
+                          write=write_time, bytes=written)
+
+        # If the transfer was cut short, raise an error:
+        if expected_size is not None and written != int(expected_size):
+            raise IncompleteDownloadError(f"descarga incompleta ({written} de {expected_size} bytes)")
+
+    #
+    # Fetch a single image, from the cache or the network (returns the path of a local copy, or a spooled
+    # buffer in archive mode; its cache entry stays pinned until 'fan_out_face' releases it):
+    #
+    def fetch_image(self, url, filepath, cache_key=None):
+
+        # Look for the image in the local cache:
+        cached_path = self.image_cache.get(cache_key) if cache_key else None
+
+        # Count the hit or miss, if the cache is enabled:
+        if cache_key:
+            self.metrics.increment('image_cache_hit' if cached_path else 'image_cache_miss')
+
+        # If the image is already cached:
+        if cached_path:
+
+            # Log the cache hit:
+            self.log(f"Desde caché: {filepath.name}")
+
+            # Return the cached file, with no requests:
+            return cached_path
+
+        # Log the current download progress:
+        self.log(f"Descargando: {filepath.name}")
+
+        # In archive mode, no loose file is written in the output folder:
+        if self.archive_format:
+
+            # Without a cache, the image is kept in a spooled buffer until its entries are written:
+            if not cache_key:
+                return self.stream_to_spool(url)
+
+            # With a cache, the image is streamed straight to its cache file (kept for the next runs):
+            cache_path = self.image_cache.path_for(cache_key)
+            self.with_retry('image', lambda: self.stream_to_file(url, cache_path))
+            self.image_cache.add(cache_key)
+
+            # Return the cached file:
+            return cache_path
+
+        # Stream the image to disk (the whole body is never held in memory), with the image retry policy:
+        self.with_retry('image', lambda: self.stream_to_file(url, filepath))
+
+        # If the cache is enabled, store the image for the next decklists:
+        if cache_key:
+            self.cache_image(filepath, cache_key)
+
+        # Return the downloaded file:
+        return filepath
+
+    #
+    # Helper function to store a downloaded image in the local cache:
+    #
+    def cache_image(self, filepath, cache_key):
+
+        # Copy the image to its cache path:
+        self.write_copies(filepath, [self.image_cache.path_for(cache_key)])
+
+        # Register it in the cache index:
+        self.image_cache.add(cache_key)
+
+    #
+    # Helper function to get the job manifest of an output folder:
+    #
+    def manifest_for(self, output_folder):
+
+        # Only one thread can create manifests at a time:
+        with self.manifests_lock:
+
+            # Create the manifest the first time the folder is used:
+            if output_folder not in self.manifests:
+                self.manifests[output_folder] = JobManifest(output_folder)
+
+            # Return the manifest:
+            return self.manifests[output_folder]
+
+    #
+    # Helper function to save every job manifest:
+    #
+    def save_manifests(self):
+
+        # Save each manifest:
+        for manifest in self.manifests.values():
+            manifest.save()
+
+    #
+    # Helper function to get the archive writer of an output folder (the archive sits next to the folder):
+    #
+    def archive_for(self, output_folder):
+
+        # Only one thread can create archives at a time:
+        with self.archives_lock:
+
+            # Open the archive the first time the folder is used:
+            if output_folder not in self.archives:
+                extension = ArchiveWriter.FORMATS[self.archive_format]
+                self.archives[output_folder] = ArchiveWriter(
+                    output_folder.with_name(output_folder.name + extension), self.archive_format
+                )
+
+            # Return the archive writer:
+            return self.archives[output_folder]
+
+    #
+    # Helper function to write a fetched image (a cached file or a spooled download) and its copies into the
+    # archives of their folders:
+    #
+    def write_archive(self, source, filepaths):
+
+        # Group the copies by output folder, keeping their order:
+        folders = {}
+        for path in filepaths:
+            folders.setdefault(path.parent, []).append(path.name)
+
+        # Attempt to write the entries of each archive (from the cached file or the spooled download):
+        try:
+            with self.metrics.timer('copies'):
+                for output_folder, names in folders.items():
+                    self.archive_for(output_folder).add(source, names)
+
+        # Release the spooled download, if any (the cached file is kept):
+        finally:
+            if not isinstance(source, Path):
+                source.close()
+
+    #
+    # Helper function to finish every archive of the run:
+    #
+    def close_archives(self):
+
+        # Iterate through each archive:
+        for output_folder, archive in self.archives.items():
+
+            # Finish it and log the result:
+            entries = archive.close()
+            self.log(f"Archivo: {archive.path.name} ({entries} imágenes)")
+
+            # Remove the folder used to download the images, if it was left empty:
             try:
+                output_folder.rmdir()
+            except OSError:
+                pass
 
-                # Log the current download progress:
-                self.log(f"Descargando: {filename}")
+        # Forget the archives of this run:
+        self.archives = {}
 
-                # Make the GET request:
-                res = requests.get(url, timeout=30)
+    #
+    # Check whether every file of a face was completed in a previous run (and log it):
+    #
+    def face_is_complete(self, url, filepaths):
 
-                # Raise an error for bad responses:
-                res.raise_for_status()
+        # The archives are written from scratch on every run (the image cache makes reruns cheap):
+        if self.archive_format:
+            return False
 
-                # Open the file in BINARY WRITE MODE:
-                with open(filepath, 'wb') as f:
+        # If any file is missing or changed, the face must be written:
+        for path in filepaths:
+            if not self.manifest_for(path.parent).is_complete(path, url):
+                return False
 
-                    # Write the image content:
-                    f.write(res.content)
+        # Log the skipped file:
+        self.log(f"Ya descargado: {filepaths[0].name}")
 
-                # Wait for the API delay to avoid rate limiting:
-                time.sleep(self.DELAY)
+        # Return True:
+        return True
 
-            # If a download fails:
-            except Exception as e:
+    #
+    # Helper function to record the planned files of a face (there are no loose files to record in archive mode):
+    #
+    def plan_face(self, url, filepaths):
 
-                # Log the error message:
-                self.log(f"Error en {filename}: {e}")
+        # Skip it in archive mode:
+        if self.archive_format:
+            return
 
-                # Set the success flag to False:
-                success = False
+        # Record each file:
+        for path in filepaths:
+            self.manifest_for(path.parent).plan(path, url)
 
-        # Return the final success status:
-        return success
-    
     #
-    # Main function to process the decklist:
+    # Fetch stage of a face: record the planned files and fetch the image once:
     #
-    def process_decklist(self, file_path, dfc_policy="both"):
+    def fetch_face(self, url, filepaths, cache_key=None):
 
-        # Create the output folder when the process starts:
-        self.output_folder.mkdir(parents=True, exist_ok=True)
+        # Record the planned files:
+        self.plan_face(url, filepaths)
 
-        # Set the start time:
-        self.start_time = time.time()
-        
-        # Start the file processing block:
+        # Fetch the image once (from the cache or the network) and return its local path:
+        return self.fetch_image(url, filepaths[0], cache_key)
+
+    #
+    # Write stage of a face: write every copy from the fetched image and record them (the cache entry pinned by
+    # 'fetch_image' is released afterwards, if the key is given):
+    #
+    def fan_out_face(self, source_path, url, filepaths, cache_key=None):
+
+        # Attempt to write the copies:
         try:
+            self.write_copies_of(source_path, url, filepaths)
 
-            # Open the decklist file:
-            with open(file_path, 'r', encoding='utf-8') as f:
+        # Let the cache evict the image again:
+        finally:
+            if cache_key:
+                self.image_cache.release(cache_key)
 
-                # Read all lines:
-                lines = f.readlines()
+    #
+    # Helper function to write every copy of a face from the fetched image and record them:
+    #
+    def write_copies_of(self, source_path, url, filepaths):
 
-            # Process each line:
-            for line in lines:
+        # In archive mode, write the copies as entries of the deck archive instead:
+        if self.archive_format:
+            self.write_archive(source_path, filepaths)
+            return
 
-                # Extract the card info:
-                card_info = self.parse_moxfield_line(line)
+        # If there are more copies:
+        if len(filepaths) > 1:
 
-                # If the line is invalid or empty:
-                if not card_info:
+            # Log the copies being written from the same image:
+            self.log(f"Copiando: {filepaths[0].name} x{len(filepaths)}")
 
-                    # Skip it:
-                    continue
+        # Write the rest of the copies locally, with no extra requests:
+        with self.metrics.timer('copies'):
+            self.write_copies(source_path, [path for path in filepaths if path != source_path])
 
-                # Save the number of copies to download:
-                quantity = card_info.get('quantity', 1)
+        # Mark every file as completed:
+        for path in filepaths:
+            self.manifest_for(path.parent).mark_done(path, url)
 
-                # Construct the Scryfall API URL for the card:
-                api_url = f"{self.BASE_URL}/cards/{card_info['set']}/{card_info['collector_number']}"
-                
-                # Request individual card data:
-                try:
+    #
+    # Helper function to record a face that couldn't be written:
+    #
+    def fail_face(self, url, filepaths, error):
 
-                    # GET request to the Scryfall API:
-                    response = requests.get(api_url, timeout=30)
+        # Log the error message:
+        self.log(f"Error en {filepaths[0].name}: {error}")
 
-                    # Ensure the response is successful:
-                    response.raise_for_status()
+        # Mark the files as failed, so the next run retries them:
+        if not self.archive_format:
+            for path in filepaths:
+                self.manifest_for(path.parent).mark_failed(path, url, error)
 
-                    # Parse the JSON data:
-                    card_data = response.json()
-                    
-                    # Download each copy:
-                    for i in range(1, quantity + 1):
+    #
+    # Write a face and all its copies, skipping the files completed in a previous run:
+    #
+    def write_face(self, url, filepaths, cache_key=None):
 
-                        # Increment the total card counter:
-                        self.stats['total'] += 1
+        # If every file is already complete and valid, there is nothing to do:
+        if self.face_is_complete(url, filepaths):
+            return True
 
-                        # Add a suffix to avoid overwriting if multiple copies:
-                        copy_suffix = f"{i}" if quantity > 1 else ""
-                        
-                        # Call 'download_image' with the suffix:
-                        if self.download_image(card_data, dfc_policy, copy_suffix):
+        # Start the download attempt:
+        try:
 
-                            # Increment the successful counter:
-                            self.stats['successful'] += 1
+            # Fetch the image once and write every copy from it:
+            self.fan_out_face(self.fetch_face(url, filepaths, cache_key), url, filepaths, cache_key)
 
-                        # If the download failed:
-                        else:
+            # Return True:
+            return True
 
-                            # Increment the failed counter:
-                            self.stats['failed'] += 1
-                        
-                # Catch any API exceptions:
-                except Exception as e:
+        # If a download fails:
+        except Exception as e:
+
+            # Record the failure:
+            self.fail_face(url, filepaths, e)
+
+            # Return False:
+            return False
+
+    #
+    # Image file download method:
+    #
+    def download_image(self, card_data, dfc_policy="both", quantity=1):
+
+        # Initialise the success flag:
+        success = True
+
+        # Iterate through each URL to download (each face only once):
+        for url, face_suffix, variant in self.image_urls(card_data, dfc_policy):
+
+            # Get the numbered files for this face:
+            filepaths = self.image_filepaths(card_data, face_suffix, quantity, variant=variant)
+
+            # Write the face (fetched once) and all its copies:
+            if not self.write_face(url, filepaths, self.image_cache_key(card_data, face_suffix, variant)):
+
+                # Set the success flag to False:
+                success = False
+
+        # Return the final success status:
+        return success
+    
+    #
+    # Helper function to send the progress event of a card:
+    #
+    def emit_card(self, card_info, status, error=None):
+
+        # Send the card data, its status and the current statistics:
+        self.emit(
+            "card",
+            name=card_info.name,
+            set=card_info.set,
+            collector_number=card_info.collector_number,
+            copies=card_info.quantity,
+            status=status,
+            error=error,
+            **self.stats
+        )
+
+    #
+    # Main function to process the decklist:
+    #
+    def process_decklist(self, file_path, dfc_policy="both", preview=False, compositor=None, post_processor=None,
+                         card_infos=None):
+
+        # The thread running the process is the one that shows the log messages:
+        self.owner_thread = threading.get_ident()
+
+        # Create the output folder when the process starts:
+        self.output_folder.mkdir(parents=True, exist_ok=True)
 
-                    # Log the API error:
-                    self.log(f"Error API ({card_info['name']}): {e}")
+        # Set the start time:
+        self.start_time = time.time()
+        
+        # Initialise the file error flag:
+        file_error = False
+
+        # Start the file processing block:
+        try:
 
-                    # Increment the failed counter:
-                    self.stats['failed'] += 1
-                
-                # Sleep between cards to respect the API limits:
-                time.sleep(self.DELAY)
+            # In preview mode, create the preview folder (the small images of each batch go through the same
+            # pipeline before its full-size ones, with the cards resolved only once):
+            preview_folder = None
+            if preview:
+                preview_folder = self.output_folder / self.PREVIEW_FOLDER
+                preview_folder.mkdir(parents=True, exist_ok=True)
+                self.log(f"Descargando vista previa en {preview_folder.name}")
+
+            # Create the pipeline (parse -> resolve -> fetch -> write, with bounded queues):
+            pipeline = DownloadPipeline(
+                self,
+                dfc_policy,
+                fetch_workers=self.workers,
+                write_workers=self.write_workers,
+                queue_size=self.queue_size,
+                compositor=compositor,
+                post_processor=post_processor,
+                preview_variants=self.PREVIEW_VARIANTS if preview else None,
+                preview_folder=preview_folder
+            )
+
+            # Run it (the stages overlap, so lookups continue while images download):
+            file_error = not pipeline.run(file_path, card_infos)
 
         # Catch any general file processing errors:
         except Exception as e:
 
             # Log the error:
             self.log(f"Error procesando archivo: {e}")
+
+            # Set the file error flag:
+            file_error = True
         
+        # Finish the archives, if any:
+        self.close_archives()
+
+        # Save the job manifests, so a rerun only costs the remainder:
+        self.save_manifests()
+
         # Set the end time:
         self.end_time = time.time()
         
         # Display the summary:
         self.print_summary()
+
+        # Send and save the metrics of the run:
+        self.export_metrics()
+
+        # Send the summary event:
+        self.emit(
+            "summary",
+            decklist=str(file_path),
+            output=str(self.output_folder.absolute()),
+            elapsed=round(self.end_time - self.start_time, 3),
+            file_error=file_error,
+            cancelled=self.cancel_event.is_set(),
+            **self.stats
+        )
+
+        # Return True if every card was downloaded:
+        return not file_error and not self.cancel_event.is_set() and self.stats['failed'] == 0
+
+    #
+    # Main function to download every card of a set (set mode, no decklist needed):
+    #
+    def process_set(self, set_code, dfc_policy="both", compositor=None, post_processor=None):
+
+        # Run the pipeline with the cards of the search pages (the downloads start with the first page):
+        return self.process_decklist(f"e:{set_code}", dfc_policy, compositor=compositor, post_processor=post_processor,
+                                     card_infos=self.iter_set(set_code))
     
     # Define the method to display the final summary:
     def print_summary(self):
@@ -401,8 +1579,43 @@ class ScryfallDownloader:
         # Log the total time taken:
         self.log(f"Tiempo total: {time_str}")
 
+        # Log where the time went (network, rate limiter or disk):
+        for line in self.metrics.summary_lines():
+            self.log(f"  {line}")
+
         # Log the absolute path where images were saved:
         self.log(f"Carpeta de salida: {self.output_folder.absolute()}")
 
         # Log the closing separator:
-        self.log("="*50)
\ No newline at end of file
+        self.log("="*50)
+
+    #
+    # Send the metrics of the run as an event and save the JSON report and Prometheus file, if requested:
+    #
+    def export_metrics(self):
+
+        # Get the report:
+        report = self.metrics.report()
+
+        # Send the metrics event:
+        self.emit("metrics", **report)
+
+        # Attempt to save the files:
+        try:
+
+            # Save the JSON report:
+            if self.metrics_file:
+                self.metrics.write_json(self.metrics_file)
+
+            # Save the Prometheus text file:
+            if self.prometheus_file:
+                self.metrics.write_prometheus(self.prometheus_file)
+
+        # If a file can't be written, the run itself is still valid:
+        except OSError as e:
+
+            # Log the error:
+            self.log(f"Error guardando las métricas: {e}")
+
+        # Return the report:
+        return report
@@ -0,0 +1,38 @@
+################################################
+# SHARED FIXTURES OF THE TESTS (MOCK SCRYFALL) #
+################################################
+
+# Import the required libraries:
+import os
+import sys
+
+import pytest
+
+# Make the repository modules and the mock server importable:
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# Import the mock server:
+from mock_scryfall import MockScryfall
+
+#
+# Fixture that starts mock servers with the given options and stops them after the test:
+#
+@pytest.fixture
+def start_mock():
+
+    # Initialise the list of started servers:
+    servers = []
+
+    # Helper function to start a server:
+    def start(mock_class=MockScryfall, **options):
+        servers.append(mock_class(**options).start())
+        return servers[-1]
+
+    # Give the helper to the test:
+    yield start
+
+    # Stop every server:
+    for server in servers:
+        server.stop()
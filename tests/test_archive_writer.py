@@ -0,0 +1,109 @@
+###############################
+# TESTS OF THE ARCHIVE WRITER #
+###############################
+
+# Import the required libraries:
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+# Import the archive writer and the downloader:
+from archive_writer import ArchiveWriter
+from scryfall_downloader import ScryfallDownloader
+
+#
+# In a tar, the first copy of an image has the data and the rest are hardlinks to it:
+#
+def test_tar_copies_are_hardlinks(tmp_path):
+
+    # Write an image:
+    image = tmp_path / "imagen.png"
+    image.write_bytes(b"png" * 100000)
+
+    # Add it with three copies (a repeated name is skipped), then the same name again:
+    writer = ArchiveWriter(tmp_path / "mazo.tar", "tar")
+    writer.add(image, ["Card_1.png", "Card_2.png", "Card_2.png", "Card_3.png"])
+    writer.add(image, ["Card_1.png"])
+    assert writer.close() == 3
+
+    # Read the archive:
+    with tarfile.open(tmp_path / "mazo.tar") as archive:
+        members = archive.getmembers()
+
+        # Only the first entry has data:
+        assert [member.name for member in members] == ["Card_1.png", "Card_2.png", "Card_3.png"]
+        assert members[0].isfile() and members[0].size == 300000
+        assert all(member.islnk() and member.linkname == "Card_1.png" for member in members[1:])
+
+        # Every copy reads as the image:
+        for member in members:
+            assert archive.extractfile(member).read() == image.read_bytes()
+
+    # The data is stored once (the archive is much smaller than three copies):
+    assert (tmp_path / "mazo.tar").stat().st_size < 2 * 300000
+
+#
+# A ZIP has a stored entry per copy, written from a file path or a spooled download:
+#
+def test_zip_is_valid_and_stored(tmp_path):
+
+    # Write an image and keep another one in memory (like a spooled download):
+    image = tmp_path / "imagen.png"
+    image.write_bytes(b"png" * 1000)
+    spooled = io.BytesIO(b"jpg" * 500)
+
+    # Add both, with two copies of the second one:
+    writer = ArchiveWriter(tmp_path / "mazo.zip", "zip")
+    writer.add(image, ["Card 1.png"])
+    writer.add(spooled, ["Card 2_1.jpg", "Card 2_2.jpg"])
+    assert writer.close() == 3
+
+    # The archive is valid, with every copy stored as it is:
+    with zipfile.ZipFile(tmp_path / "mazo.zip") as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["Card 1.png", "Card 2_1.jpg", "Card 2_2.jpg"]
+        assert all(entry.compress_type == zipfile.ZIP_STORED for entry in archive.infolist())
+        assert archive.read("Card 1.png") == image.read_bytes()
+        assert archive.read("Card 2_2.jpg") == b"jpg" * 500
+
+#
+# An unknown format is rejected:
+#
+def test_unknown_format_is_rejected(tmp_path):
+
+    # Only 'zip' and 'tar' are accepted:
+    with pytest.raises(ValueError):
+        ArchiveWriter(tmp_path / "mazo.7z", "7z")
+
+#
+# In archive mode, a deck is written into a single archive next to its folder, with no loose files:
+#
+@pytest.mark.parametrize("archive_format", ["zip", "tar"])
+def test_deck_is_archived(start_mock, tmp_path, archive_format):
+
+    # Start the server and write a decklist:
+    mock = start_mock(image_size=1000)
+    decklist = tmp_path / "mazo.txt"
+    decklist.write_text("2 Card 1 (BEN) 1\n1 Card 2 (BEN) 2\n", encoding='utf-8')
+
+    # Download it:
+    downloader = ScryfallDownloader(tmp_path / "imagenes", echo=False, archive_format=archive_format)
+    downloader.BASE_URL = mock.url
+    assert downloader.process_decklist(decklist)
+    downloader.close()
+
+    # No image is left in the output folder:
+    assert not list((tmp_path / "imagenes").glob("*.png"))
+
+    # The archive has every copy:
+    path = tmp_path / f"imagenes.{archive_format}"
+    if archive_format == "zip":
+        with zipfile.ZipFile(path) as archive:
+            assert archive.testzip() is None
+            names = archive.namelist()
+    else:
+        with tarfile.open(path) as archive:
+            names = archive.getnames()
+    assert sorted(names) == ["Card 1_1_ben_1.png", "Card 1_2_ben_1.png", "Card 2_ben_2.png"]
@@ -0,0 +1,114 @@
+##########################################
+# TESTS OF THE ASYNCIO DOWNLOADER ENGINE #
+##########################################
+
+# Import the required libraries:
+import pytest
+
+# The engine needs httpx:
+pytest.importorskip("httpx")
+
+# Import the engine and the batch scheduler:
+from async_downloader import AsyncScryfallDownloader
+from batch_scheduler import BatchScheduler
+
+# Decklist with the same printing in two lines (different quantities) and a double-faced card:
+DECKLIST = "2 Card 1 (BEN) 1\n3 Card 1 (BEN) 1\n1 Front 10d // Back 10d (BEN) 10d\n"
+
+#
+# Helper function to create an engine bound to a mock server:
+#
+def create_downloader(mock, folder, **options):
+
+    # Create the engine with no console output:
+    downloader = AsyncScryfallDownloader(folder, echo=False, **options)
+    downloader.BASE_URL = mock.url
+
+    # Return it:
+    return downloader
+
+#
+# Each image is fetched once, even if its printing is in several lines with different quantities:
+#
+def test_repeated_printing_is_fetched_once(start_mock, tmp_path):
+
+    # Start the server and write the decklist:
+    mock = start_mock(image_size=1000)
+    (tmp_path / "mazo.txt").write_text(DECKLIST, encoding='utf-8')
+
+    # Download it:
+    downloader = create_downloader(mock, tmp_path / "imagenes")
+    assert downloader.process_decklist(tmp_path / "mazo.txt")
+    downloader.close()
+
+    # One request per image (the printing and both faces of the DFC):
+    assert mock.counters['image'] == 3
+    assert downloader.stats == {'successful': 6, 'failed': 0, 'total': 6}
+
+    # Every line wrote its copies (the lines share the numbered files of the printing):
+    names = sorted(path.name for path in (tmp_path / "imagenes").iterdir() if path.suffix == ".png")
+    assert names == [
+        "Card 1_1_ben_1.png", "Card 1_2_ben_1.png", "Card 1_3_ben_1.png",
+        "Front 10d_Back 10d_back_ben_10d.png", "Front 10d_Back 10d_front_ben_10d.png"
+    ]
+
+#
+# The inherited blocking methods run through the event loop of the engine:
+#
+def test_blocking_surface_uses_the_event_loop(start_mock, tmp_path):
+
+    # Start the server and write the decklist:
+    mock = start_mock(image_size=1000)
+    (tmp_path / "mazo.txt").write_text(DECKLIST, encoding='utf-8')
+    downloader = create_downloader(mock, tmp_path / "imagenes")
+
+    # The DFC check resolves the cards with one collection request:
+    assert downloader.check_for_dfcs(tmp_path / "mazo.txt")
+    assert mock.counters['collection'] == 1
+
+    # An image is fetched to the given file:
+    url = f"{mock.url}/images/ben/1/main/png"
+    path = downloader.fetch_image(url, tmp_path / "suelta.png")
+    assert path.read_bytes() and mock.counters['image'] == 1
+
+    # The loop is stopped when the engine is closed:
+    downloader.close()
+    assert downloader.loop is None
+
+#
+# The batch scheduler runs decklists and sets with the asyncio engine:
+#
+def test_batch_scheduler_with_async_engine(start_mock, tmp_path):
+
+    # Start the server (a set of 20 cards) and write the decklist:
+    mock = start_mock(image_size=1000, set_size=20)
+    (tmp_path / "mazo.txt").write_text(DECKLIST, encoding='utf-8')
+    downloader = create_downloader(mock, tmp_path / "imagenes")
+
+    # Add the decklist and the set to the job:
+    scheduler = BatchScheduler(downloader)
+    scheduler.add_decklist(tmp_path / "mazo.txt")
+    scheduler.add_set("ben")
+
+    # Run it:
+    assert scheduler.run()
+    downloader.close()
+
+    # Every card of both was written, and the set was read with one search request:
+    assert downloader.stats['failed'] == 0
+    assert downloader.stats['successful'] == 6 + 20
+    assert mock.counters['search'] == 1
+    assert any((tmp_path / "imagenes" / "ben").iterdir())
+
+#
+# The pool size of the blocking engine is rejected (the connections follow the concurrency):
+#
+def test_unsupported_options_are_rejected(tmp_path):
+
+    # A pool size is not accepted:
+    with pytest.raises(ValueError):
+        AsyncScryfallDownloader(tmp_path, pool_size=10)
+
+    # Nor a concurrency below one:
+    with pytest.raises(ValueError):
+        AsyncScryfallDownloader(tmp_path, concurrency=0)
@@ -0,0 +1,147 @@
+###################################
+# TESTS OF THE OFFLINE BULK INDEX #
+###################################
+
+# Import the required libraries:
+import gzip
+import json
+
+# Import the index and the downloader:
+from bulk_index import BulkIndex
+from scryfall_downloader import ScryfallDownloader
+
+#
+# Helper function to build a card object of the dump:
+#
+def card(set_code, number, name, released_at="2024-01-01", base_url="http://127.0.0.1:9"):
+
+    # Build the image of each face (double-faced cards have no main image):
+    image = lambda face: {'png': f"{base_url}/images/{set_code}/{number}/{face}/png"}
+
+    # Build the card:
+    data = {
+        'object': "card", 'id': f"{set_code}-{number}", 'name': name, 'set': set_code,
+        'collector_number': number, 'released_at': released_at, 'prices': {'usd': "0.10"}
+    }
+    if " // " in name:
+        data['card_faces'] = [
+            {'name': face_name, 'image_uris': image(face), 'oracle_text': "..."}
+            for face_name, face in zip(name.split(" // "), ("front", "back"))
+        ]
+    else:
+        data['image_uris'] = image("main")
+
+    # Return it:
+    return data
+
+#
+# Helper function to write a dump (an array of cards, compressed if the name ends in '.gz'):
+#
+def write_dump(path, cards):
+
+    # Open the file (compressed or not):
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+
+        # Write one card per line, like the Scryfall dumps:
+        f.write("[\n" + ",\n".join(json.dumps(data) for data in cards) + "\n]\n")
+
+# Cards of the test dump (two printings of the same name and a double-faced card):
+CARDS = [
+    card("old", "7", "Card 1", released_at="2010-05-01"),
+    card("ben", "1", "Card 1", released_at="2024-02-09"),
+    card("ben", "2", "Card 2"),
+    card("ben", "10d", "Front 10d // Back 10d"),
+    {'object': "list", 'data': []}
+]
+
+#
+# The dump is streamed in chunks, so objects cut by a chunk boundary are decoded once the next chunk arrives:
+#
+def test_ingest_across_chunk_boundaries(tmp_path):
+
+    # Write the dump:
+    write_dump(tmp_path / "cards.json", CARDS)
+
+    # Ingest it with chunks much smaller than a card:
+    index = BulkIndex(tmp_path / "indice.sqlite3")
+    index.CHUNK_SIZE = 7
+    assert index.ingest(tmp_path / "cards.json", log=lambda message: None) == 4
+
+    # Every card is indexed with the compact fields only:
+    assert index.get("BEN", "2")['name'] == "Card 2"
+    assert 'prices' not in index.get("ben", "2")
+    assert 'oracle_text' not in index.get("ben", "10D")['card_faces'][0]
+    index.close()
+
+#
+# A compressed dump is read the same way:
+#
+def test_ingest_gzip_dump(tmp_path):
+
+    # Write the compressed dump:
+    write_dump(tmp_path / "cards.json.gz", CARDS)
+
+    # Ingest it:
+    index = BulkIndex(tmp_path / "indice.sqlite3")
+    assert index.ingest(tmp_path / "cards.json.gz", log=lambda message: None) == 4
+
+    # The cards are indexed:
+    assert index.get("old", "7")['id'] == "old-7"
+    index.close()
+
+#
+# Lookups by printing, by name (newest printing) and by front face name:
+#
+def test_lookups(tmp_path):
+
+    # Ingest the dump:
+    write_dump(tmp_path / "cards.json", CARDS)
+    index = BulkIndex(tmp_path / "indice.sqlite3")
+    index.ingest(tmp_path / "cards.json", log=lambda message: None)
+
+    # By set and collector number (any case), None if missing:
+    assert index.get("BEN", "1")['id'] == "ben-1"
+    assert index.get("ben", "99") is None
+
+    # By name, the newest printing is returned:
+    assert index.get_by_name("card 1")['id'] == "ben-1"
+
+    # Double-faced cards are found by their full name and by their front face name:
+    assert index.get_by_name("Front 10d // Back 10d")['id'] == "ben-10d"
+    assert index.get_by_name("Front 10d")['id'] == "ben-10d"
+    assert index.get_by_name("Back 10d") is None
+
+    # A set is returned in collector number order:
+    assert [data['collector_number'] for data in index.get_set("ben")] == ["1", "2", "10d"]
+    index.close()
+
+#
+# In offline mode the cards are resolved from the index with no API calls (only the images are downloaded):
+#
+def test_offline_resolve_makes_no_api_calls(start_mock, tmp_path):
+
+    # Start the server (for the images only) and ingest a dump that points to it:
+    mock = start_mock(image_size=1000)
+    write_dump(tmp_path / "cards.json", [
+        card("ben", "1", "Card 1", base_url=mock.url),
+        card("ben", "10d", "Front 10d // Back 10d", base_url=mock.url)
+    ])
+    index = BulkIndex(tmp_path / "indice.sqlite3")
+    index.ingest(tmp_path / "cards.json", log=lambda message: None)
+    index.close()
+
+    # Write a decklist with a printing, a name-only line and a card missing from the index:
+    decklist = tmp_path / "mazo.txt"
+    decklist.write_text("2 Card 1 (BEN) 1\nFront 10d\n1 Card 3 (BEN) 3\n", encoding='utf-8')
+
+    # Download it in offline mode:
+    downloader = ScryfallDownloader(tmp_path / "imagenes", offline_index=tmp_path / "indice.sqlite3", echo=False)
+    downloader.BASE_URL = mock.url
+    assert not downloader.process_decklist(decklist)
+    downloader.close()
+
+    # The indexed cards were downloaded, the missing one failed, and the API was never called:
+    assert downloader.stats == {'successful': 3, 'failed': 1, 'total': 3}
+    assert mock.counters['api'] == mock.counters['collection'] == mock.counters['search'] == 0
+    assert mock.counters['image'] == 3
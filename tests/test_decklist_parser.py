@@ -0,0 +1,95 @@
+################################
+# TESTS OF THE DECKLIST PARSER #
+################################
+
+# Import the required libraries:
+import pytest
+
+# Import the parser:
+from decklist_parser import CardRequest, iter_decklist, parse_line
+
+#
+# Helper function to get the fields of a parsed card:
+#
+def fields(card):
+    return (card.quantity, card.name, card.set, card.collector_number, card.section)
+
+#
+# Moxfield lines have the printing (the foil and etched marks are removed):
+#
+@pytest.mark.parametrize("line, expected", [
+    ("1 Lightning Bolt (M10) 146", (1, "Lightning Bolt", "M10", "146", "deck")),
+    ("2 Lightning Bolt (m10) 146 *F*", (2, "Lightning Bolt", "M10", "146", "deck")),
+    ("1 Delver of Secrets // Insectile Aberration (ISD) 51a", (1, "Delver of Secrets // Insectile Aberration", "ISD", "51a", "deck")),
+])
+def test_moxfield_lines(line, expected):
+    assert fields(parse_line(line)) == expected
+
+#
+# Arena and MTGO lines only have the quantity and the name:
+#
+@pytest.mark.parametrize("line, expected", [
+    ("4 Lightning Bolt", (4, "Lightning Bolt", None, None, "deck")),
+    ("4x Lightning Bolt", (4, "Lightning Bolt", None, None, "deck")),
+    ("  12 Island  ", (12, "Island", None, None, "deck")),
+])
+def test_arena_lines(line, expected):
+    assert fields(parse_line(line)) == expected
+
+#
+# A line with only a name is one copy:
+#
+def test_name_only_line():
+    assert fields(parse_line("Lightning Bolt", "sideboard")) == (1, "Lightning Bolt", None, None, "sideboard")
+
+#
+# Section headers change the section, type headers and comments are skipped:
+#
+@pytest.mark.parametrize("line, expected", [
+    ("Sideboard", "sideboard"),
+    ("SIDEBOARD:", "sideboard"),
+    ("// Sideboard", "sideboard"),
+    ("Commander (1)", "commander"),
+    ("About", "about"),
+    ("Creatures (20)", None),
+    ("Lands: 24", None),
+    ("Sorceries", None),
+    ("// Creatures (20)", None),
+    ("//comment", None),
+    ("// 4 Lightning Bolt", None),
+    ("# comment", None),
+    ("", None),
+])
+def test_headers_and_comments(line, expected):
+    assert parse_line(line) == expected
+
+#
+# A line with no letters is not a card:
+#
+def test_invalid_line():
+    with pytest.raises(ValueError):
+        parse_line("---")
+
+#
+# A whole Arena export: the About block is skipped and the sections are kept:
+#
+def test_arena_export(tmp_path):
+
+    # Write the export:
+    path = tmp_path / "mazo.txt"
+    path.write_text(
+        "About\nName Mono Red\n\nDeck\nCreatures (4)\n4 Goblin Guide\n// Spells\n4 Lightning Bolt\n"
+        "\nSideboard\n2 Smash to Smithereens\n",
+        encoding='utf-8'
+    )
+
+    # Parse it:
+    cards = list(iter_decklist(path))
+
+    # Only the cards are returned, with their sections:
+    assert all(isinstance(card, CardRequest) for card in cards)
+    assert [fields(card) for card in cards] == [
+        (4, "Goblin Guide", None, None, "deck"),
+        (4, "Lightning Bolt", None, None, "deck"),
+        (2, "Smash to Smithereens", None, None, "sideboard")
+    ]
@@ -0,0 +1,143 @@
+#######################################
+# TESTS OF THE SHARED DOWNLOAD SERVER #
+#######################################
+
+# Import the required libraries:
+import http.client
+import io
+import json
+import threading
+import time
+import zipfile
+from urllib.parse import quote
+
+import pytest
+
+# Import the downloader and the server:
+from scryfall_downloader import ScryfallDownloader
+from download_server import DownloadServer
+
+# Decklist of the jobs:
+DECKLIST = "2 Card 1 (BEN) 1\n1 Card 2 (BEN) 2\n"
+
+#
+# Fixture that starts a server bound to a mock Scryfall on a free port, and stops it after the test:
+#
+@pytest.fixture
+def service(start_mock, tmp_path):
+
+    # Start the mock server and create the shared downloader:
+    mock = start_mock(image_size=1000)
+    downloader = ScryfallDownloader(tmp_path / "trabajos", echo=False, cache_folder=tmp_path / "cache")
+    downloader.BASE_URL = mock.url
+
+    # Create the server and serve in a background thread:
+    server = DownloadServer(downloader, tmp_path / "trabajos", port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    # Give it to the test:
+    yield server
+
+    # Stop it:
+    server.stop()
+    thread.join()
+    downloader.close()
+
+#
+# Helper function to send a request to the server (returns the response and its body):
+#
+def request(server, method, path, body=None):
+
+    # Connect to the server:
+    host, port = server.server.server_address[:2]
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+
+    # Send the request and read the whole answer:
+    connection.request(method, path, body=body)
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+
+    # Return them:
+    return response, data
+
+#
+# Helper function to submit the decklist and wait for its job to finish:
+#
+def run_job(server):
+
+    # Submit it:
+    response, data = request(server, "POST", "/jobs", DECKLIST.encode("utf-8"))
+    job_id = json.loads(data)['id']
+
+    # Wait for the runner:
+    for _ in range(200):
+        job = json.loads(request(server, "GET", f"/jobs/{job_id}")[1])
+        if job['status'] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+
+    # The job never finished:
+    raise AssertionError(f"El trabajo no terminó: {job}")
+
+#
+# The same decklist gives the same job: queued the first time (202), returned as it is the next times (200):
+#
+def test_same_decklist_is_one_job(service):
+
+    # The first submission queues the job:
+    response, data = request(service, "POST", "/jobs", DECKLIST.encode("utf-8"))
+    assert response.status == 202
+    job_id = json.loads(data)['id']
+
+    # The same decklist (with other blank lines and spaces) returns the same job:
+    response, data = request(service, "POST", "/jobs", ("\n  " + DECKLIST + "\n\n").encode("utf-8"))
+    assert response.status == 200
+    assert json.loads(data)['id'] == job_id
+
+    # Another DFC policy is another job:
+    response, data = request(service, "POST", "/jobs?dfc=front", DECKLIST.encode("utf-8"))
+    assert response.status == 202
+    assert json.loads(data)['id'] != job_id
+
+#
+# Only the listed images of a job are served, paths outside the images folder are unknown:
+#
+def test_paths_outside_the_job_are_rejected(service):
+
+    # Run the job:
+    job = run_job(service)
+    assert job['status'] == "done"
+
+    # A listed image is served (its name is quoted, it has spaces):
+    response, data = request(service, "GET", f"/jobs/{job['id']}/files/{quote(job['files'][0])}")
+    assert response.status == 200 and data
+
+    # The decklist and the job state next to the images are not, nor files outside the jobs:
+    for name in ("../decklist.txt", "..%2Fjob.json", "%2E%2E/%2E%2E/cache/index.json", "/etc/passwd"):
+        response, _ = request(service, "GET", f"/jobs/{job['id']}/files/{name}")
+        assert response.status == 404
+
+#
+# The ZIP of a job is streamed with no length, stored, and has every image of the job:
+#
+def test_job_zip_is_streamed(service):
+
+    # Run the job:
+    job = run_job(service)
+    assert job['status'] == "done"
+
+    # Get the ZIP:
+    response, data = request(service, "GET", f"/jobs/{job['id']}/zip")
+    assert response.status == 200
+    assert response.getheader("Content-Length") is None
+
+    # It is a valid archive with every listed image, stored as it is:
+    folder = service.job_folder(job['id']) / "imagenes"
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == job['files']
+        for entry in archive.infolist():
+            assert entry.compress_type == zipfile.ZIP_STORED
+            assert archive.read(entry) == (folder / entry.filename).read_bytes()
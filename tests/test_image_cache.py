@@ -0,0 +1,68 @@
+##################################
+# TESTS OF THE LOCAL IMAGE CACHE #
+##################################
+
+# Import the cache:
+from image_cache import ImageCache
+
+#
+# Helper function to write an image of the given size and register it (released right away, like a finished copy):
+#
+def store(cache, key, size=100, release=True):
+
+    # Write the file:
+    cache.path_for(key).write_bytes(b"x" * size)
+
+    # Register it:
+    cache.add(key)
+
+    # Release it, unless the test keeps it pinned:
+    if release:
+        cache.release(key)
+
+#
+# The cache never goes over its cap, and the least recently used images are evicted first:
+#
+def test_cap_and_lru_order(tmp_path):
+
+    # Create a cache for two images:
+    cache = ImageCache(tmp_path, max_bytes=250)
+
+    # Store two images, then use the first one again:
+    store(cache, "a")
+    store(cache, "b")
+    assert cache.get("a")
+    cache.release("a")
+
+    # A third image evicts the least recently used one ('b'):
+    store(cache, "c")
+    assert set(cache.index) == {"a", "c"}
+    assert cache.total == 200 <= cache.max_bytes
+    assert not cache.path_for("b").exists()
+
+    # The index is saved with the right entries:
+    cache.save()
+    assert set(ImageCache(tmp_path, max_bytes=250).index) == {"a", "c"}
+
+#
+# A pinned image is never evicted, the next unpinned one goes instead, so the cap still holds:
+#
+def test_pinned_images_are_skipped(tmp_path):
+
+    # Create a cache for two images:
+    cache = ImageCache(tmp_path, max_bytes=250)
+
+    # Store two images, keeping the oldest one pinned (a worker is linking it):
+    store(cache, "a", release=False)
+    store(cache, "b")
+
+    # A third image evicts 'b', not the pinned 'a':
+    store(cache, "c")
+    assert set(cache.index) == {"a", "c"}
+    assert cache.total <= cache.max_bytes
+
+    # Once released, 'a' is the oldest image again and the next insert evicts it:
+    cache.release("a")
+    store(cache, "d")
+    assert set(cache.index) == {"c", "d"}
+    assert cache.total <= cache.max_bytes
@@ -0,0 +1,108 @@
+###################################################
+# TESTS OF THE IMAGE PROFILES OF THE COMMAND LINE #
+###################################################
+
+# Import the required libraries:
+import json
+
+import pytest
+
+# Import the command line, the downloader and the mock server:
+import mtg_downloader
+from scryfall_downloader import ScryfallDownloader
+from mock_scryfall import MockScryfall
+
+# Decklist with a card that has every variant, one with no 'large' and one with no 'large' nor 'small':
+DECKLIST = "1 Card 1 (BEN) 1\n1 Card 2 (BEN) 2\n1 Card 3 (BEN) 3\n"
+
+# Declare the stub server:
+class MissingVariants(MockScryfall):
+    """Mock server where some cards lack some image variants"""
+
+    # Variants missing from each collector number:
+    MISSING = {'2': {"large"}, '3': {"large", "small"}}
+
+    #
+    # Build a fake card object without the missing variants:
+    #
+    def card(self, set_code, number):
+
+        # Build the full card:
+        card = super().card(set_code, number)
+
+        # Remove the missing variants:
+        for variant in self.MISSING.get(number, ()):
+            card['image_uris'].pop(variant)
+
+        # Return the card:
+        return card
+
+#
+# Helper function to run the command line on the decklist (returns the exit code, the events and the deck folder):
+#
+def run_cli(start_mock, tmp_path, monkeypatch, capsys, *options):
+
+    # Start the server and point the downloader at it:
+    mock = start_mock(MissingVariants, image_size=1000)
+    monkeypatch.setattr(ScryfallDownloader, "BASE_URL", mock.url)
+
+    # Write the decklist:
+    decklist = tmp_path / "mazo.txt"
+    decklist.write_text(DECKLIST, encoding='utf-8')
+
+    # Run the command line:
+    code = mtg_downloader.main([str(decklist), "-o", str(tmp_path / "salida"), *options])
+
+    # Read the JSON events:
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    # Return them:
+    return code, events, tmp_path / "salida" / "mazo"
+
+#
+# Helper function to get the variant a file was downloaded from (the mock image body repeats its URL path):
+#
+def variant_of(path):
+    return path.read_bytes().split(b"/")[5].decode()
+
+#
+# A profile tries its own fallback chain when a card lacks its variant:
+#
+def test_profile_fallback_chain(start_mock, tmp_path, monkeypatch, capsys):
+
+    # Download with the 'large' profile (large -> png -> normal):
+    code, events, folder = run_cli(start_mock, tmp_path, monkeypatch, capsys, "--profile", "large")
+    assert code == 0
+
+    # The cards with no 'large' image fall back to 'png', saved as '.png':
+    assert variant_of(folder / "Card 1_ben_1.jpg") == "large"
+    assert variant_of(folder / "Card 2_ben_2.png") == "png"
+    assert variant_of(folder / "Card 3_ben_3.png") == "png"
+
+#
+# The fallback option replaces the chain of the profile, and a card with none of its variants fails:
+#
+def test_fallback_replaces_the_chain(start_mock, tmp_path, monkeypatch, capsys):
+
+    # Download with the 'large' profile, falling back to 'small' only:
+    code, events, folder = run_cli(start_mock, tmp_path, monkeypatch, capsys, "--profile", "large", "--fallback", "small")
+    assert code == 1
+
+    # The first two cards are downloaded from their own variants:
+    assert variant_of(folder / "Card 1_ben_1.jpg") == "large"
+    assert variant_of(folder / "Card 2_ben_2.jpg") == "small"
+
+    # The third one has neither, so it fails (with no 'png' file):
+    assert not list(folder.glob("Card 3_*"))
+    summary = next(event for event in events if event['event'] == "summary")
+    assert (summary['successful'], summary['failed']) == (2, 1)
+
+#
+# An unknown profile is an invalid argument:
+#
+def test_unknown_profile_is_rejected(capsys):
+
+    # The parser exits with code 2:
+    with pytest.raises(SystemExit) as error:
+        mtg_downloader.main(["mazo.txt", "--profile", "gigante"])
+    assert error.value.code == 2
@@ -0,0 +1,92 @@
+####################################
+# TESTS OF THE CARD METADATA CACHE #
+####################################
+
+# Import the cache, the parser record and the downloader:
+from decklist_parser import CardRequest
+from metadata_cache import MetadataCache
+from scryfall_downloader import ScryfallDownloader
+
+# Cards of the tests:
+CARDS = [CardRequest(1, "Card 1", "BEN", "1"), CardRequest(2, "Card 2", "BEN", "2"), CardRequest(1, "Card 3", "BEN", "3")]
+
+#
+# Helper function to create a downloader bound to a mock server, with a metadata cache of the given TTL:
+#
+def create_downloader(mock, tmp_path, ttl):
+
+    # Create the downloader with no console output:
+    downloader = ScryfallDownloader(tmp_path / "imagenes", metadata_db=tmp_path / "metadatos.sqlite3",
+                                    metadata_ttl=ttl, echo=False)
+    downloader.BASE_URL = mock.url
+
+    # Return it:
+    return downloader
+
+#
+# An entry is fresh for its TTL, and keeps its validators:
+#
+def test_ttl(tmp_path):
+
+    # Store the same card in a cache with a long TTL:
+    cache = MetadataCache(tmp_path / "metadatos.sqlite3", ttl=3600)
+    cache.put("ben/1", {'name': "Card 1"}, etag='"ben-1"')
+    entry = cache.get("ben/1")
+    assert entry['fresh'] and entry['etag'] == '"ben-1"' and entry['card'] == {'name': "Card 1"}
+    cache.close()
+
+    # Read it with a TTL of zero, it is stale:
+    cache = MetadataCache(tmp_path / "metadatos.sqlite3", ttl=0)
+    assert not cache.get("ben/1")['fresh']
+    assert cache.get("ben/2") is None
+    cache.close()
+
+#
+# Fresh cards make no requests, and stale ones are refetched in one collection request (not one GET each):
+#
+def test_stale_cards_are_refetched_in_the_batch(start_mock, tmp_path):
+
+    # Resolve the cards once (one collection request):
+    mock = start_mock()
+    downloader = create_downloader(mock, tmp_path, ttl=3600)
+    downloader.resolve_cards(CARDS)
+    downloader.close()
+    assert mock.counters['collection'] == 1
+
+    # While they are fresh, no requests are made:
+    downloader = create_downloader(mock, tmp_path, ttl=3600)
+    downloader.resolve_cards(CARDS)
+    downloader.close()
+    assert mock.counters['collection'] == 1
+    assert downloader.metrics.report()['counters']['metadata_cache_hit'] == 3
+
+    # Once stale, they are refetched with a single collection request:
+    downloader = create_downloader(mock, tmp_path, ttl=0)
+    downloader.resolve_cards(CARDS)
+    downloader.close()
+    assert mock.counters['collection'] == 2
+    assert mock.counters['api'] == 0
+    assert all(info.key() in downloader.card_data for info in CARDS)
+
+#
+# A stale card fetched on its own is revalidated with its ETag, and a '304' answer keeps the cached card:
+#
+def test_etag_revalidation(start_mock, tmp_path):
+
+    # Fetch a card on its own (it is stored with the ETag of the answer):
+    mock = start_mock()
+    downloader = create_downloader(mock, tmp_path, ttl=3600)
+    card = downloader.get_card_data(CARDS[0])
+    downloader.close()
+    assert mock.counters['api'] == 1
+    cache = MetadataCache(tmp_path / "metadatos.sqlite3")
+    assert cache.get("ben/1")['etag'] == '"ben-1"'
+    cache.close()
+
+    # Once stale, the next single request is conditional, and the '304' answer returns the cached card:
+    downloader = create_downloader(mock, tmp_path, ttl=0)
+    assert downloader.get_card_data(CARDS[0]) == card
+    downloader.close()
+    assert mock.counters['api'] == 2
+    assert mock.counters['not_modified'] == 1
+    assert downloader.metrics.report()['counters']['metadata_revalidated'] == 1
@@ -0,0 +1,61 @@
+##################################
+# TESTS OF THE DOWNLOAD PIPELINE #
+##################################
+
+# Import the downloader:
+from scryfall_downloader import ScryfallDownloader
+
+#
+# A printing in the deck and the sideboard is fetched once, with its copies numbered together:
+#
+def test_repeated_printing_is_merged(start_mock, tmp_path):
+
+    # Start the server and write a decklist with the same printing in both sections:
+    mock = start_mock(image_size=1000)
+    decklist = tmp_path / "mazo.txt"
+    decklist.write_text("2 Card 1 (BEN) 1\n1 Card 2 (BEN) 2\n\nSideboard\n1 Card 1 (BEN) 1\n", encoding='utf-8')
+
+    # Download it:
+    downloader = ScryfallDownloader(tmp_path / "imagenes", echo=False)
+    downloader.BASE_URL = mock.url
+    assert downloader.process_decklist(decklist)
+    downloader.close()
+
+    # One request per printing, and every line is counted:
+    assert mock.counters['image'] == 2
+    assert downloader.stats == {'successful': 4, 'failed': 0, 'total': 4}
+
+    # The three copies have their own files:
+    names = sorted(path.name for path in (tmp_path / "imagenes").iterdir() if path.suffix == ".png")
+    assert names == ["Card 1_1_ben_1.png", "Card 1_2_ben_1.png", "Card 1_3_ben_1.png", "Card 2_ben_2.png"]
+
+#
+# In preview mode the small images go through the same run before the full-size ones, and don't count in it:
+#
+def test_previews_come_first_in_the_same_run(start_mock, tmp_path):
+
+    # Start the server and write a decklist:
+    mock = start_mock(image_size=1000)
+    decklist = tmp_path / "mazo.txt"
+    decklist.write_text("2 Card 1 (BEN) 1\n1 Card 2 (BEN) 2\n", encoding='utf-8')
+
+    # Download it with a single fetch worker, keeping the events:
+    events = []
+    downloader = ScryfallDownloader(tmp_path / "imagenes", workers=1, echo=False, event_callback=events.append)
+    downloader.BASE_URL = mock.url
+    assert downloader.process_decklist(decklist, preview=True)
+    downloader.close()
+
+    # The cards were resolved once, and each printing was fetched in both sizes:
+    assert mock.counters['collection'] == 1
+    assert mock.counters['image'] == 4
+
+    # The preview event comes before the first card is finished, and only the full-size copies are counted:
+    kinds = [event['event'] for event in events]
+    assert kinds.index("preview") < kinds.index("card")
+    assert events[kinds.index("preview")]['successful'] == 3
+    assert downloader.stats == {'successful': 3, 'failed': 0, 'total': 3}
+
+    # Every copy has its preview:
+    previews = sorted(path.name for path in (tmp_path / "imagenes" / "vista_previa").glob("*.jpg"))
+    assert previews == ["Card 1_1_ben_1.jpg", "Card 1_2_ben_1.jpg", "Card 2_ben_2.jpg"]
@@ -0,0 +1,97 @@
+#####################################
+# TESTS OF THE IMAGE POST-PROCESSOR #
+#####################################
+
+# Import the required libraries:
+import os
+
+import pytest
+
+# The post-processor needs Pillow:
+Image = pytest.importorskip("PIL.Image")
+
+# Import the post-processor:
+from post_process import PostProcessor
+
+#
+# Helper function to write a small card image:
+#
+def write_image(path, colour=(200, 30, 30)):
+
+    # Save a plain image with the card ratio:
+    Image.new("RGB", (100, 140), colour).save(path)
+
+    # Return the path:
+    return path
+
+#
+# The cache key follows the source content and the transform parameters, not the file name:
+#
+def test_cache_key(tmp_path, monkeypatch):
+
+    # Write two copies of an image and a different one:
+    first = write_image(tmp_path / "a.png")
+    second = write_image(tmp_path / "b.png")
+    other = write_image(tmp_path / "c.png", (30, 30, 200))
+
+    # Create the post-processor:
+    with PostProcessor(("web",), workers=1, log=lambda message: None) as processor:
+
+        # The same content gives the same key, another content or profile another one:
+        key = processor.cache_key(first, "web")
+        assert processor.cache_key(second, "web") == key
+        assert processor.cache_key(other, "web") != key
+        assert processor.cache_key(first, "print") != key
+
+        # Changing the parameters of the profile changes the key:
+        monkeypatch.setitem(PostProcessor.PROFILES, "web", ({'width': 300, 'mode': "RGB", 'quality': 80}, "web"))
+        assert processor.cache_key(first, "web") != key
+
+#
+# The image is transformed once and every copy is a hardlink of the output, taken from the cache the next time:
+#
+def test_copies_are_hardlinked(tmp_path):
+
+    # Write three copies of a card:
+    folder = tmp_path / "mazo"
+    folder.mkdir()
+    filepaths = [write_image(folder / f"Card_{number}.png") for number in (1, 2, 3)]
+
+    # Process them with a cache:
+    with PostProcessor(("web",), cache_folder=tmp_path / "cache", workers=1, log=lambda message: None) as processor:
+        processor.add_files(filepaths)
+    assert processor.stats == {'processed': 1, 'cached': 0, 'failed': 0}
+
+    # Every copy has its output, all of them the same file as the cached one:
+    outputs = [folder / "web" / f"Card_{number}.jpg" for number in (1, 2, 3)]
+    key = processor.cache_key(filepaths[0], "web")
+    assert all(os.path.samefile(output, processor.cache.path_for(key)) for output in outputs)
+
+    # The output is a JPEG (the image is already narrower than the web width, so it keeps its size):
+    with Image.open(outputs[0]) as image:
+        assert image.format == "JPEG" and image.width == 100
+
+    # A second run takes it from the cache (no transform), and the cache entry is released:
+    for output in outputs:
+        output.unlink()
+    with PostProcessor(("web",), cache_folder=tmp_path / "cache", workers=1, log=lambda message: None) as processor:
+        processor.add_files(filepaths)
+    assert processor.stats == {'processed': 0, 'cached': 1, 'failed': 0}
+    assert all(output.exists() for output in outputs)
+    assert not processor.cache.pinned
+
+#
+# With no cache, the first copy gets the output and the rest are hardlinks of it:
+#
+def test_copies_are_hardlinked_without_cache(tmp_path):
+
+    # Write two copies of a card:
+    filepaths = [write_image(tmp_path / f"Card_{number}.png") for number in (1, 2)]
+
+    # Process them with no cache:
+    with PostProcessor(("web",), workers=1, log=lambda message: None) as processor:
+        processor.add_files(filepaths)
+    assert processor.stats['processed'] == 1
+
+    # The second output is the same file as the first one:
+    assert os.path.samefile(tmp_path / "web" / "Card_1.jpg", tmp_path / "web" / "Card_2.jpg")
@@ -0,0 +1,42 @@
+###################################
+# TESTS OF THE PRINT SHEET BUDGET #
+###################################
+
+# Import the required libraries:
+import pytest
+
+# The print sheets need Pillow:
+Image = pytest.importorskip("PIL.Image")
+
+# Import the compositor and its pool:
+from print_sheets import SheetCompositor, create_pool
+
+#
+# The compositors of a batch share the in-flight budget of their pool, so it is never exceeded:
+#
+def test_shared_pool_budget(tmp_path):
+
+    # Write a small card image:
+    image = tmp_path / "carta.png"
+    Image.new("RGB", (60, 84), "red").save(image)
+
+    # Create a pool of one process (two cards in flight) shared by two compositors:
+    pool = create_pool(1)
+    compositors = [
+        SheetCompositor(tmp_path / name / "hojas.pdf", dpi=30, executor=pool, log=lambda message: None)
+        for name in ("a", "b")
+    ]
+
+    # Add the cards to both compositors, checking the cards in flight of the whole pool:
+    for _ in range(5):
+        for compositor in compositors:
+            compositor.add(image)
+            assert pool.budget.count <= pool.budget.limit == 2
+
+    # Every card is placed once the compositors are closed:
+    assert [compositor.close() for compositor in compositors] == [1, 1]
+    assert [compositor.cards for compositor in compositors] == [5, 5]
+    assert pool.budget.count == 0
+
+    # Stop the shared pool:
+    pool.shutdown()
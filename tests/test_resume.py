@@ -0,0 +1,66 @@
+########################################
+# TESTS OF THE RESUMED RUNS (MANIFEST) #
+########################################
+
+# Import the downloader:
+from scryfall_downloader import ScryfallDownloader
+
+# Decklist with repeated copies and a double-faced card (4 faces, 7 files):
+DECKLIST = "2 Card 1 (BEN) 1\n1 Front 10d // Back 10d (BEN) 10d\n3 Card 2 (BEN) 2\n"
+
+#
+# Helper function to run the downloader on the decklist (returns its log messages):
+#
+def run(mock, tmp_path):
+
+    # Create the downloader, collecting the log messages:
+    messages = []
+    downloader = ScryfallDownloader(tmp_path / "imagenes", log_callback=messages.append, echo=False)
+    downloader.BASE_URL = mock.url
+
+    # Download the decklist:
+    assert downloader.process_decklist(tmp_path / "mazo.txt")
+    downloader.close()
+
+    # Return the messages:
+    return messages
+
+#
+# Helper function to get the images of the output folder with their modification times:
+#
+def images(tmp_path):
+
+    # Return every image (the manifest is skipped):
+    return {
+        path.name: path.stat().st_mtime_ns
+        for path in (tmp_path / "imagenes").iterdir()
+        if path.suffix == ".png"
+    }
+
+#
+# A rerun skips every file completed before, and only fetches the files that are missing:
+#
+def test_resumed_run_skips_completed_files(start_mock, tmp_path):
+
+    # Start the server and write the decklist:
+    mock = start_mock(image_size=1000)
+    (tmp_path / "mazo.txt").write_text(DECKLIST, encoding='utf-8')
+
+    # The first run fetches every face once:
+    run(mock, tmp_path)
+    first = images(tmp_path)
+    assert len(first) == 7
+    assert mock.counters['image'] == 4
+
+    # The second run fetches nothing and leaves the files as they were:
+    messages = run(mock, tmp_path)
+    assert mock.counters['image'] == 4
+    assert images(tmp_path) == first
+    assert sum(message.startswith("Ya descargado") for message in messages) == 4
+
+    # If a copy is removed, only its face is fetched again:
+    removed = sorted(name for name in first if name.startswith("Card 2"))[-1]
+    (tmp_path / "imagenes" / removed).unlink()
+    run(mock, tmp_path)
+    assert mock.counters['image'] == 5
+    assert set(images(tmp_path)) == set(first)
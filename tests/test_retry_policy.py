@@ -0,0 +1,143 @@
+###################################################
+# TESTS OF THE RETRY POLICY AND THE CIRCUIT BREAKER #
+###################################################
+
+# Import the required libraries:
+import time
+
+import pytest
+import requests
+
+# Import the retry classes and the downloader:
+from retry_policy import CircuitBreaker, RetryPolicy
+from scryfall_downloader import ScryfallDownloader
+
+#
+# The backoff doubles with each attempt up to its maximum, with up to half of it as jitter:
+#
+def test_backoff():
+
+    # Create a policy of 1 second, up to 4 seconds:
+    policy = RetryPolicy(backoff_base=1.0, backoff_max=4.0)
+
+    # Each delay is between half and the whole of its step:
+    for attempt, step in enumerate((1.0, 2.0, 4.0, 4.0)):
+        for _ in range(50):
+            assert step / 2 <= policy.delay(attempt) <= step
+
+#
+# Retries stop at the limit per request and when the budget of the run is spent, until it is reset:
+#
+def test_budget_exhaustion():
+
+    # Create a policy of 3 retries per request and 2 per run:
+    policy = RetryPolicy(max_retries=3, budget=2)
+
+    # A request past its own limit is not retried (and spends nothing):
+    assert not policy.allow_retry(3)
+    assert policy.budget == 2
+
+    # The run budget allows two retries:
+    assert policy.allow_retry(0)
+    assert policy.allow_retry(1)
+    assert not policy.allow_retry(0)
+
+    # A new run gets the whole budget again:
+    policy.reset()
+    assert policy.allow_retry(0)
+
+#
+# The breaker opens after the failures in a row, lets a single trial through after the cooldown, and closes
+# if it succeeds (or opens again if it fails):
+#
+def test_breaker_transitions():
+
+    # Create a breaker that opens after 2 failures, for 50 ms:
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05)
+    assert breaker.check() == 0
+
+    # The second failure in a row opens it, and the requests wait:
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.check() > 0
+
+    # After the cooldown, only one trial request goes through:
+    time.sleep(0.06)
+    assert breaker.check() == 0
+    assert breaker.state == "half_open"
+    assert breaker.check() > 0
+
+    # A failed trial opens the circuit again at once:
+    assert breaker.record_failure()
+    assert breaker.state == "open"
+
+    # A trial given back lets the next request test the host:
+    time.sleep(0.06)
+    assert breaker.check() == 0
+    breaker.release_trial()
+    assert breaker.check() == 0
+
+    # A successful trial closes the circuit:
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+    assert breaker.check() == 0
+
+#
+# Helper function to create a downloader with no retry delays:
+#
+def create_downloader(tmp_path):
+
+    # Create the downloader with no console output and instant retries:
+    return ScryfallDownloader(tmp_path, echo=False, api_retry=RetryPolicy(max_retries=2, backoff_base=0.0))
+
+#
+# Transient errors are retried up to the limit, the rest fail at once:
+#
+def test_with_retry(tmp_path):
+
+    # Create the downloader:
+    downloader = create_downloader(tmp_path)
+
+    # Count the calls of an operation that always fails with a network error:
+    calls = []
+    def network_error():
+        calls.append(1)
+        raise requests.ConnectionError("sin red")
+
+    # It is tried once and retried twice:
+    with pytest.raises(requests.ConnectionError):
+        downloader.with_retry('api', network_error)
+    assert len(calls) == 3
+    assert downloader.metrics.report()['counters']['retries_api'] == 2
+
+    # A non transient error is not retried:
+    calls.clear()
+    def not_found():
+        calls.append(1)
+        raise ValueError("no existe")
+    with pytest.raises(ValueError):
+        downloader.with_retry('api', not_found)
+    assert len(calls) == 1
+    downloader.close()
+
+#
+# A run cancelled while the breaker is open stops there, without running the operation again:
+#
+def test_cancel_while_breaker_is_open(tmp_path):
+
+    # Create the downloader and open its API breaker:
+    downloader = create_downloader(tmp_path)
+    breaker = downloader.breakers['api']
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    # Cancel the run:
+    downloader.cancel()
+
+    # The operation is never run:
+    calls = []
+    with pytest.raises(IOError):
+        downloader.with_retry('api', lambda: calls.append(1))
+    assert not calls
+    downloader.close()
@@ -0,0 +1,75 @@
+#####################################
+# TESTS OF THE SET MODE (--set NEO) #
+#####################################
+
+# Import the required libraries:
+import pytest
+
+# Import the downloader and the command line:
+import mtg_downloader
+from scryfall_downloader import ScryfallDownloader
+
+#
+# Helper function to create a downloader bound to a mock server:
+#
+def create_downloader(mock, folder):
+
+    # Create the downloader with no console output:
+    downloader = ScryfallDownloader(folder, echo=False)
+    downloader.BASE_URL = mock.url
+
+    # Return it:
+    return downloader
+
+#
+# A set is enumerated with one search request per 175-card page, following 'next_page':
+#
+def test_set_pages_follow_next_page(start_mock, tmp_path):
+
+    # Serve a set of 350 cards (two pages):
+    mock = start_mock(set_size=350)
+    downloader = create_downloader(mock, tmp_path / "imagenes")
+
+    # Enumerate the set:
+    cards = list(downloader.iter_set("neo"))
+
+    # Every card of both pages is returned once, in collector number order:
+    assert len(cards) == 350
+    assert cards[0].collector_number == "1"
+    assert cards[-1].collector_number == "350d"
+
+    # One search request per page, and no other API calls:
+    assert mock.counters['search'] == 2
+    assert mock.counters['api'] == mock.counters['collection'] == 0
+
+    # The cards are already resolved, so the download needs no lookups:
+    assert all(card.key() in downloader.card_data for card in cards)
+
+#
+# An unknown set raises LookupError:
+#
+def test_unknown_set_raises_lookup_error(start_mock, tmp_path):
+
+    # The search endpoint answers '404' for every set:
+    mock = start_mock(set_size=0)
+    downloader = create_downloader(mock, tmp_path / "imagenes")
+
+    # The enumeration fails:
+    with pytest.raises(LookupError):
+        list(downloader.iter_set("xxx"))
+
+#
+# The command line exits with code 1 on an unknown set:
+#
+def test_cli_unknown_set_exits_with_1(start_mock, tmp_path, monkeypatch, capsys):
+
+    # The search endpoint answers '404' for every set:
+    mock = start_mock(set_size=0)
+    monkeypatch.setattr(ScryfallDownloader, "BASE_URL", mock.url)
+
+    # Run the command line:
+    code = mtg_downloader.main(["--set", "xxx", "-o", str(tmp_path / "imagenes")])
+
+    # It fails with an error event for the set:
+    assert code == 1
+    assert '"set": "xxx"' in capsys.readouterr().out
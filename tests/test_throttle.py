@@ -0,0 +1,72 @@
+########################################
+# TESTS OF THE 429 HANDLING OF THE API #
+########################################
+
+# Import the required libraries:
+import time
+
+# Import the downloader and the mock server:
+from scryfall_downloader import ScryfallDownloader
+from mock_scryfall import MockScryfall
+
+# Declare the stub server:
+class ThrottleOnce(MockScryfall):
+    """Mock server that answers '429' with 'Retry-After: 1' to the first API request only"""
+
+    #
+    # Initialisation function:
+    #
+    def __init__(self, **options):
+
+        # Throttle every API request until the first '429' is sent:
+        super().__init__(throttle_rate=1.0, **options)
+
+        # Initialise the times of the collection requests:
+        self.collection_times = []
+
+    #
+    # Update a counter, recording the time of the collection requests and stopping the throttles:
+    #
+    def count(self, name, amount=1):
+
+        # Update the counter:
+        super().count(name, amount)
+
+        # Record the time of each collection request:
+        if name == 'collection':
+            self.collection_times.append(time.monotonic())
+
+        # Only the first request is throttled:
+        if name == 'throttled':
+            self.throttle_rate = 0.0
+
+#
+# A '429' answer waits for its 'Retry-After' and requeues the request instead of failing the cards:
+#
+def test_retry_after_is_honoured(start_mock, tmp_path):
+
+    # Start the stub server:
+    mock = start_mock(ThrottleOnce, image_size=1000)
+
+    # Write a decklist of two cards:
+    decklist = tmp_path / "mazo.txt"
+    decklist.write_text("1 Card 1 (BEN) 1\n2 Card 2 (BEN) 2\n", encoding='utf-8')
+
+    # Download it, collecting the log messages:
+    messages = []
+    downloader = ScryfallDownloader(tmp_path / "imagenes", log_callback=messages.append, echo=False)
+    downloader.BASE_URL = mock.url
+    assert downloader.process_decklist(decklist)
+    downloader.close()
+
+    # The collection request was throttled once and sent again:
+    assert mock.counters['throttled'] == 1
+    assert mock.counters['collection'] == 2
+
+    # The second attempt waited for the 'Retry-After' of the answer:
+    assert mock.collection_times[1] - mock.collection_times[0] >= 0.9
+    assert any("API saturada (429), reintentando en 1.0s" in message for message in messages)
+
+    # No card failed, and the throttle didn't spend the retry budget:
+    assert downloader.stats == {'successful': 3, 'failed': 0, 'total': 3}
+    assert 'retries_api' not in downloader.metrics.report()['counters']
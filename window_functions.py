@@ -4,6 +4,7 @@
 
 # Import the GUI library:
 import tkinter as tk
+from tkinter import ttk
 
 #
 # Helper function to create a window with different customisations:
@@ -87,20 +88,32 @@ def info_window(root, message):
 #
 # Helper function to create a progress window:
 #
-def create_progress_window(root):
+def create_progress_window(root, on_cancel=None):
     
     # Create the window template using our function:
-    window = create_window(root, title="Descargando...", size="500x400")
+    window = create_window(root, title="Descargando...", size="500x480")
     
     # Add a text label:
     label = tk.Label(window, text="Iniciando descarga...", font=("Helvetica", 12, "bold"))
     label.pack(pady=10)
+
+    # Add a progress bar:
+    progress_bar = ttk.Progressbar(window, orient=tk.HORIZONTAL, length=460, mode="determinate")
+    progress_bar.pack(pady=5, padx=10)
+
+    # Add a label for the speed and the remaining time:
+    stats_label = tk.Label(window, text="", font=("Helvetica", 10))
+    stats_label.pack(pady=5)
     
     # Add a text area to show the console logs:
     text_area = tk.Text(window, height=15, width=55, font=("Consolas", 10))
     text_area.pack(pady=10, padx=10)
+
+    # Add a cancel button, if a cancel function is provided:
+    if on_cancel:
+        tk.Button(window, text="Cancelar", command=on_cancel, font=("Helvetica", 12), width=15).pack(pady=5)
     
-    return window, label, text_area
+    return window, label, text_area, progress_bar, stats_label
 
 #
 # Helper function to decide on double-faced cards: